@@ -0,0 +1,503 @@
+"""
+Benchmark de la API de productos con resultados en JSON para comparar commits.
+
+Cubre login, el listado con cada filtro, el detalle, el alta con PDF, la
+descarga de la OT, los cambios de stock y las estadísticas (ver
+``ESCENARIOS``) sobre un catálogo sembrado de 1k, 100k o 1m productos
+(``--productos``). La siembra es determinista y solo agrega lo que falta, así
+que el mismo tamaño da los mismos datos en cada corrida.
+
+Dos modos:
+
+- Por defecto cada escenario se repite ``--repeticiones`` veces en este
+  proceso a través del WSGIHandler (como ``bench_conexiones.py``): sin red ni
+  servidor, mide el costo de la aplicación y de la base de datos.
+- Con ``--url`` corre un perfil de carga contra un servidor ya levantado con
+  la misma base de datos: ``--usuarios`` clientes eligen escenarios al azar
+  según su peso durante ``--duracion`` segundos.
+
+Las lecturas se piden con ``Cache-Control: no-cache`` para medir la consulta
+y no la caché de respuestas (``--con-cache`` para medir los aciertos). El
+tiempo en la base de datos de cada request se toma de la cabecera
+``Server-Timing``.
+
+Usa PostgreSQL según DATABASE_*, o SQLite con BENCH_SQLITE=<archivo>, con las
+migraciones aplicadas::
+
+    python manage.py migrate --settings=benchmarks.settings
+    python benchmarks/bench_api.py --productos 100k --salida base.json
+    # ...cambios...
+    python benchmarks/bench_api.py --productos 100k --salida nuevo.json --comparar base.json
+
+    # Perfil de carga contra gunicorn
+    DJANGO_SETTINGS_MODULE=benchmarks.settings gunicorn &
+    python benchmarks/bench_api.py --url http://127.0.0.1:8000 --usuarios 20 --duracion 60
+
+    # Solo comparar dos resultados ya guardados
+    python benchmarks/bench_api.py --comparar base.json nuevo.json
+
+La comparación usa la mediana de cada escenario y termina con código 1 si
+alguno empeoró más que ``--tolerancia``.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+TAMANOS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+LOTE = 5_000
+# Productos sembrados: 'Bench-0000001 Tornillo de acero', ...
+PREFIJO = 'Bench-'
+PALABRAS = ('Tornillo', 'Tuerca', 'Arandela', 'Perno', 'Bisagra', 'Taladro', 'Martillo', 'Llave')
+MATERIALES = ('acero', 'bronce', 'aluminio', 'madera', 'plástico')
+CON_PDF = 20
+MUESTRA = 1_000
+
+USUARIO = 'benchmark-api'
+CONTRASENA = 'clave-del-benchmark-api-123'
+PDF = b'%PDF-1.4\n' + b'0' * (256 * 1024) + b'\n%%EOF'
+
+_DB_DUR = re.compile(r'\bdb;dur=([\d.]+)')
+
+
+def _configurar_django():
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+# Siembra
+
+def _producto(i):
+    from productos.models import Producto
+
+    palabra = PALABRAS[i % len(PALABRAS)]
+    material = MATERIALES[(i // len(PALABRAS)) % len(MATERIALES)]
+    return Producto(
+        nombre=f'{PREFIJO}{i:07d} {palabra} de {material}',
+        descripcion=f'{palabra} de {material} para uso general, lote {i // 1000}',
+        precio=Decimal(100 + (i * 7919) % 100_000) / 100,
+        # Uno de cada 25 sin stock
+        stock=(i * 31) % 50 if i % 25 else 0,
+        numero_ot=i + 1,
+    )
+
+
+def sembrar(cantidad):
+    """Completa el catálogo hasta ``cantidad`` productos; retorna los datos de los escenarios"""
+    from django.contrib.auth.models import User
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connection
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from productos import cache_respuestas, estadisticas
+    from productos.models import Producto
+
+    sembrados = Producto.objects.filter(nombre__startswith=PREFIJO)
+    existentes = sembrados.count()
+    for inicio in range(existentes, cantidad, LOTE):
+        Producto.objects.bulk_create(_producto(i) for i in range(inicio, min(inicio + LOTE, cantidad)))
+        print(f'\rsembrando: {min(inicio + LOTE, cantidad)}/{cantidad}', end='', file=sys.stderr)
+    if existentes < cantidad:
+        print(file=sys.stderr)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Producto._meta.db_table}')
+
+    con_pdf = list(sembrados.con_pdf().values_list('id', flat=True)[:CON_PDF])
+    for producto in sembrados.order_by('id').exclude(id__in=con_pdf)[:CON_PDF - len(con_pdf)]:
+        producto.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF, content_type='application/pdf'))
+        con_pdf.append(producto.id)
+
+    stock, _ = Producto.objects.get_or_create(
+        nombre='Bench stock', defaults={'precio': 1000, 'stock': 10 ** 9}
+    )
+    usuario, _ = User.objects.get_or_create(username=USUARIO)
+    usuario.set_password(CONTRASENA)
+    usuario.save(update_fields=['password'])
+
+    # bulk_create no pasa por las señales que mantienen las cachés
+    estadisticas.invalidar()
+    cache_respuestas.invalidar()
+
+    return {
+        'productos': sembrados.count(),
+        'token': str(AccessToken.for_user(usuario)),
+        'ids': list(sembrados.order_by('?').values_list('id', flat=True)[:MUESTRA]),
+        'ids_pdf': con_pdf,
+        'id_stock': stock.id,
+    }
+
+
+def limpiar():
+    """Borra los productos creados por el escenario de alta"""
+    from productos.models import Producto
+
+    Producto.objects.filter(nombre__startswith='Bench alta ').delete()
+
+
+# Escenarios: cada uno arma un request a partir de los datos sembrados
+
+Peticion = namedtuple('Peticion', 'metodo ruta cuerpo tipo esperado')
+
+
+def _get(ruta, **parametros):
+    if parametros:
+        ruta = f'{ruta}?{urlencode(parametros)}'
+    return Peticion('GET', ruta, b'', None, 200)
+
+
+def _post(ruta, datos, esperado=200):
+    return Peticion('POST', ruta, json.dumps(datos).encode(), 'application/json', esperado)
+
+
+def _login(datos, rng):
+    return _post('/api/auth/login/', {'username': USUARIO, 'password': CONTRASENA})
+
+
+def _listado_precio(datos, rng):
+    minimo = rng.randrange(1, 900)
+    return _get('/api/productos/', precio_min=minimo, precio_max=minimo + 50)
+
+
+def _alta_con_pdf(datos, rng):
+    from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+    archivo = io.BytesIO(PDF)
+    archivo.name = 'ot.pdf'
+    cuerpo = encode_multipart(BOUNDARY, {
+        'nombre': f'Bench alta {uuid.uuid4().hex}',
+        'precio': '1500.00',
+        'stock': '10',
+        'orden_trabajo_pdf': archivo,
+    })
+    return Peticion('POST', '/api/productos/', cuerpo, MULTIPART_CONTENT, 201)
+
+
+def _ajuste_masivo(datos, rng):
+    ajustes = [{'id': pk, 'delta': 1} for pk in rng.sample(datos['ids'], min(10, len(datos['ids'])))]
+    return _post('/api/productos/stock/bulk/', {'ajustes': ajustes, 'modo': 'parcial'})
+
+
+# (nombre, peso en el perfil de carga, request)
+ESCENARIOS = [
+    ('login', 1, _login),
+    ('listado', 10, lambda datos, rng: _get('/api/productos/')),
+    ('listado ?nombre', 3, lambda datos, rng: _get('/api/productos/', nombre=rng.choice(PALABRAS))),
+    ('listado ?q', 3, lambda datos, rng: _get(
+        '/api/productos/', q=f'{rng.choice(PALABRAS)} {rng.choice(MATERIALES)}')),
+    ('listado ?precio', 2, _listado_precio),
+    ('listado ?con_stock', 2, lambda datos, rng: _get('/api/productos/', con_stock='true')),
+    ('listado ?con_pdf', 1, lambda datos, rng: _get('/api/productos/', con_pdf='true')),
+    ('listado ?paginacion=cursor', 2, lambda datos, rng: _get('/api/productos/', paginacion='cursor')),
+    ('listado ?conteo=aproximado', 1, lambda datos, rng: _get('/api/productos/', conteo='aproximado')),
+    ('detalle', 10, lambda datos, rng: _get(f'/api/productos/{rng.choice(datos["ids"])}/')),
+    ('alta con PDF', 1, _alta_con_pdf),
+    ('descargar-ot', 2, lambda datos, rng: _get(f'/api/productos/{rng.choice(datos["ids_pdf"])}/descargar-ot/')),
+    ('stock: reducir', 2, lambda datos, rng: _post(
+        f'/api/productos/{datos["id_stock"]}/reducir-stock/', {'cantidad': 1})),
+    ('stock: aumentar', 2, lambda datos, rng: _post(
+        f'/api/productos/{datos["id_stock"]}/aumentar-stock/', {'cantidad': 1})),
+    ('stock: ajuste masivo', 1, _ajuste_masivo),
+    ('estadisticas', 2, lambda datos, rng: _get('/api/productos/estadisticas/')),
+]
+
+
+def _cabeceras(datos, peticion, con_cache):
+    cabeceras = {'Authorization': f'Bearer {datos["token"]}'}
+    if peticion.tipo:
+        cabeceras['Content-Type'] = peticion.tipo
+    if not con_cache:
+        cabeceras['Cache-Control'] = 'no-cache'
+    return cabeceras
+
+
+def _db_ms(server_timing):
+    coincidencia = _DB_DUR.search(server_timing or '')
+    return float(coincidencia.group(1)) if coincidencia else None
+
+
+class ClienteWSGI:
+    """Requests a través del WSGIHandler, en este proceso"""
+
+    def __init__(self):
+        from django.core.handlers.wsgi import WSGIHandler
+        self.handler = WSGIHandler()
+
+    def __call__(self, peticion, cabeceras):
+        from wsgiref.util import setup_testing_defaults
+
+        ruta, _, consulta = peticion.ruta.partition('?')
+        environ = {
+            'REQUEST_METHOD': peticion.metodo,
+            'PATH_INFO': ruta,
+            'QUERY_STRING': consulta,
+            'HTTP_HOST': 'localhost',
+            'CONTENT_LENGTH': str(len(peticion.cuerpo)),
+        }
+        for nombre, valor in cabeceras.items():
+            clave = nombre.upper().replace('-', '_')
+            environ[clave if clave == 'CONTENT_TYPE' else f'HTTP_{clave}'] = valor
+        setup_testing_defaults(environ)
+        environ['wsgi.input'] = io.BytesIO(peticion.cuerpo)
+        respuesta = self.handler(environ, lambda estado, headers: None)
+        try:
+            b''.join(respuesta)
+        finally:
+            respuesta.close()
+        return respuesta.status_code, respuesta.headers.get('Server-Timing')
+
+
+class ClienteHTTP:
+    """Requests a un servidor, con una conexión keep-alive por cliente"""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self.conectar = lambda: clase(partes.hostname, partes.port, timeout=30)
+        self.conexion = self.conectar()
+
+    def __call__(self, peticion, cabeceras):
+        try:
+            self.conexion.request(peticion.metodo, peticion.ruta, body=peticion.cuerpo, headers=cabeceras)
+            respuesta = self.conexion.getresponse()
+            respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.conexion.close()
+            self.conexion = self.conectar()
+            raise
+        return respuesta.status, respuesta.getheader('Server-Timing')
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _resumen(latencias, db, errores, duracion=None):
+    if not latencias:
+        return {'requests': 0, 'errores': errores}
+    resumen = {
+        'requests': len(latencias),
+        'errores': errores,
+        'media_ms': round(statistics.mean(latencias), 3),
+        'p50_ms': round(_percentil(latencias, 0.5), 3),
+        'p95_ms': round(_percentil(latencias, 0.95), 3),
+        'p99_ms': round(_percentil(latencias, 0.99), 3),
+        'db_p50_ms': round(_percentil(db, 0.5), 3) if db else None,
+    }
+    if duracion:
+        resumen['requests_s'] = round(len(latencias) / duracion, 2)
+    else:
+        resumen['requests_s'] = round(1000 * len(latencias) / sum(latencias), 2)
+    return resumen
+
+
+def medir_local(datos, escenarios, args):
+    """Repite cada escenario en este proceso; retorna el resumen por escenario"""
+    cliente = ClienteWSGI()
+    rng = random.Random(args.semilla)
+    resultados = {}
+    for nombre, _, armar in escenarios:
+        latencias, db, errores = [], [], 0
+        for i in range(args.calentamiento + args.repeticiones):
+            peticion = armar(datos, rng)
+            inicio = time.perf_counter()
+            codigo, timing = cliente(peticion, _cabeceras(datos, peticion, args.con_cache))
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            if i < args.calentamiento:
+                continue
+            if codigo != peticion.esperado:
+                errores += 1
+                continue
+            latencias.append(transcurrido)
+            if _db_ms(timing) is not None:
+                db.append(_db_ms(timing))
+        resultados[nombre] = _resumen(latencias, db, errores)
+    return resultados
+
+
+def medir_carga(datos, escenarios, args):
+    """Perfil de carga contra ``args.url``; retorna el resumen por escenario y el total"""
+    pesos = [peso for _, peso, _ in escenarios]
+    muestras = {nombre: ([], [], [0]) for nombre, _, _ in escenarios}
+    lock = threading.Lock()
+    fin = time.monotonic() + args.duracion
+
+    def usuario(numero):
+        cliente = ClienteHTTP(args.url)
+        rng = random.Random(args.semilla + numero)
+        while time.monotonic() < fin:
+            nombre, _, armar = rng.choices(escenarios, weights=pesos)[0]
+            peticion = armar(datos, rng)
+            inicio = time.perf_counter()
+            try:
+                codigo, timing = cliente(peticion, _cabeceras(datos, peticion, args.con_cache))
+            except (OSError, http.client.HTTPException):
+                codigo, timing = None, None
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            latencias, db, errores = muestras[nombre]
+            with lock:
+                if codigo != peticion.esperado:
+                    errores[0] += 1
+                else:
+                    latencias.append(transcurrido)
+                    if _db_ms(timing) is not None:
+                        db.append(_db_ms(timing))
+            if args.espera:
+                time.sleep(rng.expovariate(1 / args.espera))
+
+    hilos = [threading.Thread(target=usuario, args=(n,)) for n in range(args.usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    resultados = {
+        nombre: _resumen(latencias, db, errores[0], args.duracion)
+        for nombre, (latencias, db, errores) in muestras.items()
+    }
+    resultados['total'] = _resumen(
+        [latencia for latencias, _, _ in muestras.values() for latencia in latencias],
+        [valor for _, db, _ in muestras.values() for valor in db],
+        sum(errores[0] for _, _, errores in muestras.values()),
+        args.duracion,
+    )
+    return resultados
+
+
+def _commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+        ).stdout.strip()
+        cambios = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}+cambios' if cambios else commit
+
+
+def imprimir(resultados):
+    print(f'{"escenario":<30}{"req/s":>9}{"p50":>10}{"p95":>10}{"p99":>10}{"db p50":>10}{"errores":>9}')
+    for nombre, datos in resultados.items():
+        if not datos['requests']:
+            print(f'{nombre:<30}{"-":>9}{"-":>10}{"-":>10}{"-":>10}{"-":>10}{datos["errores"]:>9}')
+            continue
+        db = f'{datos["db_p50_ms"]:>8.2f}ms' if datos['db_p50_ms'] is not None else f'{"-":>10}'
+        print(
+            f'{nombre:<30}{datos["requests_s"]:>9.1f}'
+            f'{datos["p50_ms"]:>8.2f}ms{datos["p95_ms"]:>8.2f}ms{datos["p99_ms"]:>8.2f}ms'
+            f'{db}{datos["errores"]:>9}'
+        )
+
+
+def comparar(base, nuevo, tolerancia):
+    """Compara las medianas por escenario; retorna True si ninguna empeoró más que ``tolerancia``"""
+    for clave in ('modo', 'productos', 'base_de_datos'):
+        if base.get(clave) != nuevo.get(clave):
+            print(f'Aviso: {clave} distinto ({base.get(clave)} / {nuevo.get(clave)})')
+    print(f'\n{base.get("commit")} -> {nuevo.get("commit")}, mediana por escenario\n')
+    print(f'{"escenario":<30}{"antes":>10}{"ahora":>10}{"cambio":>9}')
+    sin_regresiones = True
+    for nombre, actual in nuevo['escenarios'].items():
+        anterior = base['escenarios'].get(nombre)
+        if not anterior or not anterior['requests'] or not actual['requests']:
+            continue
+        cambio = actual['p50_ms'] / anterior['p50_ms'] - 1
+        regresion = cambio > tolerancia
+        sin_regresiones &= not regresion
+        print(
+            f'{nombre:<30}{anterior["p50_ms"]:>8.2f}ms{actual["p50_ms"]:>8.2f}ms'
+            f'{cambio:>+9.0%}{"  REGRESIÓN" if regresion else ""}'
+        )
+    return sin_regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--productos', choices=TAMANOS, default='1k')
+    parser.add_argument('--escenarios', help='solo los escenarios que contengan este texto')
+    parser.add_argument('--repeticiones', type=int, default=100)
+    parser.add_argument('--calentamiento', type=int, default=5)
+    parser.add_argument('--url', help='servidor para el perfil de carga (p. ej. http://127.0.0.1:8000)')
+    parser.add_argument('--usuarios', type=int, default=10)
+    parser.add_argument('--duracion', type=float, default=30)
+    parser.add_argument('--espera', type=float, default=0, help='pausa media entre requests de un usuario (s)')
+    parser.add_argument('--con-cache', action='store_true', help='no pedir Cache-Control: no-cache')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', help='archivo JSON con los resultados')
+    parser.add_argument('--comparar', nargs='+', metavar='JSON',
+                        help='resultado base (y opcionalmente el nuevo, sin medir)')
+    parser.add_argument('--tolerancia', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.comparar and len(args.comparar) > 2:
+        parser.error('--comparar recibe uno o dos archivos')
+    if args.comparar and len(args.comparar) == 2:
+        base, nuevo = (json.loads(Path(archivo).read_text()) for archivo in args.comparar)
+        sys.exit(0 if comparar(base, nuevo, args.tolerancia) else 1)
+
+    _configurar_django()
+    from django.db import connection
+
+    escenarios = [
+        escenario for escenario in ESCENARIOS
+        if not args.escenarios or args.escenarios in escenario[0]
+    ]
+    datos = sembrar(TAMANOS[args.productos])
+    modo = 'carga' if args.url else 'local'
+    print(f'{datos["productos"]} productos, {connection.vendor}, modo {modo}\n')
+    try:
+        if args.url:
+            resultados = medir_carga(datos, escenarios, args)
+        else:
+            resultados = medir_local(datos, escenarios, args)
+    finally:
+        limpiar()
+    imprimir(resultados)
+
+    informe = {
+        'commit': _commit(),
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'modo': modo,
+        'productos': datos['productos'],
+        'base_de_datos': connection.vendor,
+        'python': platform.python_version(),
+        'parametros': {
+            clave: valor for clave, valor in vars(args).items()
+            if clave not in ('salida', 'comparar', 'tolerancia')
+        },
+        'escenarios': resultados,
+    }
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False) + '\n')
+        print(f'\nResultados en {args.salida}')
+    if args.comparar:
+        base = json.loads(Path(args.comparar[0]).read_text())
+        sys.exit(0 if comparar(base, informe, args.tolerancia) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Prueba de carga: despliegue sync (WSGI) contra ASGI con la misma cantidad de
+workers de gunicorn.
+
+Levanta gunicorn con ``gunicorn.conf.py`` en cada modo (SERVIDOR=wsgi y
+SERVIDOR=asgi) y, durante ``--duracion`` segundos, mide la latencia de
+requests rápidos (listado, detalle y ping) mientras varios clientes lentos
+descargan un PDF grande leyendo de a poco, como un celular con mala conexión.
+Con workers sync cada descarga lenta ocupa un worker completo.
+
+Requiere PostgreSQL con las migraciones aplicadas (ver ``bench_conexiones.py``)
+y uvicorn-worker para el modo ASGI::
+
+    python benchmarks/bench_asgi.py --workers 2 --lentos 4 --clientes 8
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+USUARIO = 'benchmark'
+TAMANO_PDF = 4 * 1024 * 1024
+
+
+def _configurar_django():
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+def preparar():
+    """Crea el usuario y un producto con un PDF grande; retorna (token, id)"""
+    _configurar_django()
+    from django.contrib.auth.models import User
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework_simplejwt.tokens import AccessToken
+    from productos.models import Producto
+
+    usuario, _ = User.objects.get_or_create(username=USUARIO)
+    producto = Producto.objects.create(nombre=f'Benchmark PDF {time.time_ns()}', precio=1000, stock=1)
+    contenido = b'%PDF-1.4\n' + b'0' * (TAMANO_PDF - 16) + b'\n%%EOF'
+    producto.adjuntar_pdf(SimpleUploadedFile('ot.pdf', contenido, content_type='application/pdf'))
+    return str(AccessToken.for_user(usuario)), producto.id
+
+
+def _esperar(puerto, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=1)
+            conexion.request('GET', '/api/ping/')
+            if conexion.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'gunicorn no respondió en el puerto {puerto}')
+
+
+def _descarga_lenta(puerto, token, producto_id, detener):
+    """Descarga el PDF una y otra vez leyendo 8 KB cada 20 ms"""
+    while not detener.is_set():
+        sock = socket.socket()
+        # Ventana TCP chica: el servidor no puede volcar todo el archivo al buffer
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
+        try:
+            sock.connect(('127.0.0.1', puerto))
+            sock.sendall((
+                f'GET /api/productos/{producto_id}/descargar-ot/ HTTP/1.1\r\n'
+                f'Host: localhost\r\nAuthorization: Bearer {token}\r\nConnection: close\r\n\r\n'
+            ).encode())
+            while not detener.is_set() and sock.recv(8192):
+                time.sleep(0.02)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+def _cliente(puerto, token, producto_id, detener, latencias, errores):
+    rutas = ['/api/productos/', f'/api/productos/{producto_id}/', '/api/ping/']
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+    i = 0
+    while not detener.is_set():
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conexion.request('GET', ruta, headers={'Authorization': f'Bearer {token}'})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status != 200:
+                raise OSError(respuesta.status)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        except (OSError, http.client.HTTPException):
+            errores.append(ruta)
+            conexion.close()
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+
+
+def medir(modo, args, token, producto_id, puerto, media):
+    env = {
+        **os.environ,
+        'SERVIDOR': modo,
+        'PORT': str(puerto),
+        'WEB_CONCURRENCY': str(args.workers),
+        'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+        'PDF_STORAGE_ROOT': media,
+    }
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--log-level', 'warning'],
+        cwd=BACKEND, env=env,
+    )
+    try:
+        _esperar(puerto)
+        detener = threading.Event()
+        latencias, errores = [], []
+        hilos = [
+            threading.Thread(target=_descarga_lenta, args=(puerto, token, producto_id, detener))
+            for _ in range(args.lentos)
+        ]
+        hilos += [
+            threading.Thread(target=_cliente, args=(puerto, token, producto_id, detener, latencias, errores))
+            for _ in range(args.clientes)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(args.duracion)
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+        return latencias, errores
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--lentos', type=int, default=4, help='descargas lentas simultáneas')
+    parser.add_argument('--clientes', type=int, default=8, help='clientes de requests rápidos')
+    parser.add_argument('--duracion', type=float, default=15)
+    parser.add_argument('--puerto', type=int, default=8765)
+    args = parser.parse_args()
+
+    media = tempfile.mkdtemp(prefix='bench-asgi-')
+    os.environ['PDF_STORAGE_ROOT'] = media
+    token, producto_id = preparar()
+
+    print(
+        f'{args.workers} workers, {args.lentos} descargas lentas, '
+        f'{args.clientes} clientes, {args.duracion:g}s\n'
+    )
+    print(f'{"modo":<8}{"req/s":>9}{"p50":>10}{"p95":>10}{"p99":>10}{"errores":>9}')
+    for modo in ('wsgi', 'asgi'):
+        latencias, errores = medir(modo, args, token, producto_id, args.puerto, media)
+        if not latencias:
+            print(f'{modo:<8}{"-":>9}{"-":>10}{"-":>10}{"-":>10}{len(errores):>9}')
+            continue
+        print(
+            f'{modo:<8}{len(latencias) / args.duracion:>9.1f}'
+            f'{_percentil(latencias, 0.5):>8.1f}ms'
+            f'{_percentil(latencias, 0.95):>8.1f}ms'
+            f'{_percentil(latencias, 0.99):>8.1f}ms'
+            f'{len(errores):>9}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Latencia por request según el modo de conexión a PostgreSQL.
+
+Cada modo corre en un proceso aparte (las variables DB_* se leen al cargar
+settings) y hace requests completos a ``GET /api/productos/`` a través del
+WSGIHandler, igual que un worker de gunicorn: las señales ``request_started`` y
+``request_finished`` cierran o conservan la conexión según la configuración.
+La caché de respuestas se omite (``Cache-Control: no-cache``) para que cada
+request consulte la base de datos.
+
+Requiere un PostgreSQL con las migraciones aplicadas, configurado con las
+variables DATABASE_* de ``env.example``::
+
+    python manage.py migrate --settings=benchmarks.settings
+    python benchmarks/bench_conexiones.py --requests 500
+
+El modo ``pool`` solo se mide si está instalado psycopg 3 con psycopg_pool.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+MODOS = {
+    'sin reutilizar': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistente': {'DB_CONN_MAX_AGE': '60', 'DB_POOL': 'False'},
+    'pool': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'True'},
+}
+
+USUARIO = 'benchmark'
+PRODUCTOS = 200
+
+
+def _configurar_django():
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+def preparar():
+    """Crea el usuario y los productos de prueba si faltan"""
+    _configurar_django()
+    from django.contrib.auth.models import User
+    from productos.models import Producto
+
+    User.objects.get_or_create(username=USUARIO)
+    faltan = PRODUCTOS - Producto.objects.filter(nombre__startswith='Benchmark ').count()
+    Producto.objects.bulk_create(
+        Producto(nombre=f'Benchmark {time.time_ns()}-{i}', precio=1000 + i, stock=i)
+        for i in range(max(faltan, 0))
+    )
+
+
+def medir(cantidad):
+    """Hace ``cantidad`` requests y retorna las latencias en ms (proceso hijo)"""
+    _configurar_django()
+    from wsgiref.util import setup_testing_defaults
+
+    from django.contrib.auth.models import User
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    token = str(AccessToken.for_user(User.objects.get(username=USUARIO)))
+    connection.close()
+
+    conexiones = []
+    connection_created.connect(lambda sender, connection, **kwargs: conexiones.append(1), weak=False)
+
+    handler = WSGIHandler()
+    latencias = []
+    for _ in range(cantidad):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/api/productos/',
+            'HTTP_HOST': 'localhost',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'HTTP_CACHE_CONTROL': 'no-cache',
+        }
+        setup_testing_defaults(environ)
+        inicio = time.perf_counter()
+        respuesta = handler(environ, lambda estado, headers: None)
+        b''.join(respuesta)
+        respuesta.close()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != 200:
+            raise SystemExit(f'Respuesta inesperada: {respuesta.status_code}')
+    if connection.pool is not None:
+        # Con pool cada request toma una conexión ya abierta: se cuentan las reales
+        return {'latencias': latencias, 'conexiones': connection.pool.get_stats()['connections_num']}
+    return {'latencias': latencias, 'conexiones': len(conexiones)}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _pool_disponible():
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--calentamiento', type=int, default=20)
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.requests)))
+        return
+
+    preparar()
+    print(f'{args.requests} requests GET /api/productos/ por modo\n')
+    print(f'{"modo":<16}{"media":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"conexiones":>12}')
+    for modo, variables in MODOS.items():
+        if variables['DB_POOL'] == 'True' and not _pool_disponible():
+            print(f'{modo:<16}(requiere psycopg[pool])')
+            continue
+        salida = subprocess.run(
+            [sys.executable, __file__, '--medir', modo,
+             '--requests', str(args.requests + args.calentamiento)],
+            env={**os.environ, **variables}, cwd=BACKEND,
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+        datos = json.loads(salida.stdout.strip().splitlines()[-1])
+        latencias = datos['latencias'][args.calentamiento:]
+        print(
+            f'{modo:<16}{statistics.mean(latencias):>7.2f}ms'
+            f'{_percentil(latencias, 0.5):>7.2f}ms'
+            f'{_percentil(latencias, 0.95):>7.2f}ms'
+            f'{_percentil(latencias, 0.99):>7.2f}ms'
+            f'{datos["conexiones"]:>12}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Logins por segundo por núcleo según el hasher de contraseñas.
+
+Cada configuración corre en un proceso aparte fijado a un solo núcleo (las
+variables PASSWORD_HASHER, ARGON2_* y PBKDF2_* se leen al cargar settings) y
+hace logins completos a ``POST /api/auth/login/`` a través del WSGIHandler:
+parseo, throttling, ``authenticate()`` y emisión de los tokens. Antes de medir
+se guarda la contraseña con el hasher de la configuración, igual que el rehash
+que hace el primer login después de cambiarla.
+
+Requiere PostgreSQL con las migraciones aplicadas (ver ``bench_conexiones.py``)
+y argon2-cffi para las configuraciones Argon2::
+
+    python benchmarks/bench_login.py --logins 50
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+CONFIGURACIONES = {
+    'pbkdf2 (Django)': {'PASSWORD_HASHER': 'pbkdf2', 'PBKDF2_ITERATIONS': '1000000'},
+    'pbkdf2 600k': {'PASSWORD_HASHER': 'pbkdf2', 'PBKDF2_ITERATIONS': '600000'},
+    'argon2 (Django)': {
+        'PASSWORD_HASHER': 'argon2', 'ARGON2_TIME_COST': '2',
+        'ARGON2_MEMORY_COST': '102400', 'ARGON2_PARALLELISM': '8',
+    },
+    'argon2 ajustado': {
+        'PASSWORD_HASHER': 'argon2', 'ARGON2_TIME_COST': '2',
+        'ARGON2_MEMORY_COST': '19456', 'ARGON2_PARALLELISM': '1',
+    },
+}
+
+USUARIO = 'benchmark-login'
+CONTRASENA = 'clave-del-benchmark-123'
+
+
+def _configurar_django():
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+
+def medir(cantidad):
+    """Hace ``cantidad`` logins y retorna las latencias en ms (proceso hijo)"""
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    _configurar_django()
+    from wsgiref.util import setup_testing_defaults
+
+    from django.contrib.auth.models import User
+    from django.core.handlers.wsgi import WSGIHandler
+
+    usuario, _ = User.objects.get_or_create(username=USUARIO)
+    usuario.set_password(CONTRASENA)
+    usuario.save(update_fields=['password'])
+
+    handler = WSGIHandler()
+    cuerpo = json.dumps({'username': USUARIO, 'password': CONTRASENA}).encode()
+    latencias = []
+    for _ in range(cantidad):
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/api/auth/login/',
+            'HTTP_HOST': 'localhost',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(cuerpo)),
+        }
+        setup_testing_defaults(environ)
+        environ['wsgi.input'] = io.BytesIO(cuerpo)
+        inicio = time.perf_counter()
+        respuesta = handler(environ, lambda estado, headers: None)
+        b''.join(respuesta)
+        respuesta.close()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != 200:
+            raise SystemExit(f'Respuesta inesperada: {respuesta.status_code}')
+    return {'latencias': latencias}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _argon2_disponible():
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--calentamiento', type=int, default=3)
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.logins)))
+        return
+
+    print(f'{args.logins} logins POST /api/auth/login/ por configuración, 1 núcleo\n')
+    print(f'{"configuración":<18}{"logins/s":>10}{"media":>11}{"p50":>11}{"p95":>11}')
+    for nombre, variables in CONFIGURACIONES.items():
+        if variables['PASSWORD_HASHER'] == 'argon2' and not _argon2_disponible():
+            print(f'{nombre:<18}(requiere argon2-cffi)')
+            continue
+        salida = subprocess.run(
+            [sys.executable, __file__, '--medir', nombre,
+             '--logins', str(args.logins + args.calentamiento)],
+            env={**os.environ, **variables}, cwd=BACKEND,
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+        datos = json.loads(salida.stdout.strip().splitlines()[-1])
+        latencias = datos['latencias'][args.calentamiento:]
+        print(
+            f'{nombre:<18}{1000 * len(latencias) / sum(latencias):>10.1f}'
+            f'{statistics.mean(latencias):>9.1f}ms'
+            f'{_percentil(latencias, 0.5):>9.1f}ms'
+            f'{_percentil(latencias, 0.95):>9.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+Configuración para los benchmarks: la de base (PostgreSQL según DATABASE_* y
+conexiones según DB_*), sin logs a archivo. Con BENCH_SQLITE=<archivo> usa
+SQLite en su lugar.
+"""
+from mi_proyecto.settings_base import *
+
+SECRET_KEY = os.getenv('SECRET_KEY') or 'clave-solo-para-los-benchmarks-de-la-api'
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+SIMPLE_JWT = {**SIMPLE_JWT, 'SIGNING_KEY': SIMPLE_JWT['SIGNING_KEY'] or SECRET_KEY}
+
+if os.getenv('BENCH_SQLITE'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('BENCH_SQLITE'),
+            'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        }
+    }
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'root': {'level': 'WARNING'},
+}
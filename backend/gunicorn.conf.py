@@ -0,0 +1,16 @@
+"""
+Configuración de gunicorn (se carga sola al ejecutar ``gunicorn`` en backend/).
+
+SERVIDOR=asgi usa workers de uvicorn con ``mi_proyecto.asgi`` (requiere
+uvicorn-worker); por defecto, workers sync con ``mi_proyecto.wsgi``. La
+cantidad de workers se toma de WEB_CONCURRENCY en ambos casos.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+if os.getenv('SERVIDOR', 'wsgi').lower() == 'asgi':
+    wsgi_app = 'mi_proyecto.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'mi_proyecto.wsgi:application'
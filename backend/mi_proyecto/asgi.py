@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+# Rutas con las vistas async (mi_proyecto/urls_asgi.py)
+os.environ.setdefault('VISTAS_ASYNC', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,303 @@
+"""
+Métricas por ruta: tiempo total, tiempo en la base de datos, cantidad de
+consultas y tamaño de la respuesta.
+
+``MetricasMiddleware`` mide cada request y lo agrupa por el nombre de la ruta
+(``producto-list``, ``producto-descargar-ot``...). Además:
+
+- agrega la cabecera ``Server-Timing`` (visible en las herramientas del
+  navegador) con el tiempo total y el de la base de datos;
+- si un request supera ``METRICAS_PRESUPUESTO_CONSULTAS`` consultas, registra
+  un warning con la consulta más repetida (el patrón típico de un N+1) y lo
+  cuenta en ``http_request_query_budget_exceeded_total``.
+
+Las consultas se miden con un execute wrapper que se instala en cada conexión
+y reporta al request actual mediante una ContextVar. Así también se miden
+las consultas que las vistas async hacen en otros hilos.
+
+Cada proceso acumula sus histogramas en memoria y publica una copia en la
+caché compartida cada ``METRICAS_INTERVALO`` segundos. ``/api/metrics/``
+suma las copias de todos los workers y las expone en el formato de texto de
+Prometheus (ver ``texto_prometheus``).
+"""
+import bisect
+import collections
+import contextvars
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'metricas'
+CLAVE_PROCESOS = f'{PREFIJO}:procesos'
+# Las copias de procesos terminados se descartan solas después de un día
+TTL_PROCESO = 24 * 60 * 60
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HISTOGRAMAS = {
+    'http_request_duration_seconds': ('Duración del request', SEGUNDOS),
+    'http_request_db_seconds': ('Tiempo en la base de datos por request', SEGUNDOS),
+    'http_request_queries': ('Consultas SQL por request', (0, 1, 2, 5, 10, 20, 50, 100)),
+    'http_response_size_bytes': ('Tamaño de la respuesta', (1e3, 1e4, 1e5, 1e6, 1e7)),
+}
+CONTADORES = {
+    'http_request_query_budget_exceeded_total': 'Requests que superaron el presupuesto de consultas',
+}
+METODOS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class Registro:
+    """Histogramas y contadores acumulados por este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (métrica, etiquetas) -> [conteos acumulados por bucket..., total, suma]
+        self.histogramas = {}
+        self.contadores = collections.Counter()
+
+    def observar(self, metrica, etiquetas, valor):
+        limites = HISTOGRAMAS[metrica][1]
+        clave = (metrica, etiquetas)
+        with self._lock:
+            datos = self.histogramas.get(clave)
+            if datos is None:
+                datos = self.histogramas[clave] = [0] * len(limites) + [0, 0]
+            for i in range(bisect.bisect_left(limites, valor), len(limites)):
+                datos[i] += 1
+            datos[-2] += 1
+            datos[-1] += valor
+
+    def contar(self, metrica, etiquetas):
+        with self._lock:
+            self.contadores[(metrica, etiquetas)] += 1
+
+    def copia(self):
+        with self._lock:
+            return {
+                'histogramas': {clave: list(datos) for clave, datos in self.histogramas.items()},
+                'contadores': dict(self.contadores),
+            }
+
+
+registro = Registro()
+
+_medicion = contextvars.ContextVar('medicion_sql', default=None)
+
+
+class Medicion:
+    __slots__ = ('inicio', 'consultas', 'db', 'sql')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db = 0.0
+        self.sql = collections.Counter()
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.db += time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.sql[sql] += 1
+
+
+def _instalar(connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+# Conexiones nuevas de cualquier hilo (las vistas async consultan en otro)
+connection_created.connect(_instalar)
+
+
+def _ruta(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match and match.view_name else None) or 'sin_ruta'
+
+
+def _tamano(response):
+    if response.streaming:
+        longitud = response.headers.get('Content-Length')
+        return int(longitud) if longitud else None
+    return len(response.content)
+
+
+_proceso = {'pid': None, 'id': None, 'publicado': 0.0}
+
+
+def _id_proceso():
+    # Se recalcula después de un fork (gunicorn con preload)
+    if _proceso['pid'] != os.getpid():
+        _proceso.update(pid=os.getpid(), id=f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}')
+    return _proceso['id']
+
+
+def publicar(forzar=False):
+    """Publica la copia de este proceso en la caché compartida (cada METRICAS_INTERVALO s)"""
+    ahora = time.monotonic()
+    if not forzar and ahora - _proceso['publicado'] < getattr(settings, 'METRICAS_INTERVALO', 10):
+        return
+    _proceso['publicado'] = ahora
+    proceso = _id_proceso()
+    try:
+        cache.set(f'{PREFIJO}:proceso:{proceso}', registro.copia(), timeout=TTL_PROCESO)
+        procesos = cache.get(CLAVE_PROCESOS) or set()
+        if proceso not in procesos:
+            # Si dos workers se pisan, el que se pierde se vuelve a agregar en la próxima publicación
+            cache.set(CLAVE_PROCESOS, procesos | {proceso}, timeout=None)
+    except Exception as e:
+        logger.warning('No se pudieron publicar las métricas: %s', e)
+
+
+def agregadas():
+    """Suma de las copias publicadas por todos los procesos"""
+    procesos = cache.get(CLAVE_PROCESOS) or set()
+    claves = {f'{PREFIJO}:proceso:{proceso}': proceso for proceso in procesos}
+    copias = cache.get_many(list(claves))
+    vigentes = {claves[clave] for clave in copias}
+    if vigentes != procesos:
+        cache.set(CLAVE_PROCESOS, vigentes, timeout=None)
+
+    histogramas, contadores = {}, collections.Counter()
+    for copia in copias.values():
+        for clave, datos in copia['histogramas'].items():
+            if clave in histogramas:
+                histogramas[clave] = [a + b for a, b in zip(histogramas[clave], datos)]
+            else:
+                histogramas[clave] = list(datos)
+        contadores.update(copia['contadores'])
+    return histogramas, contadores
+
+
+def formato_etiquetas(nombres, valores, **extra):
+    pares = [*zip(nombres, valores), *extra.items()]
+    texto = ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', r'\\').replace('"', r'\"'))
+        for nombre, valor in pares
+    )
+    return f'{{{texto}}}' if texto else ''
+
+
+def familia(nombre, tipo, ayuda, muestras):
+    """Líneas de una familia de métricas: ``muestras`` es [(sufijo, etiquetas, valor)]"""
+    lineas = [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+    lineas += [f'{nombre}{sufijo}{etiquetas} {valor}' for sufijo, etiquetas, valor in muestras]
+    return lineas
+
+
+ETIQUETAS = {
+    'http_request_duration_seconds': ('ruta', 'metodo', 'codigo'),
+    'http_request_db_seconds': ('ruta',),
+    'http_request_queries': ('ruta',),
+    'http_response_size_bytes': ('ruta',),
+    'http_request_query_budget_exceeded_total': ('ruta',),
+}
+
+
+def texto_prometheus():
+    """Métricas HTTP de todos los workers en el formato de texto de Prometheus"""
+    publicar(forzar=True)
+    histogramas, contadores = agregadas()
+    lineas = []
+    for metrica, (ayuda, limites) in HISTOGRAMAS.items():
+        muestras = []
+        for (nombre, etiquetas), datos in sorted(histogramas.items()):
+            if nombre != metrica:
+                continue
+            for limite, conteo in zip(limites, datos):
+                muestras.append(('_bucket', formato_etiquetas(ETIQUETAS[metrica], etiquetas, le=f'{limite:g}'), conteo))
+            muestras.append(('_bucket', formato_etiquetas(ETIQUETAS[metrica], etiquetas, le='+Inf'), datos[-2]))
+            muestras.append(('_sum', formato_etiquetas(ETIQUETAS[metrica], etiquetas), float(datos[-1])))
+            muestras.append(('_count', formato_etiquetas(ETIQUETAS[metrica], etiquetas), datos[-2]))
+        lineas += familia(metrica, 'histogram', ayuda, muestras)
+    for metrica, ayuda in CONTADORES.items():
+        muestras = [
+            ('', formato_etiquetas(ETIQUETAS[metrica], etiquetas), valor)
+            for (nombre, etiquetas), valor in sorted(contadores.items()) if nombre == metrica
+        ]
+        lineas += familia(metrica, 'counter', ayuda, muestras)
+    return lineas
+
+
+class MetricasMiddleware:
+    """Mide cada request (ver el docstring del módulo)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.presupuesto = getattr(settings, 'METRICAS_PRESUPUESTO_CONSULTAS', 30)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        # Conexiones abiertas antes de importar este módulo
+        for connection in connections.all(initialized_only=True):
+            _instalar(connection)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion)
+
+    def registrar(self, request, response, medicion):
+        duracion = time.perf_counter() - medicion.inicio
+        ruta = _ruta(request)
+        metodo = request.method if request.method in METODOS else 'OTRO'
+
+        registro.observar('http_request_duration_seconds', (ruta, metodo, str(response.status_code)), duracion)
+        registro.observar('http_request_db_seconds', (ruta,), medicion.db)
+        registro.observar('http_request_queries', (ruta,), medicion.consultas)
+        tamano = _tamano(response)
+        if tamano is not None:
+            registro.observar('http_response_size_bytes', (ruta,), tamano)
+
+        if medicion.consultas > self.presupuesto:
+            registro.contar('http_request_query_budget_exceeded_total', (ruta,))
+            sql, repeticiones = medicion.sql.most_common(1)[0]
+            logger.warning(
+                'Posible N+1 en %s: %s consultas (presupuesto %s), %s veces: %s',
+                ruta, medicion.consultas, self.presupuesto, repeticiones, sql[:300],
+                extra={'ruta': ruta, 'consultas': medicion.consultas, 'repeticiones': repeticiones},
+            )
+
+        timing = (
+            f'app;dur={duracion * 1000:.1f}, '
+            f'db;dur={medicion.db * 1000:.1f};desc="{medicion.consultas} consultas"'
+        )
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        publicar()
+        return response
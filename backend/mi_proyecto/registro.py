@@ -0,0 +1,218 @@
+"""
+Logging estructurado y sin E/S en el hilo del request.
+
+- ``ColaHandler`` encola los registros y un ``QueueListener`` los formatea y
+  escribe (archivo, consola) desde un hilo propio: el request solo paga la
+  creación del registro.
+- ``FormatoJSON`` escribe una línea JSON por registro con los campos pasados
+  en ``extra``. El mensaje se formatea con ``%`` recién cuando el registro
+  pasa el nivel del logger (``logger.info('... %s', valor)``), nunca antes.
+- ``CorrelacionMiddleware`` asigna a cada request un id (el de la cabecera
+  ``X-Request-ID`` si viene una válida) que se agrega a todos sus registros
+  y se devuelve en la respuesta.
+- Los registros DEBUG de un request se muestrean: solo los requests elegidos
+  con probabilidad ``LOG_MUESTREO_DEBUG`` los emiten, completos.
+  ``debug_muestreado(logger)`` permite saltear el armado de los datos.
+
+``configuracion()`` arma el dict de LOGGING que usan los settings.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+CABECERA = 'X-Request-ID'
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+# Fuera de un request (comandos, arranque) no se muestrea
+_muestreado = contextvars.ContextVar('debug_muestreado', default=True)
+
+# Atributos de LogRecord que no son campos ``extra``
+_ATRIBUTOS_BASE = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def request_id_actual():
+    return _request_id.get()
+
+
+def debug_muestreado(logger):
+    """True si ``logger`` emite DEBUG y el request actual fue muestreado"""
+    return _muestreado.get() and logger.isEnabledFor(logging.DEBUG)
+
+
+class FiltroCorrelacion(logging.Filter):
+    """Agrega ``request_id`` a cada registro (en el hilo que lo emite)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """Descarta los DEBUG de los requests no muestreados"""
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _muestreado.get()
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos ``extra`` al mismo nivel"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_BASE and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        if record.stack_info:
+            datos['stack'] = record.stack_info
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    QueueHandler que escribe en ``destinos`` desde un QueueListener propio.
+    En LOGGING se declara con ``'()'`` (no ``'class'``): desde Python 3.12
+    dictConfig arma a su manera los QueueHandler declarados con ``'class'``
+    (su clave ``handlers``, la cola y el listener, que no inicia). Los destinos
+    se pasan como ``cfg://handlers.<nombre>``.
+    """
+
+    def __init__(self, destinos=(), tamano=10000):
+        # Por índice: así dictConfig resuelve las referencias cfg://
+        destinos = [destinos[i] for i in range(len(destinos))]
+        if not all(isinstance(destino, logging.Handler) for destino in destinos):
+            # dictConfig reintenta este handler después de crear los demás
+            raise ValueError('target not configured yet')
+        # Cola acotada: si el disco se traba se pierden registros, no requests
+        super().__init__(queue.Queue(tamano))
+        self.listener = QueueListener(self.queue, *destinos, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # Solo se resuelven el mensaje y la traza (los argumentos pueden cambiar
+        # después); el formato final lo aplica el destino en el otro hilo
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
+def _iniciar(request, muestreo):
+    recibido = request.headers.get(CABECERA, '')
+    request.request_id = recibido if _ID_VALIDO.match(recibido) else uuid.uuid4().hex
+    return (
+        _request_id.set(request.request_id),
+        _muestreado.set(muestreo > 0 and random.random() < muestreo),
+    )
+
+
+def _terminar(tokens):
+    _request_id.reset(tokens[0])
+    _muestreado.reset(tokens[1])
+
+
+class CorrelacionMiddleware:
+    """Asigna el id de correlación y decide el muestreo de DEBUG por request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from django.conf import settings
+
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'LOG_MUESTREO_DEBUG', 0.0)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        tokens = _iniciar(request, self.muestreo)
+        try:
+            response = self.get_response(request)
+        finally:
+            _terminar(tokens)
+        response[CABECERA] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        tokens = _iniciar(request, self.muestreo)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _terminar(tokens)
+        response[CABECERA] = request.request_id
+        return response
+
+
+def configuracion(destinos, formato='json', nivel='INFO', loggers=None):
+    """
+    Dict de LOGGING: ``destinos`` son los handlers reales (``{'nombre':
+    {'class': ..., ...}}``), que escriben desde el hilo de la cola con el
+    ``formato`` indicado ('json' o 'texto'). ``loggers`` mapea nombres de
+    logger a su nivel.
+    """
+    handlers = {nombre: {'formatter': formato, **config} for nombre, config in destinos.items()}
+    handlers['salida'] = {
+        '()': 'mi_proyecto.registro.ColaHandler',
+        'destinos': [f'cfg://handlers.{nombre}' for nombre in destinos],
+        'filters': ['correlacion', 'muestreo'],
+    }
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'json': {'()': 'mi_proyecto.registro.FormatoJSON'},
+            'texto': {
+                'format': '{levelname} {asctime} {name} [{request_id}] {message}',
+                'style': '{',
+            },
+        },
+        'filters': {
+            'correlacion': {'()': 'mi_proyecto.registro.FiltroCorrelacion'},
+            'muestreo': {'()': 'mi_proyecto.registro.FiltroMuestreo'},
+        },
+        'handlers': handlers,
+        'root': {'handlers': ['salida'], 'level': nivel},
+        'loggers': {
+            nombre: {'handlers': ['salida'], 'level': nivel_logger, 'propagate': False}
+            for nombre, nivel_logger in (loggers or {}).items()
+        },
+    }
@@ -3,8 +3,11 @@ Configuración base para el proyecto Django.
 """
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
+from .registro import configuracion as configuracion_logging
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -27,13 +30,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'productos',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
 ]
 
 MIDDLEWARE = [
+    # Primero: el id de correlación queda en todos los registros del request
+    'mi_proyecto.registro.CorrelacionMiddleware',
+    # Mide el request completo (incluidos los demás middlewares)
+    'mi_proyecto.metricas.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,6 +71,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'mi_proyecto.wsgi.application'
+ASGI_APPLICATION = 'mi_proyecto.asgi.application'
+
+# Con ASGI (mi_proyecto/asgi.py activa VISTAS_ASYNC) el listado, el detalle, la
+# descarga de PDFs y los health checks se atienden con vistas async
+VISTAS_ASYNC = os.getenv('VISTAS_ASYNC', 'False').lower() == 'true'
+if VISTAS_ASYNC:
+    ROOT_URLCONF = 'mi_proyecto.urls_asgi'
 
 # Database
 DATABASES = {
@@ -75,6 +91,64 @@ DATABASES = {
     }
 }
 
+# Reutilización de conexiones. Por defecto cada worker conserva su conexión
+# DB_CONN_MAX_AGE segundos (0 = una conexión nueva por request, "none" = sin
+# límite) y comprueba que siga viva antes de usarla en un request nuevo, en vez
+# de pagar la conexión (y el handshake TLS) en cada request.
+# DB_POOL=true usa en cambio el pool nativo de psycopg 3 (psycopg[pool]), un
+# pool por proceso de DB_POOL_MIN_SIZE a DB_POOL_MAX_SIZE conexiones; Django no
+# permite combinarlo con CONN_MAX_AGE, que queda en 0. Con ASGI las consultas
+# de cada request corren en un hilo distinto y una conexión persistente no se
+# reutilizaría: ahí CONN_MAX_AGE también queda en 0 y conviene DB_POOL.
+# Detrás de PgBouncer en modo transacción hay que desactivar los cursores del
+# lado del servidor (DB_DISABLE_SERVER_SIDE_CURSORS=true).
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+DB_CONN_MAX_AGE = None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE)
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+
+
+def configurar_conexiones(base_datos):
+    """Aplica la reutilización de conexiones a una entrada de DATABASES"""
+    base_datos['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+    base_datos['DISABLE_SERVER_SIDE_CURSORS'] = (
+        os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False').lower() == 'true'
+    )
+    if DB_POOL:
+        base_datos['CONN_MAX_AGE'] = 0
+        base_datos.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+    else:
+        base_datos['CONN_MAX_AGE'] = 0 if VISTAS_ASYNC else DB_CONN_MAX_AGE
+    return base_datos
+
+
+configurar_conexiones(DATABASES['default'])
+
+# Hasher de contraseñas (ver productos/hashers.py). El primero de la lista se usa
+# para los hashes nuevos; los demás solo verifican hashes existentes, que se
+# rehashean con el preferido en el siguiente login. Por defecto Argon2id con el
+# costo mínimo recomendado por OWASP (19 MiB, 2 pasadas, 1 hilo)
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2').lower()
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '19456'))  # KiB
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '1'))
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '1000000'))
+
+_HASHERS = {
+    'argon2': 'productos.hashers.Argon2Ajustado',
+    'pbkdf2': 'productos.hashers.PBKDF2Ajustado',
+}
+PASSWORD_HASHERS = [
+    _HASHERS[PASSWORD_HASHER],
+    *(hasher for nombre, hasher in _HASHERS.items() if nombre != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -126,6 +200,15 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FileUploadParser',
     ],
+    # Intentos fallidos de login (ver productos/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('LOGIN_RATE', '5/min'),
+        'login_ip': os.getenv('LOGIN_RATE_IP', '30/min'),
+    },
+    # Proxies delante de la app. La IP del cliente sale de X-Forwarded-For
+    # contando desde el final; con 0 se usa REMOTE_ADDR. Sin este valor DRF
+    # toma la cabecera tal como la manda el cliente y el límite se evade
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
 # JWT Configuration
@@ -151,67 +234,116 @@ SIMPLE_JWT = {
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'productos.autenticacion.UsuarioToken',
     'JTI_CLAIM': 'jti',
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# JWT_STATELESS=true: el usuario se arma con los claims del token y su estado
+# (activo, permisos) se lee de la caché compartida, sin consultar la tabla de
+# usuarios en cada request (ver productos/autenticacion.py)
+JWT_STATELESS = os.getenv('JWT_STATELESS', 'False').lower() == 'true'
+AUTH_ESTADO_TIMEOUT = int(os.getenv('AUTH_ESTADO_TIMEOUT', '60'))
+if JWT_STATELESS:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
+        'productos.autenticacion.JWTStatelessAuthentication',
+    ]
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000').split(',')
 CORS_ALLOW_CREDENTIALS = True
+# El id de correlación de cada respuesta (ver mi_proyecto/registro.py) y las
+# cabeceras del protocolo de subidas reanudables (ver productos/subidas_views.py)
+CORS_EXPOSE_HEADERS = ['X-Request-ID', 'Location', 'Upload-Offset', 'Upload-Length', 'Upload-Expires']
+CORS_ALLOW_HEADERS = (*default_headers, 'upload-length', 'upload-offset', 'upload-metadata')
 
 # File Upload Configuration
 MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', '10485760'))  # 10MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
+# Los PDFs de productos se reciben por bloques en un temporal (productos/subidas.py).
+# Las demás subidas (importación) usan los handlers de Django con su límite en
+# memoria por defecto (2.5MB); por encima van a un temporal.
+
+# Subidas reanudables de PDFs (/api/subidas/): directorio local de los archivos
+# parciales, tamaño máximo y segundos sin actividad hasta que se descartan
+SUBIDAS_DIR = os.getenv('SUBIDAS_DIR', os.path.join(MEDIA_ROOT, 'subidas'))
+SUBIDAS_MAX_SIZE = int(os.getenv('SUBIDAS_MAX_SIZE', str(100 * 1024 * 1024)))  # 100MB
+SUBIDAS_EXPIRACION = int(os.getenv('SUBIDAS_EXPIRACION', str(24 * 60 * 60)))
+
+# Almacenamiento de PDFs de órdenes de trabajo (ver productos/storage.py)
+PDF_STORAGE = {
+    'BACKEND': 'productos.storage.FileSystemPDFStorage',
+    'OPTIONS': {
+        'location': os.getenv('PDF_STORAGE_ROOT', os.path.join(MEDIA_ROOT, 'ordenes_trabajo')),
+    },
+}
+
+# Caché compartida por todos los workers y nodos (Redis o compatible: Valkey,
+# KeyDB...). La usan el throttling de DRF, las estadísticas de productos y la
+# caché de respuestas. Sin REDIS_URL se usa una caché en memoria por proceso:
+# sirve en desarrollo, pero en producción cada worker contaría por separado.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            # Prefijo y versión: cambiar CACHE_VERSION descarta todas las claves
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'productos-api'),
+            'VERSION': int(os.getenv('CACHE_VERSION', '1')),
+            'TIMEOUT': 300,
+            # Opciones del pool de conexiones de redis-py (uno por proceso)
+            'OPTIONS': {
+                'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', '20')),
+                'socket_connect_timeout': 2,
+                'socket_timeout': 2,
+                'retry_on_timeout': True,
+                'health_check_interval': 30,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'productos-api',
+        }
+    }
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
-# Logging
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
+# Logging (ver mi_proyecto/registro.py): una línea JSON por registro con el id
+# de correlación del request, escrita desde el hilo de una cola
+LOG_FORMATO = os.getenv('LOG_FORMATO', 'json')  # json o texto
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Proporción de requests que emiten sus registros DEBUG (0 = ninguno, 1 = todos)
+LOG_MUESTREO_DEBUG = float(os.getenv('LOG_MUESTREO_DEBUG', '0'))
+
+LOGGING = configuracion_logging(
+    {
+        'console': {'class': 'logging.StreamHandler'},
         'file': {
-            'level': 'INFO',
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'django.log'),
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
         },
     },
-    'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
+    formato=LOG_FORMATO,
+    nivel=LOG_LEVEL,
+    loggers={
+        'django': LOG_LEVEL,
+        # Sin muestreo los DEBUG ni se crean
+        'productos': 'DEBUG' if LOG_MUESTREO_DEBUG > 0 else LOG_LEVEL,
     },
-    'loggers': {
-        'django': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'productos': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-    },
-}
+)
+
+# Métricas por ruta (ver mi_proyecto/metricas.py), expuestas en /api/metrics/
+# Cada cuántos segundos publica cada worker sus métricas en la caché compartida
+METRICAS_INTERVALO = int(os.getenv('METRICAS_INTERVALO', '10'))
+# Consultas por request a partir de las cuales se registra un posible N+1
+METRICAS_PRESUPUESTO_CONSULTAS = int(os.getenv('METRICAS_PRESUPUESTO_CONSULTAS', '30'))
+# /api/metrics/ exige 'Authorization: Bearer <token>'; sin token solo responde con DEBUG
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
@@ -19,20 +19,17 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
-# Configuración de logging para desarrollo
-LOGGING['handlers']['console']['level'] = 'DEBUG'
+# Configuración de logging para desarrollo: texto legible y todos los DEBUG
+LOG_MUESTREO_DEBUG = float(os.getenv('LOG_MUESTREO_DEBUG', '1'))
+for handler in ('console', 'file'):
+    LOGGING['handlers'][handler]['formatter'] = os.getenv('LOG_FORMATO', 'texto')
 LOGGING['loggers']['django']['level'] = 'DEBUG'
 LOGGING['loggers']['productos']['level'] = 'DEBUG'
 
 # Configuración de email para desarrollo (consola)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
-# Configuración de cache para desarrollo
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-}
+# Cache: en memoria salvo que se defina REDIS_URL (ver settings_base)
 
 # Configuración de sesiones para desarrollo
 SESSION_COOKIE_SECURE = False
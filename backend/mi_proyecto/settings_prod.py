@@ -10,13 +10,25 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 
 # Configuración de base de datos para producción (Render)
 if os.getenv('DATABASE_URL'):
-    DATABASES['default'] = dj_database_url.parse(os.getenv('DATABASE_URL'))
+    DATABASES['default'] = configurar_conexiones(dj_database_url.parse(os.getenv('DATABASE_URL')))
 
 # Configuración de archivos estáticos para producción
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Configuración de archivos media para producción (usar cloud storage)
-# TODO: Configurar AWS S3 o similar para archivos media
+# El disco de Render es efímero: los PDFs de OT van a un bucket S3 compatible
+if os.getenv('PDF_STORAGE_BUCKET'):
+    PDF_STORAGE = {
+        'BACKEND': 'productos.storage.S3PDFStorage',
+        'OPTIONS': {
+            'bucket': os.getenv('PDF_STORAGE_BUCKET'),
+            'prefix': os.getenv('PDF_STORAGE_PREFIX', 'ordenes_trabajo'),
+            'endpoint_url': os.getenv('PDF_STORAGE_ENDPOINT_URL') or None,
+            'region_name': os.getenv('PDF_STORAGE_REGION') or None,
+            'access_key': os.getenv('PDF_STORAGE_ACCESS_KEY') or None,
+            'secret_key': os.getenv('PDF_STORAGE_SECRET_KEY') or None,
+        },
+    }
 
 # Configuración de seguridad para producción
 SECURE_SSL_REDIRECT = True
@@ -60,52 +72,19 @@ CORS_ALLOWED_METHODS = [
     'PUT',
 ]
 
-# Configuración de cache para producción (usar cache en memoria)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
+# Cache: se configura en settings_base a partir de REDIS_URL. En producción
+# debe estar definida para que el throttling sea global y no por worker.
 
-# Configuración de logging para producción (solo consola)
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
-        },
-    },
-    'root': {
-        'handlers': ['console'],
-        'level': 'INFO',
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console'],
-            'level': 'WARNING',
-            'propagate': False,
-        },
-        'productos': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
+# Configuración de logging para producción (solo consola, JSON)
+LOGGING = configuracion_logging(
+    {'console': {'class': 'logging.StreamHandler'}},
+    formato=LOG_FORMATO,
+    nivel=LOG_LEVEL,
+    loggers={
+        'django': 'WARNING',
+        'productos': 'DEBUG' if LOG_MUESTREO_DEBUG > 0 else LOG_LEVEL,
     },
-}
+)
 
 # Configuración de email para producción
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -117,11 +96,13 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@tudominio.com')
 
 # Configuración de rate limiting
+# Render pone un proxy delante: la IP del cliente es la que este agrega
+REST_FRAMEWORK['NUM_PROXIES'] = int(os.getenv('NUM_PROXIES', '1'))
 REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = [
     'rest_framework.throttling.AnonRateThrottle',
     'rest_framework.throttling.UserRateThrottle'
 ]
-REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].update({
     'anon': '100/hour',
     'user': '1000/hour'
-}
+})
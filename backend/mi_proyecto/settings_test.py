@@ -0,0 +1,73 @@
+"""
+Configuración para ejecutar las pruebas sin servicios externos.
+
+Uso: python manage.py test --settings=mi_proyecto.settings_test
+"""
+from .settings_base import *
+
+SECRET_KEY = 'clave-solo-para-las-pruebas-de-la-api'
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+SIMPLE_JWT = {**SIMPLE_JWT, 'SIGNING_KEY': SECRET_KEY}
+
+# SQLite en archivo para que las pruebas con hilos compartan la misma base
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'OPTIONS': {
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'db_test.sqlite3',
+        },
+    }
+}
+
+# Sustituto local de la caché compartida (Redis) para no depender de un servidor
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'KEY_PREFIX': 'test',
+    }
+}
+
+# Almacenamiento de PDFs en memoria
+PDF_STORAGE = {
+    'BACKEND': 'productos.storage.InMemoryPDFStorage',
+    'OPTIONS': {},
+}
+
+# Hasher rápido: las pruebas no miden el costo de las contraseñas
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Logging solo a consola y sin ruido
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'level': 'WARNING',
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'django.request': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+            'propagate': False,
+        },
+        'productos': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,19 @@
+"""
+URLs del despliegue ASGI: las lecturas más frecuentes se atienden con las
+vistas async de ``productos/async_views.py`` y el resto con las mismas rutas
+de ``mi_proyecto.urls``.
+"""
+from django.urls import path
+
+from productos import async_views
+
+from .urls import urlpatterns as urlpatterns_wsgi
+
+urlpatterns = [
+    # Mismos nombres que las rutas WSGI: las métricas se agrupan por nombre
+    path('api/productos/', async_views.productos, name='producto-list'),
+    path('api/productos/<int:pk>/', async_views.producto, name='producto-detail'),
+    path('api/productos/<int:pk>/descargar-ot/', async_views.descargar_ot, name='producto-descargar-ot'),
+    path('api/health/', async_views.health_check, name='health_check'),
+    path('api/ping/', async_views.simple_ping, name='simple_ping'),
+] + urlpatterns_wsgi
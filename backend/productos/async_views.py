@@ -0,0 +1,154 @@
+"""
+Vistas async para el despliegue ASGI (``mi_proyecto/urls_asgi.py``).
+
+Con ASGI Django ejecuta las vistas sync en un único hilo por proceso, así que
+una descarga lenta o una consulta bloquearían todo el worker. Estas vistas
+atienden de forma async los endpoints de lectura más usados:
+
+- listado y detalle de productos: la autenticación, los permisos y el
+  throttling del ViewSet se ejecutan en ese hilo (consultan la base de datos),
+  la caché de respuestas se lee en el pool de hilos y solo un fallo de caché
+  vuelve al ViewSet para consultar y serializar;
+- ``descargar-ot``: el PDF se envía con un iterador async (ver ``descargas.py``);
+- ``health`` y ``ping``: los chequeos de base de datos y caché corren en paralelo.
+
+Los demás métodos (POST, PUT, PATCH, DELETE) se delegan a las vistas sync del
+ViewSet, de modo que la API es la misma en ambos despliegues.
+"""
+import asyncio
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import cache_respuestas
+from .health_views import (
+    datos_ping, error_health, resultado_health,
+    verificar_base_datos, verificar_cache, verificar_cache_respuestas,
+)
+from .views import ProductoViewSet
+
+# Para E/S que no usa el ORM (caché, almacenamiento): no compite con el hilo
+# de las vistas sync, donde deben quedarse las consultas
+en_hilo = partial(sync_to_async, thread_sensitive=False)
+
+ACCIONES_LISTA = {'get': 'list', 'post': 'create'}
+ACCIONES_DETALLE = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+ACCIONES_DESCARGA = {'get': 'descargar_ot'}
+
+
+class _PreparacionViewSet(ProductoViewSet):
+    """
+    ProductoViewSet que en ``dispatch`` solo ejecuta ``initial()``
+    (autenticación, permisos y throttling) y retorna
+    ``(vista, request, respuesta_error)``; la acción la completa la vista async.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request, *args, **kwargs)
+        except Exception as exc:
+            return self, request, self.finalizar(self.handle_exception(exc))
+        return self, request, None
+
+    def finalizar(self, response):
+        response = self.finalize_response(self.request, response)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+
+def _vistas(acciones, detail):
+    initkwargs = {'basename': 'producto', 'detail': detail}
+    return (
+        ProductoViewSet.as_view(acciones, **initkwargs),
+        _PreparacionViewSet.as_view(acciones, **initkwargs),
+    )
+
+
+_lista_sync, _preparar_lista = _vistas(ACCIONES_LISTA, detail=False)
+_detalle_sync, _preparar_detalle = _vistas(ACCIONES_DETALLE, detail=True)
+_descarga_sync, _preparar_descarga = _vistas(ACCIONES_DESCARGA, detail=True)
+
+
+def _generar(vista, accion, clave, **kwargs):
+    """Fallo de caché: la acción del ViewSet consulta, serializa y guarda"""
+    try:
+        response = vista.generar_y_guardar(vista.request, accion, clave, **kwargs)
+    except Exception as exc:
+        response = vista.handle_exception(exc)
+    return vista.finalizar(response)
+
+
+async def _leer(preparar, request, accion, **kwargs):
+    vista, drf_request, error = await sync_to_async(preparar)(request, **kwargs)
+    if error is not None:
+        return error
+
+    clave, guardada = await en_hilo(cache_respuestas.respuesta_guardada)(drf_request, accion)
+    if guardada is not None:
+        return vista.finalize_response(drf_request, guardada)
+    return await sync_to_async(_generar)(vista, accion, clave, **kwargs)
+
+
+@csrf_exempt
+async def productos(request):
+    """``/api/productos/``: listado async; el alta se delega al ViewSet"""
+    if request.method == 'GET':
+        return await _leer(_preparar_lista, request, 'list')
+    return await sync_to_async(_lista_sync)(request)
+
+
+@csrf_exempt
+async def producto(request, pk):
+    """``/api/productos/<pk>/``: detalle async; las escrituras se delegan al ViewSet"""
+    if request.method == 'GET':
+        return await _leer(_preparar_detalle, request, 'retrieve', pk=pk)
+    return await sync_to_async(_detalle_sync)(request, pk=pk)
+
+
+def _descargar(request, pk):
+    """Busca el producto y arma la respuesta; el cuerpo se lee después, async"""
+    vista, drf_request, error = _preparar_descarga(request, pk=pk)
+    if error is not None:
+        return error
+    return vista.finalizar(vista.respuesta_descarga(drf_request, asincrono=True))
+
+
+@csrf_exempt
+async def descargar_ot(request, pk):
+    """``/api/productos/<pk>/descargar-ot/`` con el PDF enviado por un iterador async"""
+    if request.method in ('GET', 'HEAD'):
+        return await sync_to_async(_descargar)(request, pk)
+    return await sync_to_async(_descarga_sync)(request, pk=pk)
+
+
+async def health_check(request):
+    """Versión async de ``health_views.health_check``"""
+    start_time = time.time()
+    try:
+        database, cache, response_cache = await asyncio.gather(
+            sync_to_async(verificar_base_datos)(),
+            en_hilo(verificar_cache)(),
+            en_hilo(verificar_cache_respuestas)(),
+        )
+        datos, codigo = resultado_health({
+            'database': database,
+            'cache': cache,
+            'response_cache': response_cache,
+        }, start_time)
+    except Exception as e:
+        datos, codigo = error_health(e)
+    return JsonResponse(datos, status=codigo)
+
+
+async def simple_ping(request):
+    """Versión async de ``health_views.simple_ping``"""
+    return JsonResponse(datos_ping())
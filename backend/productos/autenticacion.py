@@ -0,0 +1,179 @@
+"""
+Autenticación JWT sin consultar la tabla de usuarios en cada request.
+
+``JWTAuthentication`` (la clase por defecto) carga el ``User`` desde la base de
+datos en cada request autenticado. ``JWTStatelessAuthentication`` arma en su
+lugar un ``UsuarioToken`` a partir de los claims del token ya verificado
+(``user_id`` y ``username``), y toma lo que puede cambiar mientras el token
+sigue vigente (``is_active``, ``is_staff``, ``is_superuser`` y permisos) de una
+entrada en la caché compartida que vence a los ``AUTH_ESTADO_TIMEOUT``
+segundos.
+
+Las señales de ``signals.py`` borran esa entrada cuando se guarda o elimina el
+usuario o cambian sus grupos o permisos, así que desactivar un usuario corta
+su acceso en el siguiente request. Los cambios que no pasan por esas señales
+(``QuerySet.update``) se ven como mucho ``AUTH_ESTADO_TIMEOUT`` segundos
+después.
+
+Se activa con ``JWT_STATELESS=true`` (ver settings_base.py).
+
+``TokenProductos`` es el refresh token de la API: consulta y escribe la lista
+negra a través de ``lista_negra.py`` y rota en ``rotar()``.
+"""
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import lista_negra
+
+PREFIJO = 'auth:usuario'
+TIMEOUT = getattr(settings, 'AUTH_ESTADO_TIMEOUT', 60)
+
+
+class TokenProductos(RefreshToken):
+    """Refresh token con los datos del usuario que necesita ``UsuarioToken``"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        # Se copian también al access token
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        # simplejwt ya lo registró como pendiente; queda vigente en la caché
+        lista_negra.registrar_en_cache(token)
+        return token
+
+    def check_blacklist(self):
+        if lista_negra.esta_revocado(self):
+            raise TokenError('El token fue revocado')
+
+    def blacklist(self):
+        lista_negra.revocar(self)
+
+    def outstand(self):
+        lista_negra.registrar(self)
+
+    def rotar(self):
+        """
+        Emite un nuevo refresh token en lugar de este según
+        ``ROTATE_REFRESH_TOKENS`` y ``BLACKLIST_AFTER_ROTATION``, y retorna
+        ``(access, refresh)``. El token ya debe estar verificado.
+        """
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        estado = estado_usuario(user_id) if user_id is not None else None
+        if user_id is not None and (estado is None or not estado['is_active']):
+            raise AuthenticationFailed('Usuario inactivo o inexistente', code='no_active_account')
+
+        access = self.access_token
+        if not api_settings.ROTATE_REFRESH_TOKENS:
+            return access, self
+
+        anterior = copy.copy(self)
+        anterior.payload = dict(self.payload)
+        self.set_jti()
+        self.set_exp()
+        self.set_iat()
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            lista_negra.revocar(anterior, nuevos=[self])
+        else:
+            lista_negra.registrar(self)
+        return access, self
+
+
+def _clave(user_id):
+    return f'{PREFIJO}:{user_id}'
+
+
+def estado_usuario(user_id):
+    """
+    Retorna ``{'is_active', 'is_staff', 'is_superuser', 'permisos'}`` del
+    usuario desde la caché (consulta la base si no está), o None si no existe.
+    """
+    clave = _clave(user_id)
+    estado = cache.get(clave)
+    if estado is None:
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if user is None:
+            return None
+        estado = {
+            'is_active': user.is_active,
+            'is_staff': user.is_staff,
+            'is_superuser': user.is_superuser,
+            'permisos': sorted(user.get_all_permissions()) if user.is_active else [],
+        }
+        cache.set(clave, estado, timeout=TIMEOUT)
+    return estado
+
+
+def invalidar_estado(*user_ids):
+    """Borra el estado cacheado de los usuarios"""
+    if user_ids:
+        cache.delete_many([_clave(user_id) for user_id in user_ids])
+
+
+class UsuarioToken(TokenUser):
+    """Usuario liviano armado con los claims del token y el estado cacheado"""
+
+    def __init__(self, token, estado=None):
+        super().__init__(token)
+        self.estado = estado or {}
+
+    # El estado cacheado manda sobre los claims, que pueden estar desactualizados
+
+    @cached_property
+    def is_active(self):
+        return self.estado.get('is_active', True)
+
+    @cached_property
+    def is_staff(self):
+        return self.estado.get('is_staff', self.token.get('is_staff', False))
+
+    @cached_property
+    def is_superuser(self):
+        return self.estado.get('is_superuser', self.token.get('is_superuser', False))
+
+    def get_all_permissions(self, obj=None):
+        return set(self.estado.get('permisos', ()))
+
+    def has_perm(self, perm, obj=None):
+        if not self.is_active:
+            return False
+        return self.is_superuser or perm in self.get_all_permissions(obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, module):
+        if not self.is_active:
+            return False
+        return self.is_superuser or any(
+            perm.startswith(f'{module}.') for perm in self.get_all_permissions()
+        )
+
+
+class JWTStatelessAuthentication(JWTAuthentication):
+    """JWTAuthentication que no consulta la base de datos si el estado está en caché"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no identifica a un usuario')
+
+        estado = estado_usuario(user_id)
+        if estado is None:
+            raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not estado['is_active']:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        return UsuarioToken(validated_token, estado)
@@ -3,28 +3,39 @@ Vistas de autenticación para la API.
 """
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import Throttled
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 import logging
 
+from .autenticacion import TokenProductos
+from .throttling import LoginIPThrottle, LoginUsuarioIPThrottle
+
 logger = logging.getLogger(__name__)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Vista personalizada para obtener tokens JWT.
     """
+    # Reemplazan a los throttles por defecto: solo cuentan intentos fallidos
+    throttle_classes = [LoginUsuarioIPThrottle, LoginIPThrottle]
+
+    def throttled(self, request, wait):
+        raise Throttled(wait, detail='Demasiados intentos de login, intente más tarde')
+
+    def registrar_fallo(self, request):
+        for throttle in self.get_throttles():
+            throttle.registrar_fallo(request, self)
+
     def post(self, request, *args, **kwargs):
         try:
             username = request.data.get('username')
             password = request.data.get('password')
             
-            logger.info(f"Intento de login para usuario: {username}")
-            
             # Verificar que se proporcionaron las credenciales
             if not username or not password:
                 return Response({
@@ -35,22 +46,24 @@ class CustomTokenObtainPairView(TokenObtainPairView):
             user = authenticate(username=username, password=password)
             
             if user is None:
-                logger.warning(f"Credenciales incorrectas para usuario: {username}")
+                logger.warning('Credenciales incorrectas para usuario: %s', username)
+                self.registrar_fallo(request)
                 return Response({
                     'error': 'Usuario o contraseña incorrecta, intente nuevamente por favor'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             if not user.is_active:
-                logger.warning(f"Usuario inactivo: {username}")
+                logger.warning('Usuario inactivo: %s', username)
+                self.registrar_fallo(request)
                 return Response({
                     'error': 'Usuario o contraseña incorrecta, intente nuevamente por favor'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             # Generar tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = TokenProductos.for_user(user)
             access_token = refresh.access_token
             
-            logger.info(f"Login exitoso para usuario: {username}")
+            logger.info('Login exitoso para usuario: %s', username)
             
             return Response({
                 'access': str(access_token),
@@ -65,7 +78,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
-            logger.error(f"Error en login: {e}", exc_info=True)
+            logger.exception('Error en login')
             return Response({
                 'error': 'Error interno del servidor, intente más tarde'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -115,9 +128,9 @@ def register_user(request):
         )
         
         # Generar tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = TokenProductos.for_user(user)
         
-        logger.info(f"Usuario registrado: {username}")
+        logger.info('Usuario registrado: %s', username)
         
         return Response({
             'message': 'Usuario registrado exitosamente',
@@ -135,12 +148,12 @@ def register_user(request):
         }, status=status.HTTP_201_CREATED)
         
     except ValidationError as e:
-        logger.error(f"Error de validación en registro: {e}")
+        logger.warning('Error de validación en registro: %s', e)
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        logger.error(f"Error inesperado en registro: {e}")
+        logger.exception('Error inesperado en registro')
         return Response({
             'error': 'Error interno del servidor'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -159,11 +172,11 @@ def refresh_token(request):
                 'error': 'Token de refresh es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validar y obtener nuevo token
-        refresh = RefreshToken(refresh_token)
-        access_token = refresh.access_token
+        # Validar (incluye la lista negra) y rotar el refresh token
+        refresh = TokenProductos(refresh_token)
+        access_token, refresh = refresh.rotar()
         
-        logger.info(f"Token renovado para usuario: {refresh.payload.get('username')}")
+        logger.info('Token renovado para usuario: %s', refresh.payload.get('username'))
         
         return Response({
             'access': str(access_token),
@@ -171,7 +184,7 @@ def refresh_token(request):
         })
         
     except Exception as e:
-        logger.error(f"Error al renovar token: {e}")
+        logger.warning('Error al renovar token: %s', e)
         return Response({
             'error': 'Token de refresh inválido'
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -185,17 +198,17 @@ def logout_user(request):
         refresh_token = request.data.get('refresh')
         
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = TokenProductos(refresh_token)
             token.blacklist()
             
-            logger.info(f"Usuario deslogueado: {request.user.username}")
+            logger.info('Usuario deslogueado: %s', request.user.username)
         
         return Response({
             'message': 'Sesión cerrada exitosamente'
         })
         
     except Exception as e:
-        logger.error(f"Error al cerrar sesión: {e}")
+        logger.warning('Error al cerrar sesión: %s', e)
         return Response({
             'error': 'Error al cerrar sesión'
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -207,6 +220,9 @@ def user_profile(request):
     """
     try:
         user = request.user
+        if not isinstance(user, User):
+            # Con JWT_STATELESS request.user solo trae los datos del token
+            user = User.objects.get(pk=user.pk)
         
         return Response({
             'id': user.id,
@@ -219,7 +235,7 @@ def user_profile(request):
         })
         
     except Exception as e:
-        logger.error(f"Error al obtener perfil: {e}")
+        logger.exception('Error al obtener perfil')
         return Response({
             'error': 'Error interno del servidor'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
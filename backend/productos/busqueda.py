@@ -0,0 +1,90 @@
+"""
+Búsqueda de productos por texto (parámetro ``q``).
+
+En PostgreSQL combina búsqueda de texto completo sobre ``nombre`` y
+``descripcion`` (índice GIN sobre el ``SearchVector``) con coincidencias
+parciales de ``nombre`` resueltas por el índice de trigramas (``pg_trgm``), y
+ordena por relevancia. En otras bases de datos (SQLite en desarrollo y
+pruebas) usa ``icontains`` con una relevancia simple.
+
+Los índices se crean en la migración 0008 solo en PostgreSQL; las expresiones
+de este módulo deben coincidir con las de esos índices para poder usarlos.
+La migración tiene una copia fija (diccionario 'spanish'): cambiarlas aquí, o
+cambiar ``PRODUCTOS_BUSQUEDA_CONFIG``, requiere una migración nueva que
+reemplace los índices.
+"""
+from django.conf import settings
+from django.db import connections, models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Cast, Upper
+
+# Configuración de texto completo (diccionario) de PostgreSQL
+CONFIG_BUSQUEDA = getattr(settings, 'PRODUCTOS_BUSQUEDA_CONFIG', 'spanish')
+
+
+def vector_busqueda():
+    """SearchVector ponderado: el nombre pesa más que la descripción"""
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('nombre', weight='A', config=CONFIG_BUSQUEDA)
+        + SearchVector('descripcion', weight='B', config=CONFIG_BUSQUEDA)
+    )
+
+
+def nombre_mayusculas():
+    """Misma expresión que genera ``nombre__icontains`` en PostgreSQL"""
+    return Upper(Cast('nombre', output_field=models.TextField()))
+
+
+class BusquedaPostgres:
+    """Texto completo + trigramas, ordenado por relevancia"""
+
+    def buscar(self, queryset, texto):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+        consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type='websearch')
+        # alias(): el vector se usa para filtrar y rankear pero no se selecciona
+        return queryset.alias(
+            documento_busqueda=vector_busqueda(),
+        ).filter(
+            Q(documento_busqueda=consulta) | Q(nombre__icontains=texto)
+        ).annotate(
+            relevancia=(
+                SearchRank(models.F('documento_busqueda'), consulta)
+                + TrigramSimilarity('nombre', texto)
+            ),
+        )
+
+
+class BusquedaBasica:
+    """Alternativa portable: cada palabra debe aparecer en nombre o descripción"""
+
+    def buscar(self, queryset, texto):
+        for palabra in texto.split():
+            queryset = queryset.filter(
+                Q(nombre__icontains=palabra) | Q(descripcion__icontains=palabra)
+            )
+        return queryset.annotate(
+            relevancia=Case(
+                When(nombre__iexact=texto, then=Value(3.0)),
+                When(nombre__istartswith=texto, then=Value(2.0)),
+                When(nombre__icontains=texto, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=models.FloatField(),
+            )
+        )
+
+
+def buscar_productos(queryset, texto):
+    """
+    Filtra ``queryset`` por ``texto`` y anota ``relevancia``.
+    El orden por relevancia queda a cargo del llamador.
+    """
+    texto = texto.strip()
+    if not texto:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        backend = BusquedaPostgres()
+    else:
+        backend = BusquedaBasica()
+    return backend.buscar(queryset, texto)
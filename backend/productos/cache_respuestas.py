@@ -0,0 +1,147 @@
+"""
+Caché de respuestas del listado y del detalle de productos.
+
+Las claves incluyen un número de generación de la tabla de productos que se
+incrementa (al confirmar la transacción) cada vez que cambia un producto:
+altas, ediciones, bajas, stock, PDFs e importaciones. Así una página
+cacheada deja de usarse exactamente cuando cambian los datos, sin tener que
+buscar y borrar cada variante de filtros; las entradas viejas vencen solas.
+
+La generación se lee antes de consultar la base de datos: si un cambio se
+confirma mientras se arma la respuesta, esta queda guardada con la
+generación anterior y nadie la vuelve a leer.
+
+Las respuestas se guardan ya renderizadas (JSON), de modo que un acierto no
+consulta la base de datos ni serializa. Se indica con el header ``X-Cache``
+(HIT, MISS o BYPASS). Un request con ``Cache-Control: no-cache`` no lee de la
+caché pero sí guarda la respuesta nueva.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'productos:respuestas'
+TIMEOUT = getattr(settings, 'PRODUCTOS_CACHE_RESPUESTAS_TIMEOUT', 300)
+
+_CLAVE_GENERACION = f'{PREFIJO}:generacion'
+_CLAVES_METRICAS = {
+    'hits': f'{PREFIJO}:hits',
+    'misses': f'{PREFIJO}:misses',
+    'bypass': f'{PREFIJO}:bypass',
+}
+
+
+def generacion():
+    """Generación actual de la tabla de productos"""
+    valor = cache.get(_CLAVE_GENERACION)
+    if valor is None:
+        # Si la clave se perdió no se puede volver a empezar en 1: las
+        # entradas viejas de esa generación parecerían vigentes
+        cache.add(_CLAVE_GENERACION, time.time_ns(), timeout=None)
+        valor = cache.get(_CLAVE_GENERACION)
+    return valor
+
+
+def _incrementar_generacion():
+    try:
+        cache.incr(_CLAVE_GENERACION)
+    except ValueError:
+        cache.set(_CLAVE_GENERACION, time.time_ns(), timeout=None)
+
+
+def invalidar():
+    """Invalida las respuestas cacheadas cuando se confirme la transacción"""
+    transaction.on_commit(_incrementar_generacion)
+
+
+def _contar(metrica):
+    clave = _CLAVES_METRICAS[metrica]
+    try:
+        cache.incr(clave)
+    except ValueError:
+        if not cache.add(clave, 1, timeout=None):
+            cache.incr(clave)
+
+
+def metricas():
+    """Contadores de aciertos y fallos (compartidos entre workers)"""
+    valores = cache.get_many(list(_CLAVES_METRICAS.values()))
+    datos = {metrica: valores.get(clave, 0) for metrica, clave in _CLAVES_METRICAS.items()}
+    consultas = datos['hits'] + datos['misses']
+    datos['hit_ratio'] = round(datos['hits'] / consultas, 3) if consultas else None
+    return datos
+
+
+def _clave(request, accion, gen):
+    """Clave a partir de la ruta, los parámetros normalizados y el formato"""
+    parametros = sorted(
+        (nombre, sorted(valor for valor in request.query_params.getlist(nombre) if valor))
+        for nombre in request.query_params
+    )
+    parametros = [(nombre, valores) for nombre, valores in parametros if valores]
+    base = repr((
+        request.get_host(), request.path, parametros, request.accepted_media_type,
+    ))
+    huella = hashlib.sha1(base.encode('utf-8')).hexdigest()
+    return f'{PREFIJO}:{gen}:{accion}:{huella}'
+
+
+def _omitir_cache(request):
+    return 'no-cache' in request.headers.get('Cache-Control', '').lower()
+
+
+def respuesta_guardada(request, accion):
+    """
+    Retorna ``(clave, respuesta)`` con la respuesta cacheada para el request, o
+    ``(clave, None)`` si no hay o se pidió ``Cache-Control: no-cache``.
+    """
+    clave = _clave(request, accion, generacion())
+    if _omitir_cache(request):
+        return clave, None
+    guardada = cache.get(clave)
+    if guardada is None:
+        return clave, None
+    _contar('hits')
+    contenido, content_type = guardada
+    response = HttpResponse(contenido, content_type=content_type)
+    response['X-Cache'] = 'HIT'
+    return clave, response
+
+
+class CacheRespuestasMixin:
+    """Cachea las respuestas de ``list`` y ``retrieve`` de un ViewSet"""
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, 'list', *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, 'retrieve', *args, **kwargs)
+
+    def _respuesta_cacheada(self, request, accion, *args, **kwargs):
+        clave, guardada = respuesta_guardada(request, accion)
+        if guardada is not None:
+            return guardada
+        return self.generar_y_guardar(request, accion, clave, *args, **kwargs)
+
+    def generar_y_guardar(self, request, accion, clave, *args, **kwargs):
+        """Genera la respuesta de la acción y la guarda en ``clave`` si es 200"""
+        response = getattr(super(), accion)(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Renderizar aquí para guardar el JSON final
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(clave, (response.content, response['Content-Type']), timeout=TIMEOUT)
+        omitir = _omitir_cache(request)
+        _contar('bypass' if omitir else 'misses')
+        response['X-Cache'] = 'BYPASS' if omitir else 'MISS'
+        return response
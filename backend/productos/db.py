@@ -0,0 +1,109 @@
+"""
+Funciones y utilidades de base de datos compartidas por la app productos.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import connections, models, transaction
+from django.db.migrations.operations import AddIndex, RemoveIndex
+from django.db.migrations.operations.base import Operation
+from django.db.models import sql
+
+
+class OctetLength(models.Func):
+    """Tamaño en bytes de una columna binaria sin traer su contenido"""
+    function = 'OCTET_LENGTH'
+    output_field = models.BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # En SQLite LENGTH() de un BLOB retorna bytes
+        return super().as_sql(compiler, connection, function='LENGTH', **extra_context)
+
+
+def update_returning(queryset, campos, **valores):
+    """
+    Ejecuta ``queryset.update(**valores)`` como una sola sentencia
+    ``UPDATE ... RETURNING`` y retorna las filas actualizadas con los
+    ``campos`` pedidos (PostgreSQL y SQLite >= 3.35).
+    """
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(valores)
+    query.clear_select_clause()
+    query.clear_ordering(force=True)
+    update_sql, params = query.get_compiler(queryset.db).as_sql()
+    if not update_sql:
+        return []
+
+    connection = connections[queryset.db]
+    opts = queryset.model._meta
+    columnas = ', '.join(
+        connection.ops.quote_name(opts.get_field(campo).column) for campo in campos
+    )
+    with transaction.mark_for_rollback_on_error(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{update_sql} RETURNING {columnas}', params)
+            return cursor.fetchall()
+
+
+class SoloPostgres(Operation):
+    """
+    Aplica una operación de esquema solo en PostgreSQL, sin registrarla en el
+    estado de migraciones. Sirve para índices que no existen en SQLite (GIN,
+    trigramas); los modelos no los declaran en ``Meta.indexes``.
+    """
+    reversible = True
+
+    def __init__(self, operacion):
+        self.operacion = operacion
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [self.operacion], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            self.operacion.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            self.operacion.database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f'{self.operacion.describe()} (solo PostgreSQL)'
+
+
+class AgregarIndiceConcurrente(AddIndexConcurrently):
+    """
+    ``AddIndexConcurrently`` que en otras bases de datos (SQLite en desarrollo
+    y pruebas) crea el índice con un ``AddIndex`` común. En PostgreSQL el
+    índice se construye sin bloquear las escrituras de la tabla; la migración
+    tiene que declarar ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class QuitarIndiceConcurrente(RemoveIndexConcurrently):
+    """``RemoveIndexConcurrently`` con la misma alternativa fuera de PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
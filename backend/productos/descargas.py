@@ -0,0 +1,228 @@
+"""
+Descarga de PDFs de órdenes de trabajo con ETag, Last-Modified y Range.
+
+Permite que los clientes con conexiones lentas revaliden (304) en lugar de
+volver a descargar el PDF, y que los visores reanuden o salten a una página
+pidiendo solo los bytes que necesitan (206).
+
+Con ``asincrono=True`` (vistas ASGI) el cuerpo es un iterador async que lee el
+almacenamiento en un hilo aparte, así un cliente lento no ocupa el hilo que
+Django usa para el código sync.
+"""
+import hashlib
+import uuid
+from calendar import timegm
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .storage import CHUNK_SIZE
+
+# Más rangos que esto en una sola petición se ignoran y se envía el archivo completo
+MAX_RANGOS = 16
+
+
+class RangoNoSatisfacible(Exception):
+    """Ninguno de los rangos pedidos está dentro del archivo (416)"""
+
+
+def parsear_range(header, tamano):
+    """
+    Interpreta un header ``Range: bytes=...`` y retorna una lista de tuplas
+    (inicio, fin) inclusivas, o None si el header no es válido y debe ignorarse.
+    Lanza RangoNoSatisfacible si ningún rango cae dentro del archivo.
+    """
+    if not header:
+        return None
+    unidad, _, especificacion = header.partition('=')
+    if unidad.strip().lower() != 'bytes' or not especificacion:
+        return None
+
+    partes = [parte.strip() for parte in especificacion.split(',')]
+    if len(partes) > MAX_RANGOS:
+        return None
+
+    rangos = []
+    for parte in partes:
+        inicio, guion, fin = parte.partition('-')
+        if not guion:
+            return None
+        try:
+            if not inicio:
+                # Sufijo: los últimos N bytes
+                sufijo = int(fin)
+                if sufijo <= 0:
+                    continue
+                rangos.append((max(tamano - sufijo, 0), tamano - 1))
+                continue
+            inicio = int(inicio)
+            fin = int(fin) if fin else None
+        except ValueError:
+            return None
+        if inicio < 0 or (fin is not None and fin < inicio):
+            return None
+        if inicio >= tamano:
+            continue
+        if fin is None:
+            fin = tamano - 1
+        rangos.append((inicio, min(fin, tamano - 1)))
+
+    if not rangos:
+        raise RangoNoSatisfacible()
+    return rangos
+
+
+def _if_range_coincide(request, etag, last_modified):
+    """Un Range con If-Range solo se respeta si el recurso no cambió"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    fecha = parse_http_date_safe(if_range)
+    return fecha is not None and fecha == last_modified
+
+
+def _iterar_rango(abrir, inicio, fin, chunk_size=CHUNK_SIZE):
+    """Lee los bytes inicio..fin; el archivo se abre al empezar a iterar"""
+    archivo = abrir(inicio, fin)
+    try:
+        restante = fin - inicio + 1
+        while restante > 0:
+            bloque = archivo.read(min(chunk_size, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+    finally:
+        archivo.close()
+
+
+async def _aiterar_rango(abrir, inicio, fin, chunk_size=CHUNK_SIZE):
+    """Versión async de ``_iterar_rango``; las lecturas bloqueantes van al pool de hilos"""
+    en_hilo = partial(sync_to_async, thread_sensitive=False)
+    archivo = await en_hilo(abrir)(inicio, fin)
+    try:
+        restante = fin - inicio + 1
+        while restante > 0:
+            bloque = await en_hilo(archivo.read)(min(chunk_size, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+    finally:
+        await en_hilo(archivo.close)()
+
+
+def _info_pdf(producto):
+    """Retorna (tamaño, sha256, content_type) del PDF del producto, o None"""
+    documento = producto.get_documento()
+    if documento is not None:
+        return documento.tamano, documento.sha256, documento.content_type
+    if producto.orden_trabajo_pdf:
+        contenido = bytes(producto.orden_trabajo_pdf)
+        return len(contenido), hashlib.sha256(contenido).hexdigest(), 'application/pdf'
+    return None
+
+
+def respuesta_pdf(request, producto, filename, asincrono=False):
+    """
+    Construye la respuesta de descarga del PDF del producto (200, 206, 304,
+    412 o 416). Retorna None si el producto no tiene PDF.
+    """
+    info = _info_pdf(producto)
+    if info is None:
+        return None
+    tamano, sha256, content_type = info
+
+    etag = f'"{sha256}"'
+    last_modified = timegm(producto.fecha_actualizacion.utctimetuple())
+    cabeceras = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Accept-Ranges': 'bytes',
+        # Privado (requiere autenticación) y siempre revalidado con el ETag
+        'Cache-Control': 'private, no-cache',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for nombre, valor in cabeceras.items():
+            response[nombre] = valor
+        return response
+
+    rangos = None
+    if request.method in ('GET', 'HEAD') and _if_range_coincide(request, etag, last_modified):
+        try:
+            rangos = parsear_range(request.META.get('HTTP_RANGE'), tamano)
+        except RangoNoSatisfacible:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamano}'
+            return response
+
+    abrir = producto.abrir_pdf
+    iterar = _aiterar_rango if asincrono else _iterar_rango
+    if rangos is None and asincrono:
+        response = StreamingHttpResponse(
+            iterar(abrir, 0, tamano - 1), content_type=content_type
+        )
+        response['Content-Length'] = tamano
+    elif rangos is None:
+        response = FileResponse(abrir(), content_type=content_type)
+        response['Content-Length'] = tamano
+    elif len(rangos) == 1:
+        inicio, fin = rangos[0]
+        response = StreamingHttpResponse(
+            iterar(abrir, inicio, fin), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        response['Content-Length'] = fin - inicio + 1
+    else:
+        response = _respuesta_multirango(abrir, rangos, tamano, content_type, asincrono)
+
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    for nombre, valor in cabeceras.items():
+        response[nombre] = valor
+    return response
+
+
+def _respuesta_multirango(abrir, rangos, tamano, content_type, asincrono=False):
+    """Respuesta 206 multipart/byteranges con una parte por rango"""
+    boundary = uuid.uuid4().hex
+    encabezados = [
+        (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Range: bytes {inicio}-{fin}/{tamano}\r\n\r\n'
+        ).encode('ascii')
+        for inicio, fin in rangos
+    ]
+    cierre = f'\r\n--{boundary}--\r\n'.encode('ascii')
+
+    def contenido():
+        for encabezado, (inicio, fin) in zip(encabezados, rangos):
+            yield encabezado
+            yield from _iterar_rango(abrir, inicio, fin)
+        yield cierre
+
+    async def contenido_async():
+        for encabezado, (inicio, fin) in zip(encabezados, rangos):
+            yield encabezado
+            async for bloque in _aiterar_rango(abrir, inicio, fin):
+                yield bloque
+        yield cierre
+
+    longitud = (
+        sum(len(e) for e in encabezados)
+        + sum(fin - inicio + 1 for inicio, fin in rangos)
+        + len(cierre)
+    )
+    response = StreamingHttpResponse(
+        contenido_async() if asincrono else contenido(), status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = longitud
+    return response
@@ -0,0 +1,130 @@
+"""
+Estadísticas del catálogo (``/api/productos/estadisticas/``).
+
+Se calculan con una sola consulta de agregación y se guardan en la caché como
+contadores: total, con stock, con PDF y suma de precios en centavos. Los
+cambios de productos se aplican después como incrementos atómicos
+(``cache.incr``), sin volver a consultar la tabla:
+
+- ``save()`` y la eliminación lógica, desde las señales de ``signals.py``;
+- los cambios de stock (``reducir_stock``, ``aumentar_stock``, ``ajustar_stock``);
+- adjuntar o eliminar el PDF (señales de ``ProductoDocumento``).
+
+Las escrituras que no pasan por estos caminos (importación masiva, eliminación
+física) invalidan la entrada. Los contadores vencen a los
+``PRODUCTOS_ESTADISTICAS_MAX_EDAD`` segundos y se recalculan: ese es el
+desfase máximo si un incremento se cruza con un recálculo en otro proceso.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+PREFIJO = 'productos:estadisticas'
+CONTADORES = ('total', 'con_stock', 'con_pdf', 'suma_precios')
+MAX_EDAD = getattr(settings, 'PRODUCTOS_ESTADISTICAS_MAX_EDAD', 300)
+
+_CLAVES = {contador: f'{PREFIJO}:{contador}' for contador in CONTADORES}
+_CLAVE_CALCULADO = f'{PREFIJO}:calculado'
+
+
+def centavos(precio):
+    return int(Decimal(precio or 0) * 100)
+
+
+def calcular(queryset):
+    """Contadores del queryset en una sola consulta"""
+    datos = queryset.order_by().aggregate(
+        total=Count('pk'),
+        con_stock=Count('pk', filter=Q(stock__gt=0)),
+        con_pdf=Count('pk', filter=Q(documento__isnull=False) | Q(orden_trabajo_pdf__isnull=False)),
+        suma_precios=Sum('precio'),
+    )
+    datos['suma_precios'] = centavos(datos['suma_precios'])
+    return datos
+
+
+def obtener(fresh=False):
+    """
+    Contadores de todos los productos activos desde la caché, recalculándolos
+    si no están, vencieron o se pide ``fresh``.
+    """
+    if not fresh:
+        guardados = cache.get_many([*_CLAVES.values(), _CLAVE_CALCULADO])
+        if len(guardados) == len(_CLAVES) + 1:
+            datos = {contador: guardados[clave] for contador, clave in _CLAVES.items()}
+            datos['calculado'] = guardados[_CLAVE_CALCULADO]
+            return datos
+
+    from .models import Producto
+    datos = calcular(Producto.objects.filter(activo=True))
+    datos['calculado'] = timezone.now()
+    valores = {clave: datos[contador] for contador, clave in _CLAVES.items()}
+    valores[_CLAVE_CALCULADO] = datos['calculado']
+    cache.set_many(valores, timeout=MAX_EDAD)
+    return datos
+
+
+def como_respuesta(datos):
+    """Formato de la respuesta del endpoint"""
+    total = datos['total']
+    return {
+        'total_productos': total,
+        'productos_con_stock': datos['con_stock'],
+        'productos_con_pdf': datos['con_pdf'],
+        'precio_promedio': round(datos['suma_precios'] / total / 100, 2) if total else 0,
+    }
+
+
+def contribucion(activo, stock, precio, tiene_pdf=False):
+    """Lo que aporta un producto a cada contador"""
+    if not activo:
+        return dict.fromkeys(CONTADORES, 0)
+    return {
+        'total': 1,
+        'con_stock': int(stock is not None and stock > 0),
+        'con_pdf': int(bool(tiene_pdf)),
+        'suma_precios': centavos(precio),
+    }
+
+
+def diferencia(antes, despues):
+    return {contador: despues[contador] - antes[contador] for contador in CONTADORES}
+
+
+def invalidar():
+    cache.delete_many([*_CLAVES.values(), _CLAVE_CALCULADO])
+
+
+def _incrementar(cambios):
+    for contador, delta in cambios.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(_CLAVES[contador], delta)
+        except ValueError:
+            # La entrada no existe o venció: se recalculará al leerla
+            invalidar()
+            return
+
+
+def aplicar(cambios):
+    """Aplica incrementos a los contadores cuando se confirme la transacción"""
+    if any(cambios.values()):
+        transaction.on_commit(lambda: _incrementar(cambios))
+
+
+def aplicar_cambios_stock(cambios):
+    """Aplica cambios de stock ``[(activo, stock_anterior, stock_nuevo), ...]``"""
+    aplicar({'con_stock': sum(
+        int(nuevo > 0) - int(anterior is not None and anterior > 0)
+        for activo, anterior, nuevo in cambios
+        if activo
+    )})
+
+
+def invalidar_al_confirmar():
+    transaction.on_commit(invalidar)
@@ -0,0 +1,241 @@
+"""
+Exportación del catálogo de productos en CSV, JSON Lines o XLSX.
+
+Las filas se leen con ``values_list(...).iterator()`` (solo las columnas
+exportadas, por bloques y sin caché del queryset) y se escriben a medida que
+se envían, así que la memoria no crece con la cantidad de productos.
+
+El XLSX se genera sin dependencias: es un ZIP con las partes mínimas de
+SpreadsheetML escrito sobre un flujo no posicionable, con las celdas de texto
+en línea (``inlineStr``) para no tener que acumular una tabla de strings.
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# (campo, encabezado); tiene_pdf es la anotación de ProductoQuerySet.con_info_pdf
+COLUMNAS = [
+    ('id', 'ID'),
+    ('nombre', 'Nombre'),
+    ('precio', 'Precio'),
+    ('descripcion', 'Descripción'),
+    ('stock', 'Stock'),
+    ('numero_ot', 'Número Factura'),
+    ('tiene_pdf', 'PDF'),
+    ('fecha_creacion', 'Fecha Creación'),
+    ('fecha_actualizacion', 'Fecha Actualización'),
+]
+
+CHUNK_SIZE = 2000
+# Los bloques enviados al cliente se acumulan hasta este tamaño
+TAMANO_BLOQUE = 64 * 1024
+
+
+def filas(queryset, chunk_size=CHUNK_SIZE):
+    """Itera tuplas con los valores de COLUMNAS, sin cargar el queryset completo"""
+    campos = [campo for campo, _ in COLUMNAS]
+    return queryset.values_list(*campos).iterator(chunk_size=chunk_size)
+
+
+def _fecha_local(valor):
+    return timezone.localtime(valor) if timezone.is_aware(valor) else valor
+
+
+def _agrupar(partes):
+    """Junta partes pequeñas en bloques de ~TAMANO_BLOQUE antes de enviarlas"""
+    pendiente, tamano = [], 0
+    for parte in partes:
+        pendiente.append(parte)
+        tamano += len(parte)
+        if tamano >= TAMANO_BLOQUE:
+            yield ''.join(pendiente) if isinstance(parte, str) else b''.join(pendiente)
+            pendiente, tamano = [], 0
+    if pendiente:
+        yield ''.join(pendiente) if isinstance(pendiente[0], str) else b''.join(pendiente)
+
+
+class _Eco:
+    """Pseudo-archivo: ``write`` retorna lo escrito (para csv.writer)"""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(queryset):
+    escritor = csv.writer(_Eco())
+
+    def partes():
+        # BOM para que Excel reconozca el UTF-8 (acentos)
+        yield '\ufeff' + escritor.writerow([encabezado for _, encabezado in COLUMNAS])
+        for fila in filas(queryset):
+            yield escritor.writerow([
+                _fecha_local(valor).isoformat() if isinstance(valor, datetime)
+                else '' if valor is None else valor
+                for valor in fila
+            ])
+
+    return _agrupar(partes())
+
+
+def exportar_jsonl(queryset):
+    campos = [campo for campo, _ in COLUMNAS]
+
+    def valor_json(valor):
+        if isinstance(valor, datetime):
+            return _fecha_local(valor).isoformat()
+        return valor
+
+    def partes():
+        for fila in filas(queryset):
+            datos = dict(zip(campos, map(valor_json, fila)))
+            # Igual que la API: los decimales se envían como texto
+            datos['precio'] = str(datos['precio'])
+            yield json.dumps(datos, ensure_ascii=False) + '\n'
+
+    return _agrupar(partes())
+
+
+# --- XLSX -----------------------------------------------------------------
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+_XLSX_PARTES_FIJAS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Productos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilos: 0 normal, 1 encabezado en negrita, 2 fecha y hora
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _celda_xlsx(valor, estilo=None):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime):
+        serial = (timezone.make_naive(valor) if timezone.is_aware(valor) else valor) - _EPOCA_EXCEL
+        return f'<c s="2"><v>{serial.total_seconds() / 86400:.10f}</v></c>'
+    if isinstance(valor, (int, float)) or hasattr(valor, 'as_tuple'):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+    estilo = f' s="{estilo}"' if estilo else ''
+    return f'<c t="inlineStr"{estilo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _hoja_xlsx(queryset):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetData>'
+    )
+    encabezados = ''.join(_celda_xlsx(encabezado, estilo=1) for _, encabezado in COLUMNAS)
+    yield f'<row r="1">{encabezados}</row>'
+    for numero, fila in enumerate(filas(queryset), start=2):
+        yield f'<row r="{numero}">{"".join(_celda_xlsx(valor) for valor in fila)}</row>'
+    yield '</sheetData></worksheet>'
+
+
+class _SalidaZip(io.RawIOBase):
+    """Destino del ZipFile: acumula lo escrito hasta que el generador lo retira"""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def exportar_xlsx(queryset):
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, contenido in _XLSX_PARTES_FIJAS.items():
+            archivo.writestr(nombre, contenido)
+        yield salida.retirar()
+
+        with archivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            for bloque in _agrupar(_hoja_xlsx(queryset)):
+                hoja.write(bloque.encode('utf-8'))
+                datos = salida.retirar()
+                if datos:
+                    yield datos
+    yield salida.retirar()
+
+
+EXPORTADORES = {
+    'csv': exportar_csv,
+    'jsonl': exportar_jsonl,
+    'xlsx': exportar_xlsx,
+}
+
+
+def exportar(queryset, formato):
+    """Retorna (iterador de bloques, content_type, extensión) para el formato"""
+    content_type, extension = FORMATOS[formato]
+    return EXPORTADORES[formato](queryset), content_type, extension
@@ -0,0 +1,24 @@
+"""
+Hashers de contraseñas con costo configurable (ver PASSWORD_HASHER en settings_base.py).
+
+Verificar la contraseña es casi todo el costo de CPU de un login. Los valores
+por defecto de Django apuntan a servidores grandes: PBKDF2 con 1.000.000 de
+iteraciones y Argon2 con 100 MiB y 8 hilos por hash. Estas clases toman el
+costo de los settings. Django vuelve a hashear la contraseña en el siguiente
+login exitoso cuando el hash guardado usa otro algoritmo u otros parámetros
+(``must_update``), así que cambiar la configuración no obliga a resetear nada.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class Argon2Ajustado(Argon2PasswordHasher):
+    """Argon2id con ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) y ARGON2_PARALLELISM"""
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class PBKDF2Ajustado(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 con PBKDF2_ITERATIONS iteraciones"""
+    iterations = getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -3,13 +3,132 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import connection
+from django.conf import settings
 from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 import logging
 import time
+import uuid
 from datetime import datetime
 
+from mi_proyecto import metricas as metricas_http
+
+from . import cache_respuestas
+
 logger = logging.getLogger(__name__)
 
+def verificar_base_datos():
+    """Chequeo de la conexión a la base de datos"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        return {
+            'status': 'ok',
+            'message': 'Database connection successful'
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Database connection failed: {str(e)}'
+        }
+
+
+def verificar_cache():
+    """Chequeo de la caché (compartida entre workers si se usa Redis)"""
+    try:
+        # Clave única para no interferir con otros workers que hagan el mismo chequeo
+        cache_key = f'health_check_test:{uuid.uuid4().hex}'
+        cache.set(cache_key, 'test_value', 30)
+        cached_value = cache.get(cache_key)
+        cache.delete(cache_key)
+        if cached_value == 'test_value':
+            return {
+                'status': 'ok',
+                'message': 'Cache is working',
+                'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+            }
+        return {
+            'status': 'warning',
+            'message': 'Cache test failed'
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Cache failed: {str(e)}'
+        }
+
+
+def verificar_cache_respuestas():
+    """Aciertos de la caché de respuestas del listado/detalle de productos"""
+    try:
+        return {
+            'status': 'ok',
+            **cache_respuestas.metricas()
+        }
+    except Exception as e:
+        return {
+            'status': 'warning',
+            'message': f'Response cache metrics unavailable: {str(e)}'
+        }
+
+
+def resultado_health(checks, start_time):
+    """
+    Arma la respuesta del health check a partir de los chequeos.
+    Retorna (datos, status_code).
+    """
+    health_status = {
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'version': '1.0.0',
+        'checks': dict(checks)
+    }
+    if checks['database']['status'] == 'error':
+        health_status['status'] = 'unhealthy'
+
+    # Verificar tiempo de respuesta
+    response_time = (time.time() - start_time) * 1000  # en milisegundos
+    health_status['checks']['response_time'] = {
+        'status': 'ok' if response_time < 1000 else 'warning',
+        'value': f'{response_time:.2f}ms',
+        'message': 'Response time acceptable' if response_time < 1000 else 'Response time slow'
+    }
+
+    # Información del sistema
+    health_status['system'] = {
+        'python_version': '3.13.4',
+        'django_version': '5.2.6',
+        'environment': 'production'
+    }
+
+    # Determinar estado general
+    if health_status['status'] == 'healthy':
+        # Verificar si hay warnings
+        warnings = [check for check in health_status['checks'].values()
+                   if check.get('status') == 'warning']
+        if warnings:
+            health_status['status'] = 'degraded'
+
+    # Log del health check (se consulta seguido: solo en DEBUG)
+    logger.debug('Health check completed: %s in %.2fms', health_status['status'], response_time)
+
+    # Status code apropiado
+    if health_status['status'] in ('healthy', 'degraded'):
+        return health_status, status.HTTP_200_OK
+    return health_status, status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def error_health(e):
+    logger.error('Health check failed: %s', e)
+    return {
+        'status': 'error',
+        'timestamp': datetime.now().isoformat(),
+        'message': f'Health check failed: {str(e)}'
+    }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
@@ -22,92 +141,24 @@ def health_check(request):
     - Tiempo de respuesta
     """
     start_time = time.time()
-    health_status = {
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0',
-        'checks': {}
-    }
-    
     try:
-        # 1. Verificar conexión a la base de datos
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT 1")
-                db_result = cursor.fetchone()
-            health_status['checks']['database'] = {
-                'status': 'ok',
-                'message': 'Database connection successful'
-            }
-        except Exception as e:
-            health_status['checks']['database'] = {
-                'status': 'error',
-                'message': f'Database connection failed: {str(e)}'
-            }
-            health_status['status'] = 'unhealthy'
-        
-        # 2. Verificar cache
-        try:
-            cache_key = 'health_check_test'
-            cache.set(cache_key, 'test_value', 30)
-            cached_value = cache.get(cache_key)
-            if cached_value == 'test_value':
-                health_status['checks']['cache'] = {
-                    'status': 'ok',
-                    'message': 'Cache is working'
-                }
-            else:
-                health_status['checks']['cache'] = {
-                    'status': 'warning',
-                    'message': 'Cache test failed'
-                }
-        except Exception as e:
-            health_status['checks']['cache'] = {
-                'status': 'error',
-                'message': f'Cache failed: {str(e)}'
-            }
-        
-        # 3. Verificar tiempo de respuesta
-        response_time = (time.time() - start_time) * 1000  # en milisegundos
-        health_status['checks']['response_time'] = {
-            'status': 'ok' if response_time < 1000 else 'warning',
-            'value': f'{response_time:.2f}ms',
-            'message': 'Response time acceptable' if response_time < 1000 else 'Response time slow'
-        }
-        
-        # 4. Información del sistema
-        health_status['system'] = {
-            'python_version': '3.13.4',
-            'django_version': '5.2.6',
-            'environment': 'production'
-        }
-        
-        # Determinar estado general
-        if health_status['status'] == 'healthy':
-            # Verificar si hay warnings
-            warnings = [check for check in health_status['checks'].values() 
-                       if check.get('status') == 'warning']
-            if warnings:
-                health_status['status'] = 'degraded'
-        
-        # Log del health check
-        logger.info(f"Health check completed: {health_status['status']} in {response_time:.2f}ms")
-        
-        # Retornar status code apropiado
-        if health_status['status'] == 'healthy':
-            return Response(health_status, status=status.HTTP_200_OK)
-        elif health_status['status'] == 'degraded':
-            return Response(health_status, status=status.HTTP_200_OK)
-        else:
-            return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
+        datos, codigo = resultado_health({
+            'database': verificar_base_datos(),
+            'cache': verificar_cache(),
+            'response_cache': verificar_cache_respuestas(),
+        }, start_time)
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return Response({
-            'status': 'error',
-            'timestamp': datetime.now().isoformat(),
-            'message': f'Health check failed: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        datos, codigo = error_health(e)
+    return Response(datos, status=codigo)
+
+
+def datos_ping():
+    return {
+        'status': 'ok',
+        'timestamp': datetime.now().isoformat(),
+        'message': 'API is alive'
+    }
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -116,11 +167,30 @@ def simple_ping(request):
     Endpoint simple de ping para monitoreo básico.
     Muy ligero, ideal para Pulsetic.
     """
-    return Response({
-        'status': 'ok',
-        'timestamp': datetime.now().isoformat(),
-        'message': 'API is alive'
-    }, status=status.HTTP_200_OK)
+    return Response(datos_ping(), status=status.HTTP_200_OK)
+
+def metrics(request):
+    """
+    Métricas en el formato de texto de Prometheus: las HTTP por ruta de todos
+    los workers (ver mi_proyecto/metricas.py) y los aciertos de la caché de
+    respuestas. Exige 'Authorization: Bearer <METRICAS_TOKEN>'; sin token
+    configurado solo responde con DEBUG.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+    lineas = metricas_http.texto_prometheus()
+    aciertos = cache_respuestas.metricas()
+    lineas += metricas_http.familia(
+        'productos_cache_respuestas_total', 'counter', 'Lecturas de la caché de respuestas',
+        [('', metricas_http.formato_etiquetas(('resultado',), (resultado,)), aciertos[resultado])
+         for resultado in ('hits', 'misses', 'bypass')],
+    )
+    return HttpResponse('\n'.join(lineas) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
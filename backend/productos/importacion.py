@@ -0,0 +1,246 @@
+"""
+Importación masiva de productos desde CSV o JSON Lines.
+
+La entrada se lee como un flujo y se procesa por lotes: cada lote se valida
+fila por fila con ``ProductoImportSerializer``, los nombres duplicados se
+resuelven con una sola consulta por lote y las filas válidas se escriben con
+un único ``bulk_create(update_conflicts=True)``. Los productos se identifican
+por nombre (sin distinguir mayúsculas): si ya existe uno activo con ese nombre
+se actualiza, o se informa como error con ``actualizar=False``.
+
+Cada lote se confirma en su propia transacción, de modo que un archivo grande
+no mantiene una transacción abierta de principio a fin. Si la importación se
+corta a mitad, ``ImportacionInterrumpida`` lleva el resultado de los lotes ya
+confirmados.
+"""
+import codecs
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import cache_respuestas, estadisticas
+from .models import Producto
+from .serializers import NOMBRE_DUPLICADO, ProductoImportSerializer, es_nombre_duplicado
+
+FORMATOS = ('csv', 'jsonl')
+TAMANO_LOTE = 500
+# Errores que se conservan para el reporte; el resto solo se cuenta
+MAX_ERRORES = 1000
+
+CAMPOS_IMPORTACION = ProductoImportSerializer.Meta.fields
+
+
+class FormatoInvalido(Exception):
+    """El archivo no se puede interpretar con el formato indicado"""
+
+
+class ImportacionInterrumpida(Exception):
+    """
+    La importación se cortó a mitad (ver ``__cause__``). ``resultado`` tiene
+    los lotes ya confirmados, que quedan guardados.
+    """
+
+    def __init__(self, resultado):
+        super().__init__('La importación se interrumpió')
+        self.resultado = resultado
+
+
+@dataclass
+class ResultadoImportacion:
+    filas: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    fallidos: int = 0
+    errores: list = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return round(self.filas / self.segundos, 1) if self.segundos else float(self.filas)
+
+    def agregar_error(self, fila, errores):
+        self.fallidos += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': fila, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'filas': self.filas,
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'fallidos': self.fallidos,
+            'errores': self.errores,
+            'segundos': round(self.segundos, 3),
+            'filas_por_segundo': self.filas_por_segundo,
+        }
+
+
+def detectar_formato(nombre_archivo, formato=None):
+    """Formato explícito o, si no se indica, por la extensión del archivo"""
+    if not formato:
+        extension = (nombre_archivo or '').rsplit('.', 1)[-1].lower()
+        formato = 'jsonl' if extension in ('jsonl', 'ndjson') else extension
+    if formato not in FORMATOS:
+        raise FormatoInvalido(f"Formato no soportado: {formato}. Use csv o jsonl")
+    return formato
+
+
+def leer_filas(lineas, formato):
+    """
+    Itera ``(numero_de_fila, datos)`` a partir de un iterable de líneas en
+    bytes (un archivo abierto en modo binario o un UploadedFile). Las filas
+    que no se pueden interpretar se entregan con ``datos`` = mensaje de error.
+    """
+    texto = codecs.iterdecode(lineas, 'utf-8-sig')
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        if lector.fieldnames is None:
+            return
+        if 'nombre' not in lector.fieldnames:
+            raise FormatoInvalido("El CSV debe tener una columna 'nombre'")
+        for fila in lector:
+            # En CSV una celda vacía significa "sin valor"
+            yield lector.line_num, {
+                campo: (valor.strip() or None) if isinstance(valor, str) else valor
+                for campo, valor in fila.items()
+                if campo in CAMPOS_IMPORTACION
+            }
+    else:
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError as e:
+                yield numero, f'JSON inválido: {e}'
+                continue
+            if not isinstance(datos, dict):
+                yield numero, 'Cada línea debe ser un objeto JSON'
+                continue
+            yield numero, datos
+
+
+class ImportadorProductos:
+    """Valida y escribe productos por lotes"""
+
+    def __init__(self, actualizar=True, tamano_lote=TAMANO_LOTE):
+        self.actualizar = actualizar
+        self.tamano_lote = tamano_lote
+        # Nombres ya vistos en este archivo -> fila donde aparecieron
+        self._nombres_vistos = {}
+
+    def importar(self, filas):
+        """Importa un iterable de ``(numero_de_fila, datos)`` y retorna el resultado"""
+        resultado = ResultadoImportacion()
+        inicio = time.monotonic()
+        filas = iter(filas)
+        try:
+            while True:
+                lote = list(islice(filas, self.tamano_lote))
+                if not lote:
+                    break
+                resultado.filas += len(lote)
+                self._importar_lote(lote, resultado)
+        except Exception as e:
+            raise ImportacionInterrumpida(resultado) from e
+        finally:
+            resultado.segundos = time.monotonic() - inicio
+        return resultado
+
+    def _existentes(self, claves):
+        """Productos activos con esos nombres (en minúsculas) -> pk, en una consulta"""
+        return {
+            nombre.lower(): pk
+            for nombre, pk in Producto.objects.filter(activo=True)
+            .annotate(nombre_minusculas=Lower('nombre'))
+            .filter(nombre_minusculas__in=claves)
+            .values_list('nombre', 'pk')
+        }
+
+    def _escribir(self, grupos):
+        with transaction.atomic():
+            for campos, filas in grupos.items():
+                Producto.objects.bulk_create(
+                    [producto for _, producto in filas],
+                    batch_size=self.tamano_lote,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=[*campos, 'fecha_actualizacion'],
+                )
+            # bulk_create no pasa por save(): los contadores y las respuestas
+            # cacheadas se invalidan al confirmar cada lote
+            estadisticas.invalidar_al_confirmar()
+            cache_respuestas.invalidar()
+
+    def _importar_lote(self, lote, resultado):
+        validas = []
+        for numero, datos in lote:
+            if isinstance(datos, str):
+                resultado.agregar_error(numero, {'fila': [datos]})
+                continue
+            serializer = ProductoImportSerializer(data=datos)
+            if not serializer.is_valid():
+                resultado.agregar_error(numero, serializer.errors)
+                continue
+
+            clave = serializer.validated_data['nombre'].lower()
+            if clave in self._nombres_vistos:
+                resultado.agregar_error(numero, {'nombre': [
+                    f'Nombre repetido en el archivo (fila {self._nombres_vistos[clave]})'
+                ]})
+                continue
+            self._nombres_vistos[clave] = numero
+            validas.append((numero, clave, serializer.validated_data))
+
+        if not validas:
+            return
+
+        # Una sola consulta para todos los nombres del lote
+        existentes = self._existentes([clave for _, clave, _ in validas])
+
+        ahora = timezone.now()
+        # Se agrupan por columnas presentes: un upsert solo sobrescribe las
+        # columnas que trae la fila (normalmente hay un solo grupo)
+        grupos = {}
+        actualizaciones = set()
+        for numero, clave, datos in validas:
+            pk = existentes.get(clave)
+            if pk is not None and not self.actualizar:
+                resultado.agregar_error(numero, {'nombre': [NOMBRE_DUPLICADO]})
+                continue
+            if pk is not None:
+                actualizaciones.add(numero)
+            grupos.setdefault(tuple(sorted(datos)), []).append(
+                (numero, Producto(pk=pk, fecha_actualizacion=ahora, **datos))
+            )
+
+        if not grupos:
+            return
+        try:
+            self._escribir(grupos)
+            escritas = [numero for filas in grupos.values() for numero, _ in filas]
+        except IntegrityError as e:
+            if not es_nombre_duplicado(e):
+                raise
+            # Otro request creó alguno de estos nombres después de la consulta:
+            # se reintenta fila por fila y esas filas se informan como error
+            escritas = []
+            for campos, filas in grupos.items():
+                for numero, producto in filas:
+                    try:
+                        self._escribir({campos: [(numero, producto)]})
+                    except IntegrityError as error:
+                        if not es_nombre_duplicado(error):
+                            raise
+                        resultado.agregar_error(numero, {'nombre': [NOMBRE_DUPLICADO]})
+                    else:
+                        escritas.append(numero)
+        actualizados = len(actualizaciones.intersection(escritas))
+        resultado.actualizados += actualizados
+        resultado.creados += len(escritas) - actualizados
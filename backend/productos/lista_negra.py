@@ -0,0 +1,105 @@
+"""
+Lista negra de refresh tokens con lectura desde la caché compartida.
+
+simplejwt consulta ``BlacklistedToken`` cada vez que se usa un refresh token y
+escribe con varios ``get_or_create`` al revocarlo. Aquí el estado de cada
+``jti`` se guarda en la caché hasta que el token vence:
+
+- al emitir un token se marca como vigente (nadie más lo conoce todavía);
+- al revocarlo se marca como revocado cuando se confirma la transacción;
+- si la entrada no está (se desalojó o se reinició la caché) se consulta la
+  tabla y el resultado se guarda con ``add``, sin pisar una revocación que
+  haya llegado mientras tanto.
+
+Así la caché solo acelera: la tabla sigue siendo la fuente de verdad. Las
+escrituras de una rotación (revocar el token usado y registrar el nuevo) son
+dos INSERT en una transacción. Los tokens vencidos se borran con
+``python manage.py podar_tokens``.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+PREFIJO = 'auth:jti'
+VIGENTE = 0
+REVOCADO = 1
+
+
+def _clave(jti):
+    return f'{PREFIJO}:{jti}'
+
+
+def _segundos_restantes(token):
+    """Tiempo de vida que le queda al token (mínimo 1 segundo)"""
+    restante = datetime_from_epoch(token['exp']) - timezone.now()
+    return max(int(restante.total_seconds()), 1)
+
+
+def esta_revocado(token):
+    jti = token[api_settings.JTI_CLAIM]
+    estado = cache.get(_clave(jti))
+    if estado is None:
+        revocado = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        estado = REVOCADO if revocado else VIGENTE
+        cache.add(_clave(jti), estado, timeout=_segundos_restantes(token))
+    return estado == REVOCADO
+
+
+def _outstanding(token):
+    return OutstandingToken(
+        user_id=token.get(api_settings.USER_ID_CLAIM),
+        jti=token[api_settings.JTI_CLAIM],
+        token=str(token),
+        created_at=datetime_from_epoch(token['iat']) if 'iat' in token else None,
+        expires_at=datetime_from_epoch(token['exp']),
+    )
+
+
+def _blacklisted(token):
+    outstanding = OutstandingToken.objects.filter(
+        jti=token[api_settings.JTI_CLAIM]
+    ).order_by().values('id')
+    return BlacklistedToken(token_id=Subquery(outstanding))
+
+
+def registrar_en_cache(*tokens):
+    """Marca como vigentes tokens recién emitidos"""
+    for token in tokens:
+        cache.add(_clave(token[api_settings.JTI_CLAIM]), VIGENTE, timeout=_segundos_restantes(token))
+
+
+def registrar(*tokens):
+    """Registra tokens recién emitidos (un INSERT) y los marca como vigentes"""
+    OutstandingToken.objects.bulk_create(
+        [_outstanding(token) for token in tokens], ignore_conflicts=True
+    )
+    registrar_en_cache(*tokens)
+
+
+def _marcar_revocados(tokens):
+    cache.set_many(
+        {_clave(token[api_settings.JTI_CLAIM]): REVOCADO for token in tokens},
+        # Todos vencen juntos en la práctica; basta con el más largo
+        timeout=max(_segundos_restantes(token) for token in tokens),
+    )
+
+
+def revocar(*tokens, nuevos=()):
+    """
+    Revoca ``tokens`` y registra ``nuevos`` con dos INSERT en una transacción
+    (el token usado puede no estar registrado si se emitió antes de activar la
+    lista negra). La caché se actualiza al confirmar.
+    """
+    with transaction.atomic():
+        OutstandingToken.objects.bulk_create(
+            [_outstanding(token) for token in (*tokens, *nuevos)], ignore_conflicts=True
+        )
+        BlacklistedToken.objects.bulk_create(
+            [_blacklisted(token) for token in tokens], ignore_conflicts=True
+        )
+        transaction.on_commit(lambda: _marcar_revocados(tokens))
+    registrar_en_cache(*nuevos)
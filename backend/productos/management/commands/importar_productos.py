@@ -0,0 +1,75 @@
+"""
+Importa productos desde un archivo CSV o JSON Lines.
+
+    python manage.py importar_productos catalogo.csv
+    python manage.py importar_productos catalogo.jsonl --lote 1000 --no-actualizar
+    cat catalogo.csv | python manage.py importar_productos - --formato csv
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.importacion import (
+    TAMANO_LOTE, FormatoInvalido, ImportacionInterrumpida, ImportadorProductos, detectar_formato,
+    leer_filas,
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa o actualiza productos desde un archivo CSV o JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o '-' para leer de la entrada estándar")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help=f'Filas por lote (por defecto {TAMANO_LOTE})')
+        parser.add_argument('--no-actualizar', action='store_true',
+                            help='Informar como error los nombres existentes en lugar de actualizarlos')
+        parser.add_argument('--max-errores', type=int, default=20,
+                            help='Errores a mostrar en el resumen')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if options['lote'] <= 0:
+            raise CommandError('--lote debe ser mayor a 0')
+        try:
+            formato = detectar_formato(ruta, options['formato'])
+        except FormatoInvalido as e:
+            raise CommandError(str(e))
+
+        importador = ImportadorProductos(
+            actualizar=not options['no_actualizar'],
+            tamano_lote=options['lote'],
+        )
+        try:
+            if ruta == '-':
+                resultado = importador.importar(leer_filas(sys.stdin.buffer, formato))
+            else:
+                with open(ruta, 'rb') as archivo:
+                    resultado = importador.importar(leer_filas(archivo, formato))
+        except OSError as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+        except ImportacionInterrumpida as e:
+            self.resumen(e.resultado, options['max_errores'])
+            causa = e.__cause__
+            if isinstance(causa, (FormatoInvalido, UnicodeDecodeError)):
+                raise CommandError(f'Archivo inválido: {causa}')
+            if isinstance(causa, OSError):
+                raise CommandError(f'No se pudo leer {ruta}: {causa}')
+            raise
+
+        self.resumen(resultado, options['max_errores'])
+
+    def resumen(self, resultado, max_errores):
+        """Errores por fila y totales; tras una interrupción, los lotes ya guardados"""
+        for error in resultado.errores[:max_errores]:
+            self.stderr.write(f"Fila {error['fila']}: {error['errores']}")
+        if resultado.fallidos > max_errores:
+            self.stderr.write(f"... y {resultado.fallidos - max_errores} errores más")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.filas} filas en {resultado.segundos:.2f}s '
+            f'({resultado.filas_por_segundo} filas/s): {resultado.creados} creados, '
+            f'{resultado.actualizados} actualizados, {resultado.fallidos} con errores'
+        ))
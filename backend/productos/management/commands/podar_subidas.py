@@ -0,0 +1,20 @@
+"""
+Borra las subidas reanudables de PDFs abandonadas y lo que recibieron.
+
+    python manage.py podar_subidas
+
+Una subida vence si pasan SUBIDAS_EXPIRACION segundos sin recibir bloques.
+También se borran los archivos parciales que quedaron sin su subida. Conviene
+programarlo una vez por hora en cada servidor que reciba subidas (ver README).
+"""
+from django.core.management.base import BaseCommand
+
+from productos import subidas
+
+
+class Command(BaseCommand):
+    help = 'Borra las subidas de PDFs vencidas y sus archivos parciales'
+
+    def handle(self, *args, **options):
+        total = subidas.podar()
+        self.stdout.write(self.style.SUCCESS(f'{total} subidas vencidas eliminadas'))
@@ -0,0 +1,41 @@
+"""
+Borra los refresh tokens vencidos de la lista negra de simplejwt.
+
+    python manage.py podar_tokens
+    python manage.py podar_tokens --lote 1000
+
+Un token vencido ya no pasa la verificación, así que su registro y su entrada
+en la lista negra no sirven para nada. Se borra de a lotes (cada uno en su
+propia transacción) para no bloquear las tablas mientras se rotan tokens.
+Conviene programarlo una vez al día (ver README).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Borra los refresh tokens vencidos y su entrada en la lista negra'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Tokens a borrar por transacción (por defecto 5000)')
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0:
+            raise CommandError('--lote debe ser mayor a 0')
+
+        ahora = timezone.now()
+        vencidos = OutstandingToken.objects.filter(expires_at__lte=ahora).order_by('expires_at')
+        total = 0
+        while True:
+            ids = list(vencidos.values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} tokens vencidos eliminados'))
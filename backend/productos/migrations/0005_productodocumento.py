@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_alter_producto_options_producto_activo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('storage_key', models.CharField(help_text='Clave del archivo en el almacenamiento de PDFs', max_length=255, unique=True)),
+                ('nombre_archivo', models.CharField(blank=True, default='', max_length=255)),
+                ('content_type', models.CharField(default='application/pdf', max_length=100)),
+                ('tamano', models.PositiveBigIntegerField(help_text='Tamaño en bytes')),
+                ('sha256', models.CharField(help_text='Hash SHA-256 del contenido', max_length=64)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='documento', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Documento de producto',
+                'verbose_name_plural': 'Documentos de productos',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:25
+
+import io
+
+from django.db import migrations
+
+
+def mover_pdfs_a_almacenamiento(apps, schema_editor):
+    """Mueve los PDFs de la columna orden_trabajo_pdf al almacenamiento de PDFs"""
+    from productos.storage import get_pdf_storage
+
+    Producto = apps.get_model('productos', 'Producto')
+    ProductoDocumento = apps.get_model('productos', 'ProductoDocumento')
+    storage = get_pdf_storage()
+
+    pendientes = (
+        Producto.objects
+        .filter(orden_trabajo_pdf__isnull=False, documento__isnull=True)
+        .values_list('id', flat=True)
+    )
+    # Un producto por vez para no cargar más de un PDF en memoria
+    for producto_id in list(pendientes):
+        contenido = Producto.objects.filter(id=producto_id).values_list(
+            'orden_trabajo_pdf', flat=True
+        ).get()
+        if contenido:
+            guardado = storage.save(storage.generar_key(producto_id), io.BytesIO(bytes(contenido)))
+            ProductoDocumento.objects.create(
+                producto_id=producto_id,
+                storage_key=guardado.key,
+                nombre_archivo=f'orden_trabajo_{producto_id}.pdf',
+                content_type='application/pdf',
+                tamano=guardado.tamano,
+                sha256=guardado.sha256,
+            )
+        Producto.objects.filter(id=producto_id).update(orden_trabajo_pdf=None)
+
+
+def devolver_pdfs_a_tabla(apps, schema_editor):
+    """Operación inversa: copia los PDFs del almacenamiento de vuelta a la columna"""
+    from productos.storage import get_pdf_storage
+
+    Producto = apps.get_model('productos', 'Producto')
+    ProductoDocumento = apps.get_model('productos', 'ProductoDocumento')
+    storage = get_pdf_storage()
+
+    for documento in ProductoDocumento.objects.all().iterator():
+        with storage.open(documento.storage_key) as archivo:
+            contenido = archivo.read()
+        Producto.objects.filter(id=documento.producto_id).update(orden_trabajo_pdf=contenido)
+        documento.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_productodocumento'),
+    ]
+
+    operations = [
+        migrations.RunPython(mover_pdfs_a_almacenamiento, devolver_pdfs_a_tabla),
+    ]
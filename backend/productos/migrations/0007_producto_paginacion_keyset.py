@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_mover_pdfs_a_almacenamiento'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='producto',
+            options={'ordering': ['-fecha_creacion', '-id'], 'verbose_name': 'Producto', 'verbose_name_plural': 'Productos'},
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='producto_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:40
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Cast, Upper
+
+from productos.db import SoloPostgres
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0007_producto_paginacion_keyset'),
+    ]
+
+    operations = [
+        # TrigramExtension no hace nada fuera de PostgreSQL
+        TrigramExtension(),
+        # Trigramas sobre UPPER(nombre::text): lo usa nombre__icontains (?nombre= y ?q=)
+        SoloPostgres(migrations.AddIndex(
+            model_name='producto',
+            index=GinIndex(
+                OpClass(Upper(Cast('nombre', output_field=models.TextField())), name='gin_trgm_ops'),
+                name='producto_nombre_trgm_idx',
+            ),
+        )),
+        # Texto completo ponderado sobre nombre y descripción (?q=), con el
+        # diccionario 'spanish'. Las expresiones se copian aquí en lugar de
+        # importarlas de productos.busqueda para que la migración no cambie
+        # con ese módulo ni con PRODUCTOS_BUSQUEDA_CONFIG
+        SoloPostgres(migrations.AddIndex(
+            model_name='producto',
+            index=GinIndex(
+                SearchVector('nombre', weight='A', config='spanish')
+                + SearchVector('descripcion', weight='B', config='spanish'),
+                name='producto_busqueda_gin_idx',
+            ),
+        )),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índice sobre expires_at de los refresh tokens registrados por simplejwt,
+    para que ``podar_tokens`` encuentre los vencidos sin recorrer la tabla.
+    La tabla es de otra app, por eso va como SQL (válido en PostgreSQL y SQLite).
+    """
+
+    dependencies = [
+        ('productos', '0009_movimientostock'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS outstandingtoken_expires_at_idx '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX IF EXISTS outstandingtoken_expires_at_idx',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:12
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0010_indice_tokens_vencidos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaPDF',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tamano', models.PositiveBigIntegerField(help_text='Tamaño total declarado en bytes')),
+                ('nombre_archivo', models.CharField(blank=True, default='', max_length=255)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('expira', models.DateTimeField(db_index=True, help_text='Se extiende con cada bloque recibido')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_pdf', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida de PDF',
+                'verbose_name_plural': 'Subidas de PDF',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
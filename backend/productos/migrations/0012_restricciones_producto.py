@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+def corregir_filas_invalidas(apps, schema_editor):
+    """
+    Antes solo validaban los serializers, así que puede haber filas que
+    impedirían crear las restricciones. El stock negativo queda en 0 y el
+    número de OT inválido se vacía; un precio no se puede inventar, así que
+    si hay alguno menor o igual a 0 la migración se detiene antes de agregar
+    ninguna restricción e indica qué productos corregir.
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    sin_precio = list(Producto.objects.filter(precio__lte=0).values_list('pk', flat=True)[:50])
+    if sin_precio:
+        raise RuntimeError(
+            'Hay productos con precio menor o igual a 0 (ids: %s). Corrija sus '
+            'precios y vuelva a ejecutar la migración.' % ', '.join(map(str, sin_precio))
+        )
+    Producto.objects.filter(stock__lt=0).update(stock=0)
+    Producto.objects.filter(numero_ot__lte=0).update(numero_ot=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0011_subidapdf'),
+    ]
+
+    operations = [
+        migrations.RunPython(corregir_filas_invalidas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('precio__gt', 0)), name='producto_precio_positivo', violation_error_message='El precio debe ser mayor a 0'),
+        ),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__isnull', True), ('stock__gte', 0), _connector='OR'), name='producto_stock_no_negativo', violation_error_message='El stock no puede ser negativo'),
+        ),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('numero_ot__isnull', True), ('numero_ot__gt', 0), _connector='OR'), name='producto_numero_ot_positivo', violation_error_message='El número de OT debe ser mayor a 0'),
+        ),
+    ]
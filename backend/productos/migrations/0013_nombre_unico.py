@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+def renombrar_duplicados(apps, schema_editor):
+    """
+    La validación anterior (una consulta antes de guardar) dejaba pasar nombres
+    repetidos entre requests simultáneos, que impedirían crear el índice. Se
+    conserva el producto más antiguo de cada nombre y a los demás se les
+    agrega su id.
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    activos = Producto.objects.filter(activo=True).annotate(clave=Lower('nombre'))
+    repetidos = (
+        activos.values('clave')
+        .annotate(cantidad=Count('id'), primero=Min('id'))
+        .filter(cantidad__gt=1)
+    )
+    for grupo in list(repetidos):
+        for pk, nombre in activos.filter(clave=grupo['clave']).exclude(pk=grupo['primero']).values_list('pk', 'nombre'):
+            sufijo = f' ({pk})'
+            Producto.objects.filter(pk=pk).update(nombre=nombre[:255 - len(sufijo)] + sufijo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0012_restricciones_producto'),
+    ]
+
+    operations = [
+        migrations.RunPython(renombrar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('nombre'), condition=models.Q(('activo', True)), name='producto_nombre_activo_unico', violation_error_message='Ya existe un producto con este nombre'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:40
+
+from django.db import migrations, models
+
+from productos.db import AgregarIndiceConcurrente, QuitarIndiceConcurrente
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY no puede correr dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('productos', '0013_nombre_unico'),
+    ]
+
+    operations = [
+        AgregarIndiceConcurrente(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-fecha_creacion', '-id'], name='producto_activo_fecha_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['precio'], name='producto_activo_precio_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True), ('stock__gt', 0)), fields=['-fecha_creacion', '-id'], name='producto_con_stock_fecha_idx'),
+        ),
+        AgregarIndiceConcurrente(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('orden_trabajo_pdf__isnull', False)), fields=['id'], name='producto_pdf_heredado_idx'),
+        ),
+        # precio, activo y (fecha, id) los reemplazan los parciales. El de nombre
+        # no tiene reemplazo: ninguna consulta filtra nombre = ... ni ordena por
+        # nombre; ?nombre= usa el GIN de trigramas de 0008 y el importador,
+        # LOWER(nombre) entre los activos, que cubre el índice único de 0013
+        QuitarIndiceConcurrente(
+            model_name='producto',
+            name='productos_p_nombre_456643_idx',
+        ),
+        QuitarIndiceConcurrente(
+            model_name='producto',
+            name='productos_p_precio_d043df_idx',
+        ),
+        QuitarIndiceConcurrente(
+            model_name='producto',
+            name='productos_p_activo_31f808_idx',
+        ),
+        QuitarIndiceConcurrente(
+            model_name='producto',
+            name='producto_fecha_id_idx',
+        ),
+    ]
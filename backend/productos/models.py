@@ -1,25 +1,181 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from contextlib import contextmanager
+from contextvars import ContextVar
+import io
+import logging
 import os
+import uuid
+
+from . import cache_respuestas, estadisticas
+from .db import OctetLength, update_returning
+from .storage import get_pdf_storage
+
+logger = logging.getLogger(__name__)
+
+# Columnas que nunca se cargan al listar o serializar productos
+COLUMNAS_DIFERIDAS = {'orden_trabajo_pdf'}
 
 def validate_pdf_file(value):
     """Validador para archivos PDF"""
     if value:
-        # Convertir a bytes si es memoryview
-        if hasattr(value, 'tobytes'):
-            value_bytes = value.tobytes()
-        else:
-            value_bytes = value
-        
-        # Verificar que el archivo no sea demasiado grande (10MB)
-        if len(value_bytes) > 10 * 1024 * 1024:
+        # bytes o memoryview: se miran el tamaño y los primeros bytes sin copiarlo
+        if len(value) > 10 * 1024 * 1024:
             raise ValidationError('El archivo PDF no puede ser mayor a 10MB')
         
         # Verificar que sea un PDF (verificación básica)
-        if not value_bytes.startswith(b'%PDF'):
+        if bytes(value[:4]) != b'%PDF':
             raise ValidationError('El archivo debe ser un PDF válido')
 
+def validar_archivo_pdf(archivo, tamano_maximo=None):
+    """Validador para PDFs subidos como archivo, sin leerlos completos"""
+    tamano_maximo = tamano_maximo or settings.MAX_UPLOAD_SIZE
+    tamano = getattr(archivo, 'size', None)
+    if tamano is not None and tamano > tamano_maximo:
+        raise ValidationError(f'El archivo PDF no puede ser mayor a {tamano_maximo // (1024 * 1024)}MB')
+
+    # Verificar la firma del PDF con los primeros bytes
+    cabecera = archivo.read(4)
+    archivo.seek(0)
+    if cabecera != b'%PDF':
+        raise ValidationError('El archivo debe ser un PDF válido')
+
+# PDFs guardados por adjuntar_pdf dentro de pdfs_provisorios()
+_pdfs_provisorios = ContextVar('pdfs_provisorios', default=None)
+
+
+@contextmanager
+def pdfs_provisorios():
+    """
+    Descarta los PDFs que guarde ``adjuntar_pdf`` dentro del bloque si el
+    bloque termina con una excepción. Va por fuera de la transacción de quien
+    llama (``with pdfs_provisorios(), transaction.atomic():``), así que cubre
+    cualquier falla que la revierta, también la del commit o una conexión
+    caída.
+    """
+    guardados = []
+    token = _pdfs_provisorios.set(guardados)
+    try:
+        yield
+    except BaseException:
+        for storage, guardado in guardados:
+            try:
+                storage.descartar(guardado)
+            except Exception:
+                logger.exception('No se pudo descartar el PDF %s', guardado.key)
+        raise
+    finally:
+        _pdfs_provisorios.reset(token)
+
+
+class AjusteStockError(Exception):
+    """Uno o más ajustes de stock no se pudieron aplicar; no se aplicó ninguno"""
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(f'{len(errores)} ajustes de stock fallidos')
+
+
+class ProductoQuerySet(models.QuerySet):
+
+    def con_info_pdf(self):
+        """Anota tiene_pdf y pdf_size calculados en SQL, sin leer el PDF"""
+        return self.annotate(
+            tiene_pdf=models.ExpressionWrapper(
+                models.Q(documento__isnull=False) | models.Q(orden_trabajo_pdf__isnull=False),
+                output_field=models.BooleanField()
+            ),
+            pdf_size=Coalesce(F('documento__tamano'), OctetLength('orden_trabajo_pdf')),
+        )
+
+    def con_pdf(self):
+        """
+        Filtra los productos que tienen PDF. Los ids salen de la tabla de
+        documentos y del índice parcial de la columna heredada (un OR sobre el
+        LEFT JOIN obligaría a recorrer todos los productos).
+        """
+        con_documento = ProductoDocumento.objects.values('producto_id')
+        heredados = self.model.objects.filter(orden_trabajo_pdf__isnull=False).order_by().values('id')
+        return self.filter(pk__in=con_documento.union(heredados))
+
+    def para_serializer(self, serializer_class):
+        """
+        Carga solo las columnas que declara el serializer (nunca el PDF)
+        y anota la información del PDF.
+        """
+        declarados = set(getattr(serializer_class.Meta, 'fields', ()))
+        columnas = [
+            field.name for field in self.model._meta.concrete_fields
+            if field.name in declarados and field.name not in COLUMNAS_DIFERIDAS
+        ]
+        return self.only('pk', *columnas).con_info_pdf()
+
+    def ajustar_stock(self, ajustes, usuario=None, atomico=True):
+        """
+        Aplica varios ajustes ``{producto_id: delta}`` con un único UPDATE
+        (stock = stock + CASE id WHEN ... END) y registra los movimientos con
+        un solo INSERT. Un ajuste falla si el producto no está en el queryset o
+        si dejaría el stock bajo cero.
+
+        Con ``atomico=True`` cualquier fallo revierte todo y lanza
+        ``AjusteStockError``; con ``atomico=False`` se aplican los demás.
+        Retorna ``(stocks, errores)``: ``{id: stock_resultante}`` y ``{id: mensaje}``.
+        """
+        if not ajustes:
+            return {}, {}
+
+        delta = Case(
+            *[When(pk=pk, then=Value(cantidad)) for pk, cantidad in ajustes.items()],
+            output_field=models.IntegerField(),
+        )
+        nuevo_stock = Coalesce(F('stock'), 0) + delta
+        with transaction.atomic(using=self.db):
+            filas = update_returning(
+                self.filter(pk__in=list(ajustes)).filter(GreaterThanOrEqual(nuevo_stock, 0)),
+                ['id', 'stock', 'activo'],
+                stock=nuevo_stock,
+                fecha_actualizacion=timezone.now(),
+            )
+            stocks = {pk: stock for pk, stock, _ in filas}
+
+            errores = {}
+            fallidos = [pk for pk in ajustes if pk not in stocks]
+            if fallidos:
+                actuales = dict(self.filter(pk__in=fallidos).values_list('pk', 'stock'))
+                for pk in fallidos:
+                    if pk not in actuales:
+                        errores[pk] = 'Producto no encontrado'
+                    elif actuales[pk] is None:
+                        errores[pk] = 'Este producto no tiene stock configurado'
+                    else:
+                        errores[pk] = 'No hay suficiente stock disponible'
+                if atomico:
+                    # Revierte el UPDATE de los ajustes que sí se aplicaron
+                    raise AjusteStockError(errores)
+
+            MovimientoStock.objects.bulk_create([
+                MovimientoStock(
+                    producto_id=pk,
+                    tipo=MovimientoStock.ENTRADA if ajustes[pk] > 0 else MovimientoStock.SALIDA,
+                    cantidad=abs(ajustes[pk]),
+                    stock_resultante=stock,
+                    usuario_id=getattr(usuario, 'pk', None),
+                )
+                for pk, stock in stocks.items()
+            ])
+            cache_respuestas.invalidar()
+            estadisticas.aplicar_cambios_stock(
+                (activo, stock - ajustes[pk], stock) for pk, stock, activo in filas
+            )
+        return stocks, errores
+
+
 class Producto(models.Model):
     nombre = models.CharField(
         max_length=255,
@@ -49,6 +205,8 @@ class Producto(models.Model):
         validators=[MinValueValidator(1)],
         help_text="Número de Orden de Trabajo"
     )
+    # Columna heredada: los PDFs ahora viven en ProductoDocumento y la
+    # migración 0006 la deja vacía. Se mantiene solo como respaldo de lectura.
     orden_trabajo_pdf = models.BinaryField(
         null=True, 
         blank=True, 
@@ -62,19 +220,83 @@ class Producto(models.Model):
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True, help_text="Indica si el producto está activo")
 
+    objects = ProductoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
-        ordering = ['-fecha_creacion']
+        ordering = ['-fecha_creacion', '-id']
+        # Índices parciales con la forma de las consultas de ProductoViewSet:
+        # siempre activo=True y orden (-fecha_creacion, -id). Se crean sin
+        # bloquear la tabla (migración 0014). No hay uno sobre nombre porque
+        # ninguna consulta filtra por igualdad ni ordena por la columna; si
+        # se agrega alguna, hace falta volver a crearlo
         indexes = [
-            models.Index(fields=['nombre']),
-            models.Index(fields=['precio']),
-            models.Index(fields=['activo']),
+            # Listado y paginación por keyset (productos.pagination)
+            models.Index(
+                fields=['-fecha_creacion', '-id'],
+                condition=models.Q(activo=True),
+                name='producto_activo_fecha_idx',
+            ),
+            # ?precio_min= / ?precio_max=
+            models.Index(fields=['precio'], condition=models.Q(activo=True), name='producto_activo_precio_idx'),
+            # ?con_stock=true, en el mismo orden del listado
+            models.Index(
+                fields=['-fecha_creacion', '-id'],
+                condition=models.Q(activo=True, stock__gt=0),
+                name='producto_con_stock_fecha_idx',
+            ),
+            # ?con_pdf=true: los pocos productos con el PDF en la columna heredada
+            models.Index(
+                fields=['id'],
+                condition=models.Q(orden_trabajo_pdf__isnull=False),
+                name='producto_pdf_heredado_idx',
+            ),
+        ]
+        # Los índices de búsqueda (GIN de trigramas y de texto completo) solo
+        # existen en PostgreSQL y los crea la migración 0008 (ver busqueda.py)
+        constraints = [
+            # Nombres únicos sin distinguir mayúsculas entre los productos activos
+            # (índice único parcial sobre LOWER(nombre)); ver ProductoSerializer
+            models.UniqueConstraint(
+                Lower('nombre'),
+                condition=models.Q(activo=True),
+                name='producto_nombre_activo_unico',
+                violation_error_message='Ya existe un producto con este nombre',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(precio__gt=0),
+                name='producto_precio_positivo',
+                violation_error_message='El precio debe ser mayor a 0',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(stock__isnull=True) | models.Q(stock__gte=0),
+                name='producto_stock_no_negativo',
+                violation_error_message='El stock no puede ser negativo',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(numero_ot__isnull=True) | models.Q(numero_ot__gt=0),
+                name='producto_numero_ot_positivo',
+                violation_error_message='El número de OT debe ser mayor a 0',
+            ),
         ]
 
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado al cargar, para aplicar solo la diferencia a las estadísticas
+        instance._estado_estadisticas = instance.estado_estadisticas()
+        return instance
+
+    def estado_estadisticas(self):
+        """(activo, stock, precio), o None si alguno no está cargado"""
+        if self.get_deferred_fields() & {'activo', 'stock', 'precio'}:
+            return None
+        return self.activo, self.stock, self.precio
+
     def clean(self):
         """Validaciones adicionales del modelo"""
         if self.stock is not None and self.stock < 0:
@@ -84,40 +306,292 @@ class Producto(models.Model):
             raise ValidationError({'numero_ot': 'El número de OT debe ser mayor a 0'})
 
     def save(self, *args, **kwargs):
-        """Sobrescribir save para aplicar validaciones"""
-        try:
-            self.full_clean()
-        except ValidationError as e:
-            # Log del error pero no fallar el save
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"ValidationError en modelo Producto: {e}")
+        """
+        Los datos ya llegan validados (serializers) y la base rechaza precio,
+        stock o número OT inválidos (Meta.constraints). Solo los guardados
+        completos pasan por los validadores de los campos, sin consultas y sin
+        el PDF heredado; los de ``update_fields`` (stock, activo) no se validan.
+        """
+        if kwargs.get('update_fields') is None:
+            try:
+                self.full_clean(
+                    exclude=self.get_deferred_fields() | COLUMNAS_DIFERIDAS,
+                    validate_unique=False,
+                    validate_constraints=False,
+                )
+            except ValidationError as e:
+                # Log del error pero no fallar el save
+                logger.warning('ValidationError en modelo Producto: %s', e)
         super().save(*args, **kwargs)
 
     @property
     def tiene_pdf(self):
         """Indica si el producto tiene un PDF asociado"""
-        return bool(self.orden_trabajo_pdf)
+        if '_tiene_pdf' in self.__dict__:
+            return self._tiene_pdf
+        return self.get_documento() is not None or bool(self.orden_trabajo_pdf)
+
+    @tiene_pdf.setter
+    def tiene_pdf(self, value):
+        # Valor anotado por ProductoQuerySet.con_info_pdf()
+        self._tiene_pdf = value
+
+    @property
+    def pdf_size(self):
+        """Tamaño del PDF en bytes, o None si no tiene"""
+        if '_pdf_size' in self.__dict__:
+            return self._pdf_size
+        documento = self.get_documento()
+        if documento is not None:
+            return documento.tamano
+        return len(self.orden_trabajo_pdf) if self.orden_trabajo_pdf else None
+
+    @pdf_size.setter
+    def pdf_size(self, value):
+        self._pdf_size = value
+
+    def get_documento(self):
+        """Retorna el ProductoDocumento asociado o None"""
+        try:
+            return self.documento
+        except ProductoDocumento.DoesNotExist:
+            return None
+
+    def adjuntar_pdf(self, archivo, nombre_archivo='', tamano_maximo=None, guardar_producto=True):
+        """
+        Guarda el PDF en el almacenamiento y registra sus metadatos.
+        ``tamano_maximo`` reemplaza a MAX_UPLOAD_SIZE (subidas reanudables).
+        Con ``guardar_producto=False`` no se actualiza la fila del producto:
+        quien llama la guarda después en la misma transacción (un solo UPDATE
+        que vacía la columna heredada y renueva fecha_actualizacion).
+
+        Si la escritura falla, el archivo nuevo se descarta aquí. Si quien llama
+        abre su propia transacción, debe envolverla en ``pdfs_provisorios()``
+        para descartarlo también cuando la revierta. El anterior se borra solo
+        cuando se confirma.
+        """
+        validar_archivo_pdf(archivo, tamano_maximo)
+
+        storage = get_pdf_storage()
+        guardado = storage.save(storage.generar_key(self.pk), archivo)
+
+        try:
+            with transaction.atomic():
+                key_anterior = ProductoDocumento.objects.filter(
+                    producto=self
+                ).values_list('storage_key', flat=True).first()
+                documento, _ = ProductoDocumento.objects.update_or_create(
+                    producto=self,
+                    defaults={
+                        'storage_key': guardado.key,
+                        'nombre_archivo': nombre_archivo or getattr(archivo, 'name', '') or '',
+                        'content_type': 'application/pdf',
+                        'tamano': guardado.tamano,
+                        'sha256': guardado.sha256,
+                    }
+                )
+                if guardar_producto:
+                    # Vaciar la columna heredada y marcar la modificación (Last-Modified)
+                    ahora = timezone.now()
+                    Producto.objects.filter(pk=self.pk).update(
+                        orden_trabajo_pdf=None, fecha_actualizacion=ahora
+                    )
+        except Exception:
+            storage.descartar(guardado)
+            raise
+
+        provisorios = _pdfs_provisorios.get()
+        if provisorios is not None:
+            provisorios.append((storage, guardado))
+        # El archivo anterior solo se borra si la transacción se confirma
+        if key_anterior:
+            transaction.on_commit(lambda: storage.delete(key_anterior))
+        if guardar_producto:
+            if 'orden_trabajo_pdf' not in self.get_deferred_fields():
+                self.orden_trabajo_pdf = None
+            self.fecha_actualizacion = ahora
+        else:
+            # Asignada, la columna entra en el próximo save() aunque estuviera diferida
+            self.orden_trabajo_pdf = None
+        self.__dict__.pop('_tiene_pdf', None)
+        self.__dict__.pop('_pdf_size', None)
+        self.documento = documento
+        return documento
+
+    def abrir_pdf(self, inicio=None, fin=None):
+        """
+        Retorna el PDF como objeto tipo archivo, o None si no tiene.
+        Con ``inicio`` y ``fin`` el archivo queda posicionado para leer ese rango.
+        """
+        documento = self.get_documento()
+        if documento is not None:
+            storage = get_pdf_storage()
+            if inicio is None:
+                return storage.open(documento.storage_key)
+            return storage.open_range(documento.storage_key, inicio, fin)
+        if self.orden_trabajo_pdf:
+            archivo = io.BytesIO(bytes(self.orden_trabajo_pdf))
+            archivo.seek(inicio or 0)
+            return archivo
+        return None
 
     def get_precio_formateado(self):
         """Retorna el precio formateado como string"""
         return f"${self.precio:,.2f}"
 
-    def reducir_stock(self, cantidad):
-        """Reduce el stock del producto"""
-        if self.stock is None:
-            raise ValidationError("Este producto no tiene stock configurado")
-        
-        if self.stock < cantidad:
-            raise ValidationError("No hay suficiente stock disponible")
-        
-        self.stock -= cantidad
-        self.save(update_fields=['stock'])
+    def reducir_stock(self, cantidad, usuario=None):
+        """
+        Reduce el stock del producto con un único UPDATE condicional
+        (stock = stock - n WHERE stock >= n), sin carreras entre workers.
+        Retorna el stock resultante.
+        """
+        with transaction.atomic():
+            filas = update_returning(
+                Producto.objects.filter(pk=self.pk, stock__gte=cantidad),
+                ['stock', 'activo'],
+                stock=F('stock') - cantidad,
+                fecha_actualizacion=timezone.now(),
+            )
+            if not filas:
+                stock_actual = Producto.objects.filter(pk=self.pk).values_list('stock', flat=True).first()
+                if stock_actual is None:
+                    raise ValidationError("Este producto no tiene stock configurado")
+                raise ValidationError("No hay suficiente stock disponible")
 
-    def aumentar_stock(self, cantidad):
-        """Aumenta el stock del producto"""
-        if self.stock is None:
-            self.stock = 0
-        
-        self.stock += cantidad
-        self.save(update_fields=['stock'])
\ No newline at end of file
+            self.stock, activo = filas[0]
+            cache_respuestas.invalidar()
+            estadisticas.aplicar_cambios_stock([(activo, self.stock + cantidad, self.stock)])
+            self._actualizar_estado_stock()
+            MovimientoStock.objects.create(
+                producto=self,
+                tipo=MovimientoStock.SALIDA,
+                cantidad=cantidad,
+                stock_resultante=self.stock,
+                usuario_id=getattr(usuario, 'pk', None),
+            )
+        return self.stock
+
+    def aumentar_stock(self, cantidad, usuario=None):
+        """
+        Aumenta el stock del producto con un único UPDATE atómico
+        (un stock sin configurar cuenta como 0). Retorna el stock resultante.
+        """
+        with transaction.atomic():
+            filas = update_returning(
+                Producto.objects.filter(pk=self.pk),
+                ['stock', 'activo'],
+                stock=Coalesce(F('stock'), 0) + cantidad,
+                fecha_actualizacion=timezone.now(),
+            )
+            if not filas:
+                raise Producto.DoesNotExist()
+
+            self.stock, activo = filas[0]
+            cache_respuestas.invalidar()
+            estadisticas.aplicar_cambios_stock([(activo, self.stock - cantidad, self.stock)])
+            self._actualizar_estado_stock()
+            MovimientoStock.objects.create(
+                producto=self,
+                tipo=MovimientoStock.ENTRADA,
+                cantidad=cantidad,
+                stock_resultante=self.stock,
+                usuario_id=getattr(usuario, 'pk', None),
+            )
+        return self.stock
+
+    def _actualizar_estado_stock(self):
+        # El stock ya se contó: un save() posterior no debe volver a aplicarlo
+        estado = getattr(self, '_estado_estadisticas', None)
+        if estado is not None:
+            self._estado_estadisticas = (estado[0], self.stock, estado[2])
+
+class ProductoDocumento(models.Model):
+    """Metadatos del PDF de orden de trabajo; el contenido está en PDF_STORAGE"""
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='documento'
+    )
+    storage_key = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Clave del archivo en el almacenamiento de PDFs"
+    )
+    nombre_archivo = models.CharField(max_length=255, blank=True, default='')
+    content_type = models.CharField(max_length=100, default='application/pdf')
+    tamano = models.PositiveBigIntegerField(help_text="Tamaño en bytes")
+    sha256 = models.CharField(max_length=64, help_text="Hash SHA-256 del contenido")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Documento de producto"
+        verbose_name_plural = "Documentos de productos"
+
+    def __str__(self):
+        return f"{self.producto_id} - {self.storage_key}"
+
+
+class MovimientoStock(models.Model):
+    """Registro (solo inserción) de cada cambio de stock de un producto"""
+    ENTRADA = 'entrada'
+    SALIDA = 'salida'
+    TIPOS = [
+        (ENTRADA, 'Entrada'),
+        (SALIDA, 'Salida'),
+    ]
+
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='movimientos_stock'
+    )
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    cantidad = models.PositiveIntegerField(help_text="Unidades movidas")
+    stock_resultante = models.IntegerField(help_text="Stock después del movimiento")
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='movimientos_stock'
+    )
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Movimiento de stock"
+        verbose_name_plural = "Movimientos de stock"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['producto', '-fecha'], name='movimiento_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.tipo} {self.cantidad}"
+
+    def save(self, *args, **kwargs):
+        """El historial no se modifica: solo se permiten inserciones"""
+        if not self._state.adding:
+            raise ValidationError("Los movimientos de stock no se pueden modificar")
+        super().save(*args, **kwargs)
+
+
+class SubidaPDF(models.Model):
+    """Subida reanudable de un PDF en curso; los bytes recibidos están en SUBIDAS_DIR"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='subidas_pdf'
+    )
+    tamano = models.PositiveBigIntegerField(help_text="Tamaño total declarado en bytes")
+    nombre_archivo = models.CharField(max_length=255, blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True, help_text="Se extiende con cada bloque recibido")
+
+    class Meta:
+        verbose_name = "Subida de PDF"
+        verbose_name_plural = "Subidas de PDF"
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.id} ({self.tamano} bytes)"
@@ -0,0 +1,173 @@
+"""
+Paginación del listado de productos.
+
+Por defecto se pagina por número de página (``?page=``), igual que el resto
+de la API. Con ``?paginacion=cursor`` (o al seguir un ``?cursor=``) se usa
+paginación por keyset sobre ``(fecha_creacion, id)``: no hace ``COUNT(*)`` ni
+``OFFSET``, así que las páginas profundas cuestan lo mismo que la primera.
+
+``?conteo=aproximado`` reemplaza el ``COUNT(*)`` exacto por la estimación del
+planificador de PostgreSQL (en otras bases de datos se usa el conteo exacto).
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def conteo_aproximado(queryset):
+    """Cantidad de filas estimada por el planificador (sin recorrer la tabla)"""
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class PaginadorConteoAproximado(DjangoPaginator):
+    """Paginator de Django que usa el conteo estimado"""
+
+    @cached_property
+    def count(self):
+        return conteo_aproximado(self.object_list)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por keyset sobre ``(fecha_creacion, id)`` descendente,
+    el mismo orden por defecto del modelo. El cursor es opaco para el cliente.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-fecha_creacion', '-id')
+    page_size = None
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        cursor = self.decode_cursor(request)
+
+        ordenado = queryset.order_by(*self.ordering)
+        if cursor is None:
+            reverso = False
+        else:
+            fecha, pk, reverso = cursor
+            if reverso:
+                # Página anterior: lo que está "arriba" del cursor, en orden inverso
+                ordenado = queryset.order_by('fecha_creacion', 'id').filter(
+                    fecha_creacion__gte=fecha
+                ).exclude(fecha_creacion=fecha, id__lte=pk)
+            else:
+                # fecha <= f AND NOT (fecha = f AND id >= i): rango sobre el índice
+                ordenado = ordenado.filter(
+                    fecha_creacion__lte=fecha
+                ).exclude(fecha_creacion=fecha, id__gte=pk)
+
+        # Una fila extra indica si hay más resultados en esa dirección
+        resultados = list(ordenado[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if reverso:
+            resultados.reverse()
+            self.has_next = cursor is not None
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = cursor is not None
+
+        self.page = resultados
+        return resultados
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return datetime.fromisoformat(datos['f']), int(datos['i']), bool(datos.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, producto, reverso=False):
+        datos = {'f': producto.fecha_creacion.isoformat(), 'i': producto.pk}
+        if reverso:
+            datos['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode())
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverso=True)
+
+    def get_paginated_response(self, data, count=None):
+        respuesta = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if count is not None:
+            respuesta['count'] = count
+        respuesta['results'] = data
+        return Response(respuesta)
+
+
+class ProductoPagination(PageNumberPagination):
+    """
+    Paginación por número de página con dos opciones:
+    ``?paginacion=cursor`` (keyset) y ``?conteo=aproximado|exacto``.
+    """
+    modo_query_param = 'paginacion'
+    conteo_query_param = 'conteo'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.conteo = request.query_params.get(self.conteo_query_param)
+        self.keyset = None
+
+        # El keyset solo vale para el orden por fecha (no para ?q= por relevancia)
+        orden_por_fecha = tuple(queryset.query.order_by) in ((), KeysetPagination.ordering)
+        if orden_por_fecha and (
+                request.query_params.get(self.modo_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.get_page_size(request)
+            self.queryset = queryset
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if self.conteo == 'aproximado':
+            self.django_paginator_class = PaginadorConteoAproximado
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+
+        # En modo cursor el total es opcional: solo se calcula si se pide
+        count = None
+        if self.conteo == 'aproximado':
+            count = conteo_aproximado(self.queryset)
+        elif self.conteo == 'exacto':
+            count = self.queryset.count()
+        return self.keyset.get_paginated_response(data, count=count)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
@@ -1,6 +1,22 @@
+import logging
+
 from rest_framework import serializers
 from .models import Producto
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+# Los rechazos por campo van en DEBUG: solo los emiten los requests
+# muestreados (LOG_MUESTREO_DEBUG, ver mi_proyecto/registro.py)
+logger = logging.getLogger(__name__)
+
+NOMBRE_DUPLICADO = 'Ya existe un producto con este nombre'
+# Índice único parcial sobre LOWER(nombre) de los productos activos
+RESTRICCION_NOMBRE = 'producto_nombre_activo_unico'
+
+
+def es_nombre_duplicado(error):
+    """Indica si el IntegrityError viene del índice único de nombres"""
+    return RESTRICCION_NOMBRE in str(error)
 
 class ProductoSerializer(serializers.ModelSerializer):
     orden_trabajo_pdf = serializers.SerializerMethodField()
@@ -9,13 +25,14 @@ class ProductoSerializer(serializers.ModelSerializer):
     activo = serializers.BooleanField(read_only=True)
     precio_formateado = serializers.SerializerMethodField()
     tiene_pdf = serializers.SerializerMethodField()
+    pdf_size = serializers.SerializerMethodField()
 
     class Meta:
         model = Producto
         fields = [
             'id', 'nombre', 'precio', 'descripcion', 'stock', 'numero_ot', 
             'orden_trabajo_pdf', 'fecha_creacion', 'fecha_actualizacion', 
-            'activo', 'precio_formateado', 'tiene_pdf'
+            'activo', 'precio_formateado', 'tiene_pdf', 'pdf_size'
         ]
         read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
 
@@ -31,71 +48,52 @@ class ProductoSerializer(serializers.ModelSerializer):
         """Indica si el producto tiene PDF"""
         return obj.tiene_pdf
 
+    def get_pdf_size(self, obj):
+        """Tamaño del PDF en bytes"""
+        return obj.pdf_size
+
     def validate_nombre(self, value):
-        """Validación personalizada para el nombre"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Validando nombre: '{value}' (tipo: {type(value)})")
-        
+        """
+        Validación personalizada para el nombre. Que no se repita lo
+        garantiza la base al guardar (ver ``es_nombre_duplicado``).
+        """
         if not value or not value.strip():
-            logger.error(f"Nombre vacío: '{value}'")
+            logger.debug('Nombre vacío: %r', value)
             raise serializers.ValidationError("El nombre no puede estar vacío")
         
-        # Verificar que no exista otro producto con el mismo nombre
-        if self.instance is None:  # Creando nuevo producto
-            if Producto.objects.filter(nombre__iexact=value.strip(), activo=True).exists():
-                logger.error(f"Nombre duplicado: '{value.strip()}'")
-                raise serializers.ValidationError("Ya existe un producto con este nombre")
-        else:  # Actualizando producto existente
-            if Producto.objects.filter(nombre__iexact=value.strip(), activo=True).exclude(id=self.instance.id).exists():
-                logger.error(f"Nombre duplicado: '{value.strip()}'")
-                raise serializers.ValidationError("Ya existe un producto con este nombre")
-        
-        logger.info(f"Nombre válido: '{value.strip()}'")
         return value.strip()
 
+    def error_nombre_duplicado(self):
+        """Error de validación para un nombre que ya usa otro producto activo"""
+        logger.debug('Nombre duplicado: %r', self.validated_data.get('nombre'))
+        return serializers.ValidationError({'nombre': [NOMBRE_DUPLICADO]})
+
     def validate_precio(self, value):
         """Validación personalizada para el precio"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        logger.info(f"Validando precio: {value} (tipo: {type(value)})")
-        
         if value <= 0:
-            logger.error(f"Precio inválido: {value} <= 0")
+            logger.debug('Precio inválido: %s <= 0', value)
             raise serializers.ValidationError("El precio debe ser mayor a 0")
         
         if value > 99999999.99:
-            logger.error(f"Precio demasiado alto: {value} > 99999999.99")
+            logger.debug('Precio demasiado alto: %s', value)
             raise serializers.ValidationError("El precio no puede ser mayor a $99,999,999.99")
         
-        logger.info(f"Precio válido: {value}")
         return value
 
     def validate_stock(self, value):
         """Validación personalizada para el stock"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Validando stock: {value} (tipo: {type(value)})")
-        
         if value is not None and value < 0:
-            logger.error(f"Stock inválido: {value} < 0")
+            logger.debug('Stock inválido: %s < 0', value)
             raise serializers.ValidationError("El stock no puede ser negativo")
         
-        logger.info(f"Stock válido: {value}")
         return value
 
     def validate_numero_ot(self, value):
         """Validación personalizada para el número de Factura"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Validando numero_ot: {value} (tipo: {type(value)})")
-        
         if value is not None and value <= 0:
-            logger.error(f"Número Factura inválido: {value} <= 0")
+            logger.debug('Número Factura inválido: %s <= 0', value)
             raise serializers.ValidationError("El número de Factura debe ser mayor a 0")
         
-        logger.info(f"Número Factura válido: {value}")
         return value
 
     def validate(self, data):
@@ -120,32 +118,23 @@ class ProductoCreateSerializer(ProductoSerializer):
     def create(self, validated_data):
         """Crear producto con validaciones adicionales"""
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            logger.info(f"ProductoCreateSerializer.create - validated_data keys: {list(validated_data.keys())}")
-            
             # Remover el campo PDF si está vacío o es None para evitar problemas
             if 'orden_trabajo_pdf' in validated_data:
                 if validated_data['orden_trabajo_pdf'] is None or validated_data['orden_trabajo_pdf'] == '':
-                    logger.info("Removiendo campo orden_trabajo_pdf vacío")
                     del validated_data['orden_trabajo_pdf']
-                else:
-                    logger.info(f"PDF presente, tamaño: {len(validated_data['orden_trabajo_pdf']) if isinstance(validated_data['orden_trabajo_pdf'], (bytes, str)) else 'N/A'}")
             
-            logger.info("Llamando a super().create()...")
             result = super().create(validated_data)
-            logger.info(f"Producto creado exitosamente: {result.id}")
             return result
+        except IntegrityError as e:
+            # Se relanza dentro de la transacción de la vista, que se revierte
+            if not es_nombre_duplicado(e):
+                raise
+            raise self.error_nombre_duplicado() from e
         except ValidationError as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"ValidationError en ProductoCreateSerializer: {e}")
+            logger.warning('ValidationError en ProductoCreateSerializer: %s', e)
             raise serializers.ValidationError(e.message_dict if hasattr(e, 'message_dict') else str(e))
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error inesperado en ProductoCreateSerializer: {e}", exc_info=True)
+            logger.exception('Error inesperado en ProductoCreateSerializer')
             raise
 
 class ProductoUpdateSerializer(ProductoSerializer):
@@ -160,32 +149,23 @@ class ProductoUpdateSerializer(ProductoSerializer):
     def update(self, instance, validated_data):
         """Actualizar producto con validaciones adicionales"""
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            logger.info(f"ProductoUpdateSerializer.update - validated_data keys: {list(validated_data.keys())}")
-            
             # Remover el campo PDF si está vacío o es None para evitar problemas
             if 'orden_trabajo_pdf' in validated_data:
                 if validated_data['orden_trabajo_pdf'] is None or validated_data['orden_trabajo_pdf'] == '':
-                    logger.info("Removiendo campo orden_trabajo_pdf vacío")
                     del validated_data['orden_trabajo_pdf']
-                else:
-                    logger.info(f"PDF presente, tamaño: {len(validated_data['orden_trabajo_pdf']) if isinstance(validated_data['orden_trabajo_pdf'], (bytes, str)) else 'N/A'}")
             
-            logger.info("Llamando a super().update()...")
             result = super().update(instance, validated_data)
-            logger.info(f"Producto actualizado exitosamente: {result.id}")
             return result
+        except IntegrityError as e:
+            # Se relanza dentro de la transacción de la vista, que se revierte
+            if not es_nombre_duplicado(e):
+                raise
+            raise self.error_nombre_duplicado() from e
         except ValidationError as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"ValidationError en ProductoUpdateSerializer: {e}")
+            logger.warning('ValidationError en ProductoUpdateSerializer: %s', e)
             raise serializers.ValidationError(e.message_dict if hasattr(e, 'message_dict') else str(e))
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error inesperado en ProductoUpdateSerializer: {e}", exc_info=True)
+            logger.exception('Error inesperado en ProductoUpdateSerializer')
             raise
 
 class ProductoListSerializer(serializers.ModelSerializer):
@@ -204,4 +184,57 @@ class ProductoListSerializer(serializers.ModelSerializer):
         return obj.get_precio_formateado()
     
     def get_tiene_pdf(self, obj):
-        return obj.tiene_pdf
\ No newline at end of file
+        return obj.tiene_pdf
+
+class AjusteStockSerializer(serializers.Serializer):
+    """Un ajuste de stock: id del producto y unidades a sumar (o restar si es negativo)"""
+    id = serializers.IntegerField(min_value=1)
+    delta = serializers.IntegerField()
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("El ajuste no puede ser 0")
+        return value
+
+
+class AjusteStockMasivoSerializer(serializers.Serializer):
+    """Ajustes de stock de varios productos en una sola petición"""
+    MODO_TODO = 'todo'
+    MODO_PARCIAL = 'parcial'
+    MAX_AJUSTES = 1000
+
+    ajustes = AjusteStockSerializer(many=True, allow_empty=False, max_length=MAX_AJUSTES)
+    modo = serializers.ChoiceField(choices=[MODO_TODO, MODO_PARCIAL], default=MODO_TODO)
+
+    def validate_ajustes(self, value):
+        """Cada producto puede aparecer una sola vez"""
+        vistos = set()
+        repetidos = []
+        for ajuste in value:
+            if ajuste['id'] in vistos:
+                repetidos.append(str(ajuste['id']))
+            vistos.add(ajuste['id'])
+        if repetidos:
+            raise serializers.ValidationError(
+                f"Productos repetidos: {', '.join(repetidos)}"
+            )
+        return value
+
+
+class ProductoImportSerializer(ProductoSerializer):
+    """
+    Valida una fila de importación con las mismas reglas de ProductoSerializer.
+    Los nombres duplicados no se consultan fila por fila: el importador los
+    resuelve con una consulta por lote (ver productos.importacion).
+    """
+    orden_trabajo_pdf = None
+    fecha_creacion = None
+    fecha_actualizacion = None
+    activo = None
+    precio_formateado = None
+    tiene_pdf = None
+    pdf_size = None
+
+    class Meta(ProductoSerializer.Meta):
+        fields = ['nombre', 'precio', 'descripcion', 'stock', 'numero_ot']
+        read_only_fields = []
@@ -0,0 +1,109 @@
+"""
+Señales de la app productos.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache_respuestas, estadisticas
+from .autenticacion import invalidar_estado
+from .models import Producto, ProductoDocumento
+from .storage import get_pdf_storage
+
+
+@receiver(post_delete, sender=ProductoDocumento)
+def eliminar_archivo_documento(sender, instance, **kwargs):
+    """Borra el PDF del almacenamiento cuando se elimina su documento"""
+    key = instance.storage_key
+    transaction.on_commit(lambda: get_pdf_storage().delete(key))
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=ProductoDocumento)
+@receiver(post_delete, sender=ProductoDocumento)
+def invalidar_respuestas(sender, raw=False, **kwargs):
+    """Cualquier cambio de un producto o de su PDF invalida las respuestas cacheadas"""
+    if not raw:
+        cache_respuestas.invalidar()
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_estadisticas_producto(sender, instance, created, raw=False, **kwargs):
+    """Aplica a las estadísticas la diferencia entre el estado cargado y el guardado"""
+    if raw:
+        return
+    estado = instance.estado_estadisticas()
+    anterior = None if created else getattr(instance, '_estado_estadisticas', None)
+    instance._estado_estadisticas = estado
+
+    if created:
+        tiene_pdf = instance.orden_trabajo_pdf is not None
+        estadisticas.aplicar(estadisticas.contribucion(*estado, tiene_pdf=tiene_pdf))
+    elif anterior is None or estado is None:
+        estadisticas.invalidar_al_confirmar()
+    elif anterior != estado:
+        # El PDF solo cambia el resultado si el producto se activa o desactiva
+        tiene_pdf = anterior[0] != estado[0] and instance.tiene_pdf
+        estadisticas.aplicar(estadisticas.diferencia(
+            estadisticas.contribucion(*anterior, tiene_pdf=tiene_pdf),
+            estadisticas.contribucion(*estado, tiene_pdf=tiene_pdf),
+        ))
+
+
+@receiver(post_delete, sender=Producto)
+def invalidar_estadisticas_producto(sender, instance, **kwargs):
+    estadisticas.invalidar_al_confirmar()
+
+
+def _cambio_pdf(documento, delta):
+    # Solo cuenta si el producto está activo y no tenía ya el PDF en la columna heredada
+    if Producto.objects.filter(
+        pk=documento.producto_id, activo=True, orden_trabajo_pdf__isnull=True
+    ).exists():
+        estadisticas.aplicar({'con_pdf': delta})
+
+
+@receiver(post_save, sender=ProductoDocumento)
+def contar_documento(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _cambio_pdf(instance, 1)
+
+
+@receiver(post_delete, sender=ProductoDocumento)
+def descontar_documento(sender, instance, **kwargs):
+    _cambio_pdf(instance, -1)
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_estado_usuario(sender, instance, update_fields=None, **kwargs):
+    """Un cambio del usuario (activo, staff, contraseña...) se ve en el próximo request"""
+    # El login solo actualiza last_login (UPDATE_LAST_LOGIN)
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidar_estado(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidar_permisos(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Cambios de grupos o permisos invalidan el estado de los usuarios afectados"""
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, User):
+        invalidar_estado(instance.pk)
+    elif isinstance(instance, Group):
+        invalidar_estado(*instance.user_set.values_list('pk', flat=True))
+    elif model is User and pk_set:
+        # Cambio desde el otro lado (grupo.user_set.add(...), permiso.user_set...)
+        invalidar_estado(*pk_set)
+    elif model is Group and pk_set:
+        # permiso.group_set.add(...)
+        invalidar_estado(*User.objects.filter(groups__in=pk_set).values_list('pk', flat=True))
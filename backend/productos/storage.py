@@ -0,0 +1,298 @@
+"""
+Almacenamiento de los PDF de órdenes de trabajo fuera de la tabla de productos.
+
+El backend se elige con el setting ``PDF_STORAGE``, con el mismo formato que
+``CACHES``::
+
+    PDF_STORAGE = {
+        'BACKEND': 'productos.storage.FileSystemPDFStorage',
+        'OPTIONS': {'location': '/var/data/ordenes_trabajo'},
+    }
+
+Todos los backends leen y escriben por bloques, de modo que un PDF nunca se
+mantiene completo en memoria.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.move import file_move_safe
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils._os import safe_join
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+
+
+class PDFStorageError(Exception):
+    """Error al leer o escribir en el almacenamiento de PDFs"""
+
+
+@dataclass(frozen=True)
+class ArchivoGuardado:
+    """
+    Resultado de guardar un archivo en el almacenamiento. ``origen`` es la ruta
+    de la que se movió el archivo, si se movió en lugar de copiarse.
+    """
+    key: str
+    tamano: int
+    sha256: str
+    origen: str | None = None
+
+
+def iterar_bloques(archivo, chunk_size=CHUNK_SIZE):
+    """Itera un archivo (o UploadedFile) en bloques de ``chunk_size`` bytes"""
+    if hasattr(archivo, 'chunks'):
+        yield from archivo.chunks(chunk_size)
+        return
+    while True:
+        bloque = archivo.read(chunk_size)
+        if not bloque:
+            break
+        yield bloque
+
+
+class BasePDFStorage:
+    """Interfaz común de los backends de almacenamiento de PDFs"""
+    chunk_size = CHUNK_SIZE
+
+    def generar_key(self, producto_id):
+        """Genera una clave nueva para el PDF de un producto"""
+        return f'productos/{producto_id}/{uuid.uuid4().hex}.pdf'
+
+    def save(self, key, archivo):
+        """Guarda el contenido de ``archivo`` y retorna un ``ArchivoGuardado``"""
+        raise NotImplementedError
+
+    def open(self, key):
+        """Retorna un objeto tipo archivo binario de solo lectura"""
+        raise NotImplementedError
+
+    def open_range(self, key, inicio, fin):
+        """
+        Retorna un objeto tipo archivo desde el que se pueden leer los bytes
+        ``inicio``..``fin`` (inclusive). El llamador no debe leer más allá de ``fin``.
+        """
+        archivo = self.open(key)
+        archivo.seek(inicio)
+        return archivo
+
+    def delete(self, key):
+        """Elimina el archivo; no falla si no existe"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def descartar(self, guardado):
+        """Deshace un ``save`` cuyo registro no llegó a confirmarse"""
+        self.delete(guardado.key)
+
+    def _copiar(self, archivo, destino):
+        """Copia ``archivo`` en ``destino`` por bloques calculando tamaño y sha256"""
+        sha256 = hashlib.sha256()
+        tamano = 0
+        for bloque in iterar_bloques(archivo, self.chunk_size):
+            sha256.update(bloque)
+            tamano += len(bloque)
+            destino.write(bloque)
+        return tamano, sha256.hexdigest()
+
+
+class FileSystemPDFStorage(BasePDFStorage):
+    """Guarda los PDFs en un directorio local (o un volumen montado)"""
+
+    def __init__(self, location=None):
+        self.location = os.path.abspath(
+            location or os.path.join(settings.MEDIA_ROOT, 'ordenes_trabajo')
+        )
+
+    def path(self, key):
+        return safe_join(self.location, key)
+
+    def save(self, key, archivo):
+        destino = self.path(key)
+        directorio = os.path.dirname(destino)
+        os.makedirs(directorio, exist_ok=True)
+        if hasattr(archivo, 'temporary_file_path') and getattr(archivo, 'sha256', None):
+            # Subida ya escrita en disco y con su sha256 (productos.subidas): se
+            # mueve en lugar de copiarla. La clave es nueva, nadie la lee todavía
+            origen = archivo.temporary_file_path()
+            file_move_safe(origen, destino)
+            return ArchivoGuardado(key=key, tamano=archivo.size, sha256=archivo.sha256, origen=origen)
+        # Escribir en un temporal del mismo directorio y renombrar para que
+        # nunca se lea un archivo a medio escribir
+        fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as salida:
+                tamano, sha256 = self._copiar(archivo, salida)
+            os.replace(temporal, destino)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return ArchivoGuardado(key=key, tamano=tamano, sha256=sha256)
+
+    def open(self, key):
+        try:
+            return open(self.path(key), 'rb')
+        except FileNotFoundError as e:
+            raise PDFStorageError(f'No existe el archivo {key}') from e
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def descartar(self, guardado):
+        # Un archivo movido vuelve a su lugar: puede ser la única copia (una
+        # subida reanudable que debe poder retomarse)
+        if guardado.origen and os.path.isdir(os.path.dirname(guardado.origen)):
+            file_move_safe(self.path(guardado.key), guardado.origen)
+        else:
+            self.delete(guardado.key)
+
+
+class _LectorConHash(io.RawIOBase):
+    """Envuelve un archivo calculando sha256 y tamaño a medida que se lee"""
+
+    def __init__(self, archivo, chunk_size=CHUNK_SIZE):
+        self._bloques = iterar_bloques(archivo, chunk_size)
+        self._pendiente = b''
+        self.sha256 = hashlib.sha256()
+        self.tamano = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pendiente:
+            bloque = next(self._bloques, None)
+            if bloque is None:
+                return 0
+            self.sha256.update(bloque)
+            self.tamano += len(bloque)
+            self._pendiente = bloque
+        n = min(len(buffer), len(self._pendiente))
+        buffer[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        return n
+
+
+class S3PDFStorage(BasePDFStorage):
+    """
+    Guarda los PDFs en un bucket S3 o compatible (MinIO, R2, Spaces...).
+    Requiere ``boto3``.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region_name=None,
+                 access_key=None, secret_key=None):
+        try:
+            import boto3
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                'S3PDFStorage requiere boto3: pip install boto3'
+            ) from e
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def _key(self, key):
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def save(self, key, archivo):
+        lector = _LectorConHash(archivo, self.chunk_size)
+        self.client.upload_fileobj(
+            lector, self.bucket, self._key(key),
+            ExtraArgs={'ContentType': 'application/pdf'},
+        )
+        return ArchivoGuardado(key=key, tamano=lector.tamano, sha256=lector.sha256.hexdigest())
+
+    def open(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        except ClientError as e:
+            raise PDFStorageError(f'No existe el archivo {key}') from e
+
+    def open_range(self, key, inicio, fin):
+        # GetObject con Range para no descargar el objeto completo
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(
+                Bucket=self.bucket, Key=self._key(key), Range=f'bytes={inicio}-{fin}'
+            )['Body']
+        except ClientError as e:
+            raise PDFStorageError(f'No existe el archivo {key}') from e
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError:
+            return False
+        return True
+
+
+class InMemoryPDFStorage(BasePDFStorage):
+    """Backend en memoria del proceso, para pruebas y desarrollo"""
+
+    def __init__(self):
+        self.archivos = {}
+
+    def save(self, key, archivo):
+        destino = io.BytesIO()
+        tamano, sha256 = self._copiar(archivo, destino)
+        self.archivos[key] = destino.getvalue()
+        return ArchivoGuardado(key=key, tamano=tamano, sha256=sha256)
+
+    def open(self, key):
+        try:
+            return io.BytesIO(self.archivos[key])
+        except KeyError as e:
+            raise PDFStorageError(f'No existe el archivo {key}') from e
+
+    def delete(self, key):
+        self.archivos.pop(key, None)
+
+    def exists(self, key):
+        return key in self.archivos
+
+
+@lru_cache(maxsize=None)
+def get_pdf_storage():
+    """Retorna la instancia (compartida en el proceso) del backend configurado"""
+    config = getattr(settings, 'PDF_STORAGE', None) or {
+        'BACKEND': 'productos.storage.FileSystemPDFStorage',
+    }
+    try:
+        backend = import_string(config['BACKEND'])
+    except ImportError as e:
+        raise ImproperlyConfigured(f"Backend de PDF inválido: {config['BACKEND']}") from e
+    return backend(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def _reiniciar_pdf_storage(setting, **kwargs):
+    if setting in ('PDF_STORAGE', 'MEDIA_ROOT'):
+        get_pdf_storage.cache_clear()
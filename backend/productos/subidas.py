@@ -0,0 +1,259 @@
+"""
+Subida por bloques del PDF de la orden de trabajo.
+
+``SubidaPDFHandler`` reemplaza a los upload handlers de Django en el alta y la
+edición de productos (ver ``ProductoViewSet.initialize_request``):
+
+- si el ``Content-Length`` del request ya supera ``MAX_UPLOAD_SIZE`` se
+  rechaza sin leer el cuerpo;
+- el PDF se escribe en un archivo temporal a medida que llega, en bloques de
+  ``CHUNK_SIZE``, y el sha256 se calcula en el camino;
+- la firma ``%PDF`` se verifica con el primer bloque y el tamaño con cada uno;
+  si falla se deja de leer el cuerpo.
+
+El archivo resultante (``PDFSubido``) trae su tamaño y su sha256, así que el
+almacenamiento en disco lo mueve a su lugar sin volver a leerlo (ver
+``FileSystemPDFStorage.save``). El motivo de un rechazo queda en el handler y
+la vista lo consulta con ``rechazo(request)``.
+
+Subidas reanudables (``/api/subidas/``, al estilo de tus.io): para PDFs de
+hasta ``SUBIDAS_MAX_SIZE`` que llegan por conexiones que se cortan. El cliente
+crea una ``SubidaPDF`` con el tamaño total, envía bloques con su offset
+(``recibir``), consulta el offset para retomar después de un corte y al final
+la adjunta a un producto (``finalizar``). Los bytes se acumulan en un archivo
+``<id>.part`` de ``SUBIDAS_DIR``, cuyo tamaño es el offset; un lock sobre ese
+archivo evita que dos requests escriban a la vez. Por eso todas las partes de
+una subida tienen que llegar al mismo servidor (disco local). Las subidas sin
+actividad por ``SUBIDAS_EXPIRACION`` segundos se borran con
+``python manage.py podar_subidas``.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+
+from .models import SubidaPDF
+from .storage import CHUNK_SIZE
+
+CAMPO = 'orden_trabajo_pdf'
+# Espacio para los demás campos del formulario y los separadores multipart
+MARGEN_FORMULARIO = 64 * 1024
+
+
+class SubidaRechazada(Exception):
+    """El PDF subido no se aceptó; ``status_code`` es el de la respuesta"""
+
+    def __init__(self, mensaje, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(mensaje)
+        self.status_code = status_code
+
+
+def _demasiado_grande(limite=None):
+    limite = limite or settings.MAX_UPLOAD_SIZE
+    return SubidaRechazada(
+        f'El archivo PDF no puede ser mayor a {limite // (1024 * 1024)}MB',
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+
+class PDFSubido(TemporaryUploadedFile):
+    """Archivo temporal con el sha256 calculado durante la subida"""
+    sha256 = None
+
+
+class SubidaPDFHandler(FileUploadHandler):
+    """Recibe el PDF por bloques (ver el docstring del módulo)"""
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.limite = settings.MAX_UPLOAD_SIZE
+        self.rechazo = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.limite + MARGEN_FORMULARIO:
+            self.rechazo = _demasiado_grande()
+            # Sin datos ni archivos: el cuerpo no se lee
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != CAMPO:
+            # La API no recibe otros archivos en el alta ni en la edición
+            raise SkipFile()
+        self.file = PDFSubido(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not raw_data.startswith(b'%PDF'):
+            self._rechazar(SubidaRechazada('El archivo debe ser un PDF válido'))
+        if start + len(raw_data) > self.limite:
+            self._rechazar(_demasiado_grande())
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def _rechazar(self, rechazo):
+        self.rechazo = rechazo
+        # Django cierra (y borra) el temporal; el resto del cuerpo no se lee
+        raise StopUpload(connection_reset=True)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+def rechazo(request):
+    """``SubidaRechazada`` con el motivo por el que no se aceptó el PDF, o None"""
+    # Los handlers actúan al parsear el cuerpo
+    request.data
+    for handler in request.upload_handlers:
+        if getattr(handler, 'rechazo', None) is not None:
+            return handler.rechazo
+    return None
+
+
+# Subidas reanudables
+
+class PDFEnDisco(File):
+    """PDF completo en disco con su sha256, listo para moverlo al almacenamiento"""
+
+    def __init__(self, archivo, nombre, sha256):
+        super().__init__(archivo, nombre)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _expiracion():
+    return timezone.now() + timedelta(seconds=settings.SUBIDAS_EXPIRACION)
+
+
+def ruta_parcial(subida):
+    return os.path.join(settings.SUBIDAS_DIR, f'{subida.pk}.part')
+
+
+def _abrir_con_lock(subida):
+    """Abre el archivo parcial con un lock exclusivo (sin esperar)"""
+    try:
+        archivo = open(ruta_parcial(subida), 'r+b')
+    except FileNotFoundError:
+        raise SubidaRechazada('La subida no existe', status.HTTP_404_NOT_FOUND)
+    if not locks.lock(archivo, locks.LOCK_EX | locks.LOCK_NB):
+        archivo.close()
+        raise SubidaRechazada('La subida está recibiendo otro bloque', status.HTTP_423_LOCKED)
+    return archivo
+
+
+def crear(usuario_id, tamano, nombre_archivo=''):
+    """Crea una subida de ``tamano`` bytes con su archivo parcial vacío"""
+    if tamano <= 0:
+        raise SubidaRechazada('El tamaño de la subida debe ser mayor a 0')
+    if tamano > settings.SUBIDAS_MAX_SIZE:
+        raise _demasiado_grande(settings.SUBIDAS_MAX_SIZE)
+    subida = SubidaPDF.objects.create(
+        usuario_id=usuario_id, tamano=tamano, nombre_archivo=nombre_archivo[:255], expira=_expiracion()
+    )
+    os.makedirs(settings.SUBIDAS_DIR, exist_ok=True)
+    open(ruta_parcial(subida), 'xb').close()
+    return subida
+
+
+def offset(subida):
+    """Bytes recibidos hasta ahora"""
+    try:
+        return os.path.getsize(ruta_parcial(subida))
+    except FileNotFoundError:
+        raise SubidaRechazada('La subida no existe', status.HTTP_404_NOT_FOUND)
+
+
+def recibir(subida, desde, origen, longitud):
+    """
+    Agrega ``longitud`` bytes leídos de ``origen`` a partir del offset ``desde``,
+    que tiene que ser el actual. Escribe cada bloque apenas llega: si la conexión
+    se corta, lo recibido queda y el cliente retoma desde el nuevo offset.
+    Retorna el offset final.
+    """
+    with _abrir_con_lock(subida) as archivo:
+        actual = archivo.seek(0, os.SEEK_END)
+        if desde != actual:
+            raise SubidaRechazada(f'El offset actual es {actual}', status.HTTP_409_CONFLICT)
+        if actual + longitud > subida.tamano:
+            raise SubidaRechazada('El bloque excede el tamaño declarado de la subida',
+                                  status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        restante = longitud
+        while restante:
+            bloque = origen.read(min(CHUNK_SIZE, restante))
+            if not bloque:
+                break
+            # La firma se verifica con los primeros bytes, aunque lleguen de a poco
+            inicio = archivo.tell()
+            if inicio < 4 and not b'%PDF'[inicio:].startswith(bloque[:4 - inicio]):
+                raise SubidaRechazada('El archivo debe ser un PDF válido')
+            archivo.write(bloque)
+            restante -= len(bloque)
+        recibido = archivo.tell()
+    subida.expira = _expiracion()
+    SubidaPDF.objects.filter(pk=subida.pk).update(expira=subida.expira)
+    return recibido
+
+
+def finalizar(subida, producto):
+    """Adjunta el PDF completo a ``producto`` y borra la subida; retorna el documento"""
+    with _abrir_con_lock(subida) as archivo:
+        if archivo.seek(0, os.SEEK_END) != subida.tamano:
+            raise SubidaRechazada('La subida está incompleta', status.HTTP_409_CONFLICT)
+        archivo.seek(0)
+        sha256 = hashlib.sha256()
+        while bloque := archivo.read(CHUNK_SIZE):
+            sha256.update(bloque)
+        archivo.seek(0)
+        documento = producto.adjuntar_pdf(
+            PDFEnDisco(archivo, subida.nombre_archivo or 'ot.pdf', sha256.hexdigest()),
+            nombre_archivo=subida.nombre_archivo,
+            tamano_maximo=settings.SUBIDAS_MAX_SIZE,
+        )
+    cancelar(subida)
+    return documento
+
+
+def cancelar(subida):
+    """Borra la subida y lo recibido (el archivo ya no está si se movió al almacenamiento)"""
+    ruta = ruta_parcial(subida)
+    subida.delete()
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def podar():
+    """Borra las subidas vencidas y los archivos parciales sin subida; retorna cuántas"""
+    vencidas = list(SubidaPDF.objects.filter(expira__lte=timezone.now()))
+    for subida in vencidas:
+        cancelar(subida)
+    if os.path.isdir(settings.SUBIDAS_DIR):
+        vigentes = {str(pk) for pk in SubidaPDF.objects.values_list('pk', flat=True)}
+        limite = timezone.now().timestamp() - settings.SUBIDAS_EXPIRACION
+        for nombre in os.listdir(settings.SUBIDAS_DIR):
+            ruta = os.path.join(settings.SUBIDAS_DIR, nombre)
+            # Los recién creados pueden no tener todavía su fila confirmada
+            if (nombre.endswith('.part') and nombre[:-len('.part')] not in vigentes
+                    and os.path.getmtime(ruta) < limite):
+                os.remove(ruta)
+    return len(vencidas)
@@ -0,0 +1,160 @@
+"""
+Vistas de las subidas reanudables de PDFs (ver subidas.py).
+
+    POST   /api/subidas/                  Upload-Length: <bytes>          -> 201 + Location
+    HEAD   /api/subidas/{id}/                                             -> Upload-Offset
+    PATCH  /api/subidas/{id}/             Upload-Offset: <bytes recibidos>
+                                          Content-Type: application/offset+octet-stream
+    POST   /api/subidas/{id}/finalizar/   {"producto": <id>}              -> producto
+    DELETE /api/subidas/{id}/
+
+``Upload-Metadata`` (opcional al crear) lleva el nombre del archivo como en
+tus: ``filename <nombre en base64>``.
+"""
+import base64
+import binascii
+import logging
+
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import subidas
+from .models import Producto, SubidaPDF
+from .serializers import ProductoSerializer
+from .subidas import SubidaRechazada
+
+logger = logging.getLogger(__name__)
+
+TIPO_BLOQUE = 'application/offset+octet-stream'
+
+
+def _entero(valor):
+    """Entero no negativo, o None si ``valor`` no lo es"""
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if numero >= 0 else None
+
+
+def _nombre_archivo(metadata):
+    """``filename`` de Upload-Metadata (pares 'clave valor-en-base64' separados por comas)"""
+    for par in (metadata or '').split(','):
+        clave, _, valor = par.strip().partition(' ')
+        if clave == 'filename':
+            try:
+                return base64.b64decode(valor, validate=True).decode('utf-8')
+            except (binascii.Error, UnicodeDecodeError):
+                return ''
+    return ''
+
+
+def _obtener(request, pk):
+    subida = SubidaPDF.objects.filter(pk=pk, usuario_id=request.user.id).first()
+    if subida is None:
+        raise SubidaRechazada('La subida no existe', status.HTTP_404_NOT_FOUND)
+    if subida.expira <= timezone.now():
+        raise SubidaRechazada('La subida venció', status.HTTP_410_GONE)
+    return subida
+
+
+def _cabeceras(subida, recibido):
+    return {
+        'Upload-Offset': str(recibido),
+        'Upload-Length': str(subida.tamano),
+        'Upload-Expires': http_date(subida.expira.timestamp()),
+        'Cache-Control': 'no-store',
+    }
+
+
+def _error(e):
+    return Response({'error': str(e)}, status=e.status_code)
+
+
+class SubidasView(APIView):
+    """Crea una subida reanudable"""
+
+    def post(self, request):
+        tamano = _entero(request.headers.get('Upload-Length'))
+        if tamano is None:
+            return Response({'error': 'Falta la cabecera Upload-Length'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            subida = subidas.crear(
+                request.user.id, tamano, _nombre_archivo(request.headers.get('Upload-Metadata'))
+            )
+        except SubidaRechazada as e:
+            return _error(e)
+
+        logger.info('Subida reanudable creada: %s bytes', tamano, extra={
+            'subida_id': str(subida.pk), 'usuario': request.user.username,
+        })
+        response = Response(
+            {'id': str(subida.pk), 'offset': 0, 'tamano': subida.tamano, 'expira': subida.expira},
+            status=status.HTTP_201_CREATED, headers=_cabeceras(subida, 0),
+        )
+        response['Location'] = request.build_absolute_uri(reverse('subida-detail', args=[subida.pk]))
+        return response
+
+
+class SubidaView(APIView):
+    """Offset, bloques y cancelación de una subida reanudable"""
+
+    def head(self, request, pk):
+        try:
+            subida = _obtener(request, pk)
+            recibido = subidas.offset(subida)
+        except SubidaRechazada as e:
+            return Response(status=e.status_code)
+        return Response(headers=_cabeceras(subida, recibido))
+
+    def patch(self, request, pk):
+        if request.content_type.split(';')[0].strip() != TIPO_BLOQUE:
+            return Response({'error': f'El bloque debe enviarse como {TIPO_BLOQUE}'},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        desde = _entero(request.headers.get('Upload-Offset'))
+        if desde is None:
+            return Response({'error': 'Falta la cabecera Upload-Offset'}, status=status.HTTP_400_BAD_REQUEST)
+        longitud = _entero(request.META.get('CONTENT_LENGTH'))
+        if longitud is None:
+            return Response({'error': 'Falta la cabecera Content-Length'}, status=status.HTTP_411_LENGTH_REQUIRED)
+        try:
+            subida = _obtener(request, pk)
+            # El cuerpo se lee por bloques directamente del request
+            recibido = subidas.recibir(subida, desde, request.stream, longitud)
+        except SubidaRechazada as e:
+            return _error(e)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=_cabeceras(subida, recibido))
+
+    def delete(self, request, pk):
+        try:
+            subida = _obtener(request, pk)
+        except SubidaRechazada as e:
+            return _error(e)
+        subidas.cancelar(subida)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+def finalizar_subida(request, pk):
+    """Adjunta el PDF de una subida completa a un producto"""
+    producto = Producto.objects.filter(activo=True, pk=_entero(request.data.get('producto'))).first()
+    if producto is None:
+        return Response({'error': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        subida = _obtener(request, pk)
+        documento = subidas.finalizar(subida, producto)
+    except SubidaRechazada as e:
+        return _error(e)
+    except ValidationError as e:
+        return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+    logger.info('PDF adjuntado desde una subida reanudable: %s', producto.nombre, extra={
+        'producto_id': producto.id, 'usuario': request.user.username, 'pdf_bytes': documento.tamano,
+    })
+    return Response(ProductoSerializer(producto, context={'request': request}).data)
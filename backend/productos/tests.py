@@ -1,3 +1,1513 @@
-from django.test import TestCase
+"""
+Pruebas de la app productos.
 
-# Create your tests here.
+Ejecutar con: python manage.py test --settings=mi_proyecto.settings_test
+"""
+import csv
+import hashlib
+import importlib
+import io
+import json
+import logging
+import logging.config
+import os
+import re
+import shutil
+import tempfile
+import threading
+import tracemalloc
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, OperationalError, connection, transaction
+from django.test.client import ClientHandler
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.throttling import SimpleRateThrottle, UserRateThrottle
+
+try:
+    import fakeredis
+except ImportError:  # Opcional: solo para las pruebas de la caché compartida
+    fakeredis = None
+
+from mi_proyecto import metricas
+from mi_proyecto.registro import ColaHandler, FiltroCorrelacion, FiltroMuestreo, FormatoJSON, configuracion
+
+from . import cache_respuestas, estadisticas
+from .autenticacion import JWTStatelessAuthentication, TokenProductos
+from .hashers import PBKDF2Ajustado
+from .importacion import ImportacionInterrumpida, ImportadorProductos, leer_filas
+from .models import MovimientoStock, Producto, ProductoDocumento, SubidaPDF, pdfs_provisorios
+from .pagination import ProductoPagination
+from .serializers import ProductoCreateSerializer
+from .views import ProductoViewSet
+from .storage import FileSystemPDFStorage, get_pdf_storage
+
+PDF_EJEMPLO = b'%PDF-1.4\n' + b'contenido de prueba ' * 500 + b'\n%%EOF'
+
+
+def crear_producto(**kwargs):
+    datos = {'nombre': 'Producto', 'precio': '10.00', 'stock': 5}
+    datos.update(kwargs)
+    return Producto.objects.create(**datos)
+
+
+class APITestCase(TestCase):
+    """Base con un usuario autenticado y la caché vacía"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class PDFStorageTests(TestCase):
+
+    def test_filesystem_guarda_por_bloques_y_calcula_hash(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        storage = FileSystemPDFStorage(location=directorio)
+        storage.chunk_size = 1024
+
+        guardado = storage.save('productos/1/a.pdf', SimpleUploadedFile('a.pdf', PDF_EJEMPLO))
+
+        self.assertEqual(guardado.tamano, len(PDF_EJEMPLO))
+        self.assertEqual(len(guardado.sha256), 64)
+        with storage.open(guardado.key) as archivo:
+            self.assertEqual(archivo.read(), PDF_EJEMPLO)
+        storage.delete(guardado.key)
+        self.assertFalse(storage.exists(guardado.key))
+
+    def test_filesystem_rechaza_claves_fuera_del_directorio(self):
+        storage = FileSystemPDFStorage(location=tempfile.gettempdir())
+        with self.assertRaises(Exception):
+            storage.path('../../etc/passwd')
+
+
+class DocumentoPDFTests(APITestCase):
+
+    def test_crear_con_pdf_guarda_documento_fuera_de_la_tabla(self):
+        response = self.client.post('/api/productos/', {
+            'nombre': 'Con PDF',
+            'precio': '15.00',
+            'stock': 3,
+            'orden_trabajo_pdf': SimpleUploadedFile('ot.pdf', PDF_EJEMPLO, content_type='application/pdf'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(response.data['tiene_pdf'])
+        producto = Producto.objects.get(nombre='Con PDF')
+        self.assertIsNone(producto.orden_trabajo_pdf)
+        documento = producto.documento
+        self.assertEqual(documento.tamano, len(PDF_EJEMPLO))
+        with get_pdf_storage().open(documento.storage_key) as archivo:
+            self.assertEqual(archivo.read(), PDF_EJEMPLO)
+
+    def test_pdf_invalido_no_crea_producto(self):
+        response = self.client.post('/api/productos/', {
+            'nombre': 'PDF falso',
+            'precio': '15.00',
+            'orden_trabajo_pdf': SimpleUploadedFile('ot.pdf', b'no es un pdf'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Producto.objects.filter(nombre='PDF falso').exists())
+
+    def test_descargar_ot_transmite_desde_el_almacenamiento(self):
+        producto = crear_producto()
+        producto.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF_EJEMPLO))
+
+        response = self.client.get(f'/api/productos/{producto.id}/descargar-ot/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(int(response['Content-Length']), len(PDF_EJEMPLO))
+        self.assertEqual(b''.join(response.streaming_content), PDF_EJEMPLO)
+
+    def test_descargar_ot_sin_pdf(self):
+        producto = crear_producto()
+        response = self.client.get(f'/api/productos/{producto.id}/descargar-ot/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_reemplazar_pdf_borra_el_anterior_al_confirmar(self):
+        producto = crear_producto()
+        with self.captureOnCommitCallbacks(execute=True):
+            anterior = producto.adjuntar_pdf(SimpleUploadedFile('a.pdf', PDF_EJEMPLO)).storage_key
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = producto.adjuntar_pdf(SimpleUploadedFile('b.pdf', PDF_EJEMPLO + b' ')).storage_key
+
+        storage = get_pdf_storage()
+        self.assertFalse(storage.exists(anterior))
+        self.assertTrue(storage.exists(nuevo))
+        self.assertEqual(ProductoDocumento.objects.filter(producto=producto).count(), 1)
+
+    def test_revertir_la_transaccion_de_quien_llama_borra_el_pdf_nuevo(self):
+        producto = crear_producto()
+        with self.captureOnCommitCallbacks(execute=True):
+            anterior = producto.adjuntar_pdf(SimpleUploadedFile('a.pdf', PDF_EJEMPLO)).storage_key
+
+        with self.assertRaises(OperationalError):
+            with pdfs_provisorios(), transaction.atomic():
+                nuevo = producto.adjuntar_pdf(SimpleUploadedFile('b.pdf', PDF_EJEMPLO + b' ')).storage_key
+                raise OperationalError('se perdió la conexión')
+
+        storage = get_pdf_storage()
+        self.assertFalse(storage.exists(nuevo))
+        self.assertTrue(storage.exists(anterior))
+        self.assertEqual(ProductoDocumento.objects.get(producto=producto).storage_key, anterior)
+
+    def test_migracion_mueve_pdfs_heredados(self):
+        producto = crear_producto(orden_trabajo_pdf=PDF_EJEMPLO)
+        migracion = importlib.import_module('productos.migrations.0006_mover_pdfs_a_almacenamiento')
+
+        migracion.mover_pdfs_a_almacenamiento(apps, None)
+
+        producto.refresh_from_db()
+        self.assertIsNone(producto.orden_trabajo_pdf)
+        with producto.abrir_pdf() as archivo:
+            self.assertEqual(archivo.read(), PDF_EJEMPLO)
+
+
+class SubidaPDFTests(APITestCase):
+    """El PDF se recibe por bloques: nunca completo en memoria"""
+    BOUNDARY = 'LimiteDePrueba'
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        storage = override_settings(PDF_STORAGE={
+            'BACKEND': 'productos.storage.FileSystemPDFStorage',
+            'OPTIONS': {'location': directorio},
+        })
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def cuerpo(self, nombre, tamano, cabecera=b'%PDF-1.4\n'):
+        """Cuerpo multipart escrito en un temporal, con un PDF de ``tamano`` bytes"""
+        cuerpo = tempfile.TemporaryFile()
+        self.addCleanup(cuerpo.close)
+        cuerpo.write((
+            f'--{self.BOUNDARY}\r\nContent-Disposition: form-data; name="nombre"\r\n\r\n{nombre}\r\n'
+            f'--{self.BOUNDARY}\r\nContent-Disposition: form-data; name="precio"\r\n\r\n15.00\r\n'
+            f'--{self.BOUNDARY}\r\nContent-Disposition: form-data; name="orden_trabajo_pdf"; '
+            f'filename="ot.pdf"\r\nContent-Type: application/pdf\r\n\r\n'
+        ).encode())
+        sha256 = hashlib.sha256(cabecera)
+        cuerpo.write(cabecera)
+        bloque = b'0' * 65536
+        for inicio in range(len(cabecera), tamano, len(bloque)):
+            parte = bloque[:tamano - inicio]
+            sha256.update(parte)
+            cuerpo.write(parte)
+        cuerpo.write(f'\r\n--{self.BOUNDARY}--\r\n'.encode())
+        cuerpo.seek(0)
+        return cuerpo, sha256.hexdigest()
+
+    def enviar(self, cuerpo):
+        # Como un servidor WSGI: el cuerpo se lee del socket (aquí, del temporal)
+        return ClientHandler()({
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/api/productos/',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http',
+            'CONTENT_TYPE': f'multipart/form-data; boundary={self.BOUNDARY}',
+            'CONTENT_LENGTH': str(os.fstat(cuerpo.fileno()).st_size),
+            'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}',
+            'wsgi.input': cuerpo,
+        })
+
+    def test_memoria_maxima_por_subida(self):
+        tamano = 8 * 1024 * 1024
+        cuerpo, sha256 = self.cuerpo('PDF grande', tamano)
+
+        tracemalloc.start()
+        try:
+            response = self.enviar(cuerpo)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertLess(pico, tamano // 4)
+        documento = Producto.objects.get(nombre='PDF grande').documento
+        self.assertEqual((documento.tamano, documento.sha256), (tamano, sha256))
+        self.assertEqual(os.path.getsize(get_pdf_storage().path(documento.storage_key)), tamano)
+
+    @override_settings(MAX_UPLOAD_SIZE=1024 * 1024)
+    def test_cuerpo_demasiado_grande_se_rechaza_sin_leerlo(self):
+        cuerpo, _ = self.cuerpo('Muy grande', 2 * 1024 * 1024)
+
+        response = self.enviar(cuerpo)
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(cuerpo.tell(), 0)
+        self.assertFalse(Producto.objects.filter(nombre='Muy grande').exists())
+
+    def test_firma_invalida_corta_la_lectura(self):
+        cuerpo, _ = self.cuerpo('No es PDF', 4 * 1024 * 1024, cabecera=b'GIF89a')
+
+        response = self.enviar(cuerpo)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['error'], 'El archivo debe ser un PDF válido')
+        self.assertLess(cuerpo.tell(), 1024 * 1024)
+        self.assertFalse(Producto.objects.filter(nombre='No es PDF').exists())
+
+
+class SubidasReanudablesTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(SUBIDAS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def crear_subida(self, tamano):
+        response = self.client.post('/api/subidas/', HTTP_UPLOAD_LENGTH=str(tamano),
+                                    HTTP_UPLOAD_METADATA='filename b3QtZXNjYW5lYWRhLnBkZg==')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response['Location']
+
+    def enviar_bloque(self, url, offset, datos):
+        return self.client.patch(url, datos, content_type='application/offset+octet-stream',
+                                 HTTP_UPLOAD_OFFSET=str(offset))
+
+    @override_settings(MAX_UPLOAD_SIZE=1024)
+    def test_subida_en_bloques_con_corte_y_reanudacion(self):
+        producto = crear_producto()
+        contenido = PDF_EJEMPLO  # ~10 KB, más que MAX_UPLOAD_SIZE
+        url = self.crear_subida(len(contenido))
+
+        self.assertEqual(self.enviar_bloque(url, 0, contenido[:4000]).status_code, 204)
+        # El cliente perdió la respuesta y reintenta con un offset viejo
+        self.assertEqual(self.enviar_bloque(url, 0, contenido[:4000]).status_code, 409)
+        offset = int(self.client.head(url)['Upload-Offset'])
+        self.assertEqual(offset, 4000)
+        response = self.enviar_bloque(url, offset, contenido[offset:])
+        self.assertEqual(response['Upload-Offset'], str(len(contenido)))
+
+        response = self.client.post(f'{url}finalizar/', {'producto': producto.id}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.data['tiene_pdf'])
+        documento = ProductoDocumento.objects.get(producto=producto)
+        self.assertEqual(documento.nombre_archivo, 'ot-escaneada.pdf')
+        self.assertEqual(documento.sha256, hashlib.sha256(contenido).hexdigest())
+        with producto.abrir_pdf() as archivo:
+            self.assertEqual(archivo.read(), contenido)
+        self.assertFalse(SubidaPDF.objects.exists())
+        self.assertEqual(os.listdir(self.directorio), [])
+
+    def test_falla_al_registrar_el_pdf_deja_la_subida_reanudable(self):
+        almacenamiento = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, almacenamiento)
+        ajustes = override_settings(PDF_STORAGE={
+            'BACKEND': 'productos.storage.FileSystemPDFStorage',
+            'OPTIONS': {'location': almacenamiento},
+        })
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        producto = crear_producto()
+        url = self.crear_subida(len(PDF_EJEMPLO))
+        self.enviar_bloque(url, 0, PDF_EJEMPLO)
+
+        with mock.patch.object(ProductoDocumento.objects, 'update_or_create',
+                               side_effect=DatabaseError('se cayó la conexión')):
+            with self.assertRaises(DatabaseError):
+                self.client.post(f'{url}finalizar/', {'producto': producto.id}, format='json')
+
+        # El archivo movido al almacenamiento volvió a la subida
+        self.assertEqual(len(os.listdir(self.directorio)), 1)
+        self.assertEqual(self.client.head(url)['Upload-Offset'], str(len(PDF_EJEMPLO)))
+        response = self.client.post(f'{url}finalizar/', {'producto': producto.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        with producto.abrir_pdf() as archivo:
+            self.assertEqual(archivo.read(), PDF_EJEMPLO)
+
+    def test_rechazos(self):
+        with override_settings(SUBIDAS_MAX_SIZE=1000):
+            self.assertEqual(self.client.post('/api/subidas/', HTTP_UPLOAD_LENGTH='1001').status_code, 413)
+        url = self.crear_subida(100)
+
+        self.assertEqual(self.enviar_bloque(url, 0, b'GIF89a').status_code, 400)
+        self.assertEqual(self.enviar_bloque(url, 0, b'%PDF' + b'0' * 100).status_code, 413)
+        self.assertEqual(self.enviar_bloque(url, 0, b'%PDF').status_code, 204)
+        response = self.client.post(f'{url}finalizar/', {'producto': crear_producto().id}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+        otro = APIClient()
+        otro.force_authenticate(User.objects.create_user(username='otro', password='clave-segura-123'))
+        self.assertEqual(otro.head(url).status_code, 404)
+
+    def test_podar_subidas_vencidas(self):
+        url = self.crear_subida(100)
+        self.enviar_bloque(url, 0, b'%PDF-1.4')
+        SubidaPDF.objects.update(expira=timezone.now())
+
+        self.assertEqual(self.client.head(url).status_code, 410)
+        call_command('podar_subidas', stdout=io.StringIO())
+
+        self.assertFalse(SubidaPDF.objects.exists())
+        self.assertEqual(os.listdir(self.directorio), [])
+
+
+class ColumnasDiferidasTests(APITestCase):
+    # La columna seleccionada tal cual (no dentro de IS NOT NULL / OCTET_LENGTH)
+    COLUMNA_PDF = re.compile(r'"productos_producto"\."orden_trabajo_pdf"\s*(,|FROM)')
+
+    def setUp(self):
+        super().setUp()
+        self.con_documento = crear_producto(nombre='Con documento')
+        self.con_documento.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF_EJEMPLO))
+        self.heredado = crear_producto(nombre='Heredado', orden_trabajo_pdf=PDF_EJEMPLO)
+        self.sin_pdf = crear_producto(nombre='Sin PDF')
+
+    def assertNoSeleccionaPDF(self, queries):
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('SELECT'):
+                self.assertIsNone(self.COLUMNA_PDF.search(sql), sql)
+
+    def test_listado_no_selecciona_el_pdf(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/productos/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNoSeleccionaPDF(ctx.captured_queries)
+
+        tiene_pdf = {p['nombre']: p['tiene_pdf'] for p in response.data['results']}
+        self.assertEqual(tiene_pdf, {'Con documento': True, 'Heredado': True, 'Sin PDF': False})
+
+    def test_detalle_no_selecciona_el_pdf(self):
+        for producto in (self.con_documento, self.heredado, self.sin_pdf):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'/api/productos/{producto.id}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertNoSeleccionaPDF(ctx.captured_queries)
+
+        # La segunda vez sale de la caché de respuestas (JSON ya renderizado)
+        datos = self.client.get(f'/api/productos/{self.heredado.id}/').json()
+        self.assertTrue(datos['orden_trabajo_pdf'])
+        self.assertEqual(datos['pdf_size'], len(PDF_EJEMPLO))
+
+    def test_filtro_con_pdf(self):
+        response = self.client.get('/api/productos/', {'con_pdf': 'true'})
+        nombres = {p['nombre'] for p in response.data['results']}
+        self.assertEqual(nombres, {'Con documento', 'Heredado'})
+
+
+class DescargaCondicionalTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.producto = crear_producto()
+        self.producto.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF_EJEMPLO))
+        self.url = f'/api/productos/{self.producto.id}/descargar-ot/'
+
+    def test_incluye_etag_y_last_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.producto.documento.sha256}"')
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_if_none_match_retorna_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since_retorna_304(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_rango_simple(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(PDF_EJEMPLO)}')
+        self.assertEqual(b''.join(response.streaming_content), PDF_EJEMPLO[100:200])
+
+    def test_rango_sufijo_y_abierto(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), PDF_EJEMPLO[-10:])
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(PDF_EJEMPLO) - 5}-')
+        self.assertEqual(b''.join(response.streaming_content), PDF_EJEMPLO[-5:])
+
+    def test_multiples_rangos(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3,10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges'))
+        cuerpo = b''.join(response.streaming_content)
+        self.assertEqual(len(cuerpo), int(response['Content-Length']))
+        self.assertIn(b'Content-Range: bytes 0-3/', cuerpo)
+        self.assertIn(b'\r\n\r\n' + PDF_EJEMPLO[10:20] + b'\r\n', cuerpo)
+
+    def test_rango_fuera_del_archivo_retorna_416(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(PDF_EJEMPLO) + 10}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(PDF_EJEMPLO)}')
+
+    def test_if_range_desactualizado_envia_archivo_completo(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PDF_EJEMPLO)
+
+
+@mock.patch.object(ProductoPagination, 'page_size', 4)
+class PaginacionKeysetTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        base = timezone.now()
+        for i in range(10):
+            crear_producto(nombre=f'Producto {i}')
+        # Varios productos con la misma fecha para probar el desempate por id
+        ids = list(Producto.objects.order_by('id').values_list('id', flat=True))
+        for posicion, pk in enumerate(ids):
+            Producto.objects.filter(pk=pk).update(fecha_creacion=base - timedelta(seconds=posicion // 3))
+        self.esperados = list(
+            Producto.objects.order_by('-fecha_creacion', '-id').values_list('id', flat=True)
+        )
+
+    def recorrer(self, url, enlace):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.append([p['id'] for p in response.data['results']])
+            url = response.data[enlace]
+        return ids
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        paginas = self.recorrer('/api/productos/?paginacion=cursor', 'next')
+        self.assertEqual([len(p) for p in paginas], [4, 4, 2])
+        self.assertEqual(sum(paginas, []), self.esperados)
+
+    def test_pagina_anterior(self):
+        response = self.client.get('/api/productos/?paginacion=cursor')
+        response = self.client.get(response.data['next'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+
+        paginas = self.recorrer(response.data['previous'], 'previous')
+        self.assertEqual(paginas, [self.esperados[4:8], self.esperados[0:4]])
+
+    def test_modo_cursor_no_cuenta_filas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/productos/?paginacion=cursor')
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+    def test_conteo_aproximado_opcional(self):
+        for url in ('/api/productos/?paginacion=cursor&conteo=aproximado',
+                    '/api/productos/?conteo=aproximado'):
+            count = self.client.get(url).data['count']
+            if connection.vendor == 'postgresql':
+                self.assertIsInstance(count, int)
+            else:
+                # Sin estimaciones del planificador se usa el conteo exacto
+                self.assertEqual(count, 10)
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/productos/?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_paginacion_por_pagina_sin_cambios(self):
+        response = self.client.get('/api/productos/?page=2')
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual([p['id'] for p in response.data['results']], self.esperados[4:8])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'los planes de los índices parciales son de PostgreSQL')
+class PlanesConsultaTests(APITestCase):
+    """Ninguna combinación de filtros del listado recorre la tabla completa"""
+    FILAS = 100_000
+    COMBINACIONES = [
+        {},
+        {'precio_min': 100, 'precio_max': 110},
+        {'con_stock': 'true'},
+        {'con_pdf': 'true'},
+        {'nombre': 'producto 4242'},
+        {'q': 'tornillo'},
+        {'con_stock': 'true', 'precio_min': 100, 'precio_max': 110},
+        {'con_pdf': 'true', 'con_stock': 'true'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Producto {i}',
+                precio=1 + i % 5000,
+                descripcion='Tornillo de acero' if i % 1000 == 0 else 'Artículo de ferretería',
+                stock=i % 3,
+                activo=i % 10 != 0,
+            )
+            for i in range(cls.FILAS)
+        ], batch_size=5000)
+        ProductoDocumento.objects.bulk_create([
+            ProductoDocumento(producto_id=pk, storage_key=f'productos/{pk}/ot.pdf', tamano=1, sha256='0' * 64)
+            for pk in Producto.objects.order_by('?').values_list('pk', flat=True)[:20]
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE productos_producto, productos_productodocumento')
+
+    def recorridos_secuenciales(self, plan):
+        nodos = [plan]
+        while nodos:
+            nodo = nodos.pop()
+            if nodo['Node Type'] == 'Seq Scan' and nodo['Relation Name'] == 'productos_producto':
+                yield nodo
+            nodos.extend(nodo.get('Plans', ()))
+
+    def test_sin_recorridos_secuenciales(self):
+        for filtros in self.COMBINACIONES:
+            # En modo cursor no hay COUNT(*) exacto, que por diseño cuenta todas las filas
+            with self.subTest(**filtros), CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/productos/', {**filtros, 'paginacion': 'cursor'})
+                self.assertEqual(response.status_code, 200)
+                consultas = [
+                    q['sql'] for q in ctx.captured_queries
+                    if q['sql'].startswith('SELECT') and 'FROM "productos_producto"' in q['sql']
+                ]
+                self.assertTrue(consultas)
+                for sql in consultas:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                        plan = cursor.fetchone()[0][0]['Plan']
+                    self.assertEqual(list(self.recorridos_secuenciales(plan)), [], sql)
+
+
+class BusquedaTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        crear_producto(nombre='Tornillo hexagonal', descripcion='Acero inoxidable')
+        crear_producto(nombre='Tuerca', descripcion='Para tornillo hexagonal')
+        crear_producto(nombre='Tornillo', descripcion='Cabeza plana')
+        crear_producto(nombre='Arandela', descripcion='Plana')
+
+    def test_q_busca_en_nombre_y_descripcion_por_relevancia(self):
+        response = self.client.get('/api/productos/', {'q': 'tornillo'})
+        nombres = [p['nombre'] for p in response.data['results']]
+        # Coincidencia exacta del nombre primero; solo descripción al final
+        self.assertEqual(nombres, ['Tornillo', 'Tornillo hexagonal', 'Tuerca'])
+
+    def test_q_con_varias_palabras(self):
+        response = self.client.get('/api/productos/', {'q': 'tornillo plana'})
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Tornillo'])
+
+    def test_q_combinado_con_filtros(self):
+        Producto.objects.filter(nombre='Tornillo').update(stock=0)
+        response = self.client.get('/api/productos/', {'q': 'tornillo', 'con_stock': 'true'})
+        self.assertEqual(
+            [p['nombre'] for p in response.data['results']], ['Tornillo hexagonal', 'Tuerca']
+        )
+
+    def test_q_con_paginacion_cursor_usa_paginas(self):
+        response = self.client.get('/api/productos/', {'q': 'tornillo', 'paginacion': 'cursor'})
+        self.assertEqual(response.data['count'], 3)
+
+
+class StockTests(APITestCase):
+
+    def test_reducir_stock_registra_movimiento(self):
+        producto = crear_producto(stock=10)
+        response = self.client.post(f'/api/productos/{producto.id}/reducir-stock/', {'cantidad': 3}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock_actual'], 7)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 7)
+        movimiento = producto.movimientos_stock.get()
+        self.assertEqual(
+            (movimiento.tipo, movimiento.cantidad, movimiento.stock_resultante, movimiento.usuario),
+            (MovimientoStock.SALIDA, 3, 7, self.user)
+        )
+
+    def test_reducir_stock_insuficiente_no_modifica_nada(self):
+        producto = crear_producto(stock=2)
+        response = self.client.post(f'/api/productos/{producto.id}/reducir-stock/', {'cantidad': 3}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 2)
+        self.assertFalse(producto.movimientos_stock.exists())
+
+    def test_reducir_sin_stock_configurado(self):
+        producto = crear_producto(stock=None)
+        with self.assertRaisesMessage(ValidationError, 'no tiene stock configurado'):
+            producto.reducir_stock(1)
+
+    def test_aumentar_stock_sin_configurar_parte_de_cero(self):
+        producto = crear_producto(stock=None)
+        response = self.client.post(f'/api/productos/{producto.id}/aumentar-stock/', {'cantidad': 4}, format='json')
+
+        self.assertEqual(response.data['stock_actual'], 4)
+        self.assertEqual(producto.movimientos_stock.get().tipo, MovimientoStock.ENTRADA)
+
+    def test_reducir_stock_es_una_sola_sentencia_update(self):
+        producto = crear_producto(stock=10)
+        with CaptureQueriesContext(connection) as ctx:
+            producto.reducir_stock(1)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('RETURNING', updates[0])
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in ctx.captured_queries))
+
+    def test_movimientos_no_se_modifican(self):
+        producto = crear_producto(stock=10)
+        producto.reducir_stock(1)
+        movimiento = producto.movimientos_stock.get()
+        movimiento.cantidad = 100
+        with self.assertRaises(ValidationError):
+            movimiento.save()
+
+
+class GuardadoProductoTests(APITestCase):
+    """Alta y edición con una sola escritura de la fila; las reglas las aplica la base"""
+
+    def escrituras(self, queries):
+        return [
+            q['sql'].split()[0] for q in queries
+            if q['sql'].startswith(('INSERT', 'UPDATE')) and '"productos_producto"' in q['sql'].split('SET')[0]
+        ]
+
+    def test_crear_con_pdf_es_un_solo_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/productos/', {
+                'nombre': 'Con PDF', 'precio': '15.00', 'stock': 3,
+                'orden_trabajo_pdf': SimpleUploadedFile('ot.pdf', PDF_EJEMPLO),
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.escrituras(ctx.captured_queries), ['INSERT'])
+        self.assertTrue(Producto.objects.get(nombre='Con PDF').tiene_pdf)
+
+    def test_editar_con_pdf_es_un_solo_update(self):
+        producto = crear_producto(nombre='Heredado', orden_trabajo_pdf=PDF_EJEMPLO)
+        estadisticas.obtener()
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/productos/{producto.id}/', {
+                'precio': '20.00',
+                'orden_trabajo_pdf': SimpleUploadedFile('ot.pdf', PDF_EJEMPLO),
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.escrituras(ctx.captured_queries), ['UPDATE'])
+        producto.refresh_from_db()
+        self.assertIsNone(producto.orden_trabajo_pdf)
+        self.assertTrue(ProductoDocumento.objects.filter(producto=producto).exists())
+        # El PDF heredado ya contaba: el documento nuevo no lo suma otra vez
+        self.assertEqual(estadisticas.obtener()['con_pdf'], 1)
+
+    def test_editar_con_pdf_y_nombre_repetido_no_deja_archivos(self):
+        crear_producto(nombre='Ocupado')
+        producto = crear_producto(nombre='Libre')
+        storage = get_pdf_storage()
+        antes = set(storage.archivos)
+
+        response = self.client.patch(f'/api/productos/{producto.id}/', {
+            'nombre': 'ocupado',
+            'orden_trabajo_pdf': SimpleUploadedFile('ot.pdf', PDF_EJEMPLO),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(set(storage.archivos), antes)
+        self.assertFalse(ProductoDocumento.objects.filter(producto=producto).exists())
+
+    def test_guardado_parcial_no_valida(self):
+        producto = crear_producto(stock=10)
+        producto.stock = 4
+        with mock.patch.object(Producto, 'full_clean') as full_clean, self.assertNumQueries(1):
+            producto.save(update_fields=['stock'])
+        full_clean.assert_not_called()
+
+    def test_la_base_rechaza_valores_invalidos(self):
+        producto = crear_producto(stock=1, numero_ot=5)
+        for campos in ({'precio': 0}, {'stock': -1}, {'numero_ot': 0}):
+            with self.subTest(**campos), self.assertRaises(IntegrityError), transaction.atomic():
+                Producto.objects.filter(pk=producto.pk).update(**campos)
+        # Stock y número OT sin configurar siguen permitidos
+        Producto.objects.filter(pk=producto.pk).update(stock=None, numero_ot=None)
+
+    def test_nombre_repetido_lo_rechaza_la_base(self):
+        crear_producto(nombre='Tornillo')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/productos/', {'nombre': 'TORNILLO', 'precio': '5.00'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Ya existe un producto con este nombre', response.data['details'])
+        # Sin consulta previa: el INSERT falla contra el índice único
+        self.assertFalse(any(q['sql'].startswith('SELECT') and 'nombre' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(Producto.objects.filter(nombre__iexact='tornillo').count(), 1)
+
+        # Un producto inactivo no reserva su nombre
+        Producto.objects.filter(nombre='Tornillo').update(activo=False)
+        response = self.client.post('/api/productos/', {'nombre': 'TORNILLO', 'precio': '5.00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class AjusteStockMasivoTests(APITestCase):
+    url = '/api/productos/stock/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.a = crear_producto(nombre='A', stock=10)
+        self.b = crear_producto(nombre='B', stock=1)
+        self.c = crear_producto(nombre='C', stock=None)
+
+    def test_aplica_todos_con_un_solo_update(self):
+        ajustes = [{'id': self.a.id, 'delta': -4}, {'id': self.b.id, 'delta': 5}, {'id': self.c.id, 'delta': 2}]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'ajustes': ajustes}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['stock_actual'] for r in response.data['resultados']], [6, 6, 2])
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(MovimientoStock.objects.count(), 3)
+        self.assertEqual(self.a.movimientos_stock.get().tipo, MovimientoStock.SALIDA)
+
+    def test_modo_todo_no_aplica_nada_si_uno_falla(self):
+        ajustes = [{'id': self.a.id, 'delta': -4}, {'id': self.b.id, 'delta': -2}, {'id': 9999, 'delta': 1}]
+        response = self.client.post(self.url, {'ajustes': ajustes}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['aplicados'], 0)
+        errores = {r['id']: r.get('error') for r in response.data['resultados']}
+        self.assertEqual(errores[self.b.id], 'No hay suficiente stock disponible')
+        self.assertEqual(errores[9999], 'Producto no encontrado')
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 10)
+        self.assertFalse(MovimientoStock.objects.exists())
+
+    def test_modo_parcial_aplica_los_validos(self):
+        ajustes = [{'id': self.a.id, 'delta': -4}, {'id': self.c.id, 'delta': -1}]
+        response = self.client.post(self.url, {'ajustes': ajustes, 'modo': 'parcial'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['aplicados'], response.data['fallidos']), (1, 1))
+        self.assertEqual(response.data['resultados'][1]['error'], 'Este producto no tiene stock configurado')
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 6)
+        self.assertEqual(MovimientoStock.objects.count(), 1)
+
+    def test_rechaza_productos_repetidos(self):
+        ajustes = [{'id': self.a.id, 'delta': 1}, {'id': self.a.id, 'delta': 1}]
+        response = self.client.post(self.url, {'ajustes': ajustes}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportacionTests(APITestCase):
+    url = '/api/productos/importar/'
+
+    def importar(self, contenido, nombre='catalogo.csv', **datos):
+        archivo = SimpleUploadedFile(nombre, contenido.encode('utf-8'))
+        return self.client.post(self.url, {'archivo': archivo, **datos}, format='multipart')
+
+    def test_csv_crea_y_actualiza_por_nombre(self):
+        existente = crear_producto(nombre='Tornillo', precio='1.00', stock=5, descripcion='original')
+        contenido = (
+            'nombre,precio,stock\n'
+            'tornillo,2.50,8\n'
+            'Tuerca,0.75,\n'
+            'Arandela,-1,3\n'
+        )
+        response = self.importar(contenido)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creados'], response.data['actualizados'], response.data['fallidos']), (1, 1, 1))
+        self.assertEqual(response.data['errores'][0]['fila'], 4)
+        self.assertIn('precio', response.data['errores'][0]['errores'])
+        existente.refresh_from_db()
+        self.assertEqual((str(existente.precio), existente.stock), ('2.50', 8))
+        # Las columnas que no vienen en el archivo no se sobrescriben
+        self.assertEqual(existente.descripcion, 'original')
+        self.assertIsNone(Producto.objects.get(nombre='Tuerca').stock)
+
+    def test_jsonl_con_nombres_repetidos_y_lineas_invalidas(self):
+        contenido = (
+            '{"nombre": "Perno", "precio": "3.00"}\n'
+            '{"nombre": "PERNO", "precio": "4.00"}\n'
+            'no es json\n'
+        )
+        response = self.importar(contenido, nombre='catalogo.jsonl')
+
+        self.assertEqual((response.data['creados'], response.data['fallidos']), (1, 2))
+        self.assertEqual(Producto.objects.get().precio, 3)
+
+    def test_sin_actualizar_informa_existentes(self):
+        crear_producto(nombre='Tornillo')
+        response = self.importar('nombre,precio\nTornillo,2.00\n', actualizar='false')
+        self.assertEqual(response.data['fallidos'], 1)
+
+    def test_una_consulta_de_nombres_por_lote(self):
+        contenido = 'nombre,precio\n' + ''.join(f'Producto {i},1.00\n' for i in range(50))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.importar(contenido)
+
+        self.assertEqual(response.data['creados'], 50)
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual((len(selects), len(inserts)), (1, 1))
+
+    def test_error_a_mitad_conserva_los_lotes_confirmados(self):
+        contenido = b'nombre,precio\nA,1.00\nB,1.00\nC,1.00\nD\xff,1.00\n'
+        importador = ImportadorProductos(tamano_lote=2)
+        estadisticas.obtener()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ImportacionInterrumpida) as contexto:
+                importador.importar(leer_filas(io.BytesIO(contenido), 'csv'))
+
+        self.assertIsInstance(contexto.exception.__cause__, UnicodeDecodeError)
+        self.assertEqual(contexto.exception.resultado.creados, 2)
+        self.assertEqual(Producto.objects.count(), 2)
+        # Las estadísticas ya no muestran los contadores de antes del primer lote
+        self.assertEqual(estadisticas.obtener()['total'], 2)
+
+    def test_archivo_invalido_informa_lo_importado(self):
+        archivo = SimpleUploadedFile('catalogo.csv', b'nombre,precio\nA,1.00\n\xff\n')
+        response = self.client.post(self.url, {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith('Archivo inválido'))
+        self.assertEqual(response.data['creados'], 0)
+
+    def test_nombre_creado_por_otro_request_se_informa_por_fila(self):
+        crear_producto(nombre='Tornillo')
+        # La consulta de nombres no lo ve, como si se hubiera creado justo después
+        with mock.patch.object(ImportadorProductos, '_existentes', return_value={}):
+            response = self.importar('nombre,precio\nTuerca,0.50\ntornillo,1.00\n')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['creados'], response.data['fallidos']), (1, 1))
+        self.assertEqual(response.data['errores'][0]['fila'], 3)
+        self.assertTrue(Producto.objects.filter(nombre='Tuerca').exists())
+
+    def test_comando_importar_productos(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as archivo:
+            archivo.write('nombre,precio\nTornillo,1.00\nTuerca,0.50\n')
+        self.addCleanup(os.remove, archivo.name)
+        salida = io.StringIO()
+        call_command('importar_productos', archivo.name, '--lote', '1', stdout=salida)
+
+        self.assertIn('2 creados', salida.getvalue())
+        self.assertEqual(Producto.objects.count(), 2)
+
+
+class ExportacionTests(APITestCase):
+    url = '/api/productos/exportar/'
+
+    def setUp(self):
+        super().setUp()
+        crear_producto(nombre='Tornillo', precio='1.50', stock=10, descripcion='Acero, "inox"')
+        crear_producto(nombre='Tuerca', precio='0.75', stock=0)
+        crear_producto(nombre='Inactivo', activo=False)
+
+    def descargar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_respeta_los_filtros(self):
+        contenido = self.descargar(self.url + '?formato=csv&con_stock=true').decode('utf-8-sig')
+        filas = list(csv.reader(io.StringIO(contenido)))
+
+        self.assertEqual(filas[0][:3], ['ID', 'Nombre', 'Precio'])
+        self.assertEqual(len(filas), 2)
+        self.assertEqual((filas[1][1], filas[1][2], filas[1][3]), ('Tornillo', '1.50', 'Acero, "inox"'))
+
+    def test_jsonl(self):
+        lineas = self.descargar(self.url + '?formato=jsonl').decode('utf-8').splitlines()
+        productos = [json.loads(linea) for linea in lineas]
+
+        self.assertEqual({p['nombre'] for p in productos}, {'Tornillo', 'Tuerca'})
+        self.assertEqual(productos[0]['precio'], '0.75')
+        self.assertFalse(productos[0]['tiene_pdf'])
+
+    def test_xlsx_es_un_libro_valido(self):
+        contenido = self.descargar(self.url + '?formato=xlsx&nombre=tornillo')
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+        self.assertEqual(hoja.count('<row '), 2)
+        self.assertIn('Acero, "inox"', hoja)
+
+    def test_no_selecciona_el_pdf_ni_pagina(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.descargar(self.url)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertIsNone(ColumnasDiferidasTests.COLUMNA_PDF.search(sql))
+        self.assertNotIn('LIMIT', sql)
+
+    def test_formato_invalido(self):
+        response = self.client.get(self.url + '?formato=pdf')
+        self.assertEqual(response.status_code, 400)
+
+
+class EstadisticasTests(APITestCase):
+    url = '/api/productos/estadisticas/'
+
+    def setUp(self):
+        super().setUp()
+        self.con_pdf = crear_producto(nombre='Con PDF', precio='10.00', stock=5)
+        self.con_pdf.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF_EJEMPLO))
+        self.sin_stock = crear_producto(nombre='Sin stock', precio='20.00', stock=0)
+        crear_producto(nombre='Inactivo', precio='99.00', activo=False)
+
+    def obtener(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertEstadisticas(self, datos, total, con_stock, con_pdf, promedio):
+        self.assertEqual(
+            (datos['total_productos'], datos['productos_con_stock'],
+             datos['productos_con_pdf'], datos['precio_promedio']),
+            (total, con_stock, con_pdf, promedio)
+        )
+
+    def test_una_consulta_y_luego_cache(self):
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.obtener()
+        self.assertEstadisticas(datos, 2, 1, 1, 15.0)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'productos_producto' in q['sql']]), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.obtener()
+        self.assertEqual([q for q in ctx.captured_queries if 'productos_producto' in q['sql']], [])
+
+    def test_se_mantiene_con_cada_cambio(self):
+        self.obtener()
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_producto(nombre='Nuevo', precio='30.00', stock=1)
+            self.sin_stock.aumentar_stock(2)
+            self.client.delete(f'/api/productos/{self.con_pdf.id}/')
+
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.obtener()
+        self.assertEqual([q for q in ctx.captured_queries if 'productos_producto' in q['sql']], [])
+        self.assertEstadisticas(datos, 2, 2, 0, 25.0)
+        self.assertEstadisticas(self.obtener(self.url + '?fresh=1'), 2, 2, 0, 25.0)
+
+    def test_ajuste_masivo_e_importacion(self):
+        self.obtener()
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(activo=True).ajustar_stock({self.con_pdf.id: -5})
+        self.assertEstadisticas(self.obtener(), 2, 0, 1, 15.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ImportadorProductos().importar(leer_filas([b'nombre,precio\n', b'Importado,45.00\n'], 'csv'))
+        self.assertEstadisticas(self.obtener(), 3, 0, 1, 25.0)
+
+    def test_con_filtros_no_usa_la_cache(self):
+        self.obtener()
+        self.assertEstadisticas(self.obtener(self.url + '?con_stock=true'), 1, 1, 1, 10.0)
+
+
+@skipUnless(fakeredis, 'requiere fakeredis')
+class CacheCompartidaTests(APITestCase):
+    """Dos workers, cada uno con su propio pool de conexiones a la misma caché Redis"""
+
+    def setUp(self):
+        super().setUp()
+        servidor = fakeredis.FakeServer()
+        self.worker_a, self.worker_b = (self.crear_cache(servidor) for _ in range(2))
+
+    def crear_cache(self, servidor):
+        from django.core.cache.backends.redis import RedisCache
+        return RedisCache('redis://localhost:6379/0', {
+            'KEY_PREFIX': 'productos-api',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection, 'server': servidor},
+        })
+
+    def test_estadisticas_compartidas_entre_workers(self):
+        crear_producto(stock=0)
+        with mock.patch.object(estadisticas, 'cache', self.worker_a):
+            self.assertEqual(estadisticas.obtener()['con_stock'], 0)
+        with mock.patch.object(estadisticas, 'cache', self.worker_b), \
+                self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.get().aumentar_stock(3)
+        with mock.patch.object(estadisticas, 'cache', self.worker_a), \
+                CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(estadisticas.obtener()['con_stock'], 1)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @mock.patch.object(ProductoViewSet, 'throttle_classes', [UserRateThrottle])
+    @mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', {'user': '2/min'})
+    def test_throttling_global_y_no_por_worker(self):
+        codigos = []
+        for worker in (self.worker_a, self.worker_b, self.worker_a):
+            with mock.patch.object(UserRateThrottle, 'cache', worker):
+                codigos.append(self.client.get('/api/productos/').status_code)
+        self.assertEqual(codigos, [200, 200, 429])
+
+
+class CacheRespuestasTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.producto = crear_producto(nombre='Tornillo', stock=5)
+
+    def test_segundo_listado_sale_de_la_cache(self):
+        primera = self.client.get('/api/productos/?page=1&nombre=torn')
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = self.client.get('/api/productos/?nombre=torn&page=1&precio_min=')
+
+        self.assertEqual((primera['X-Cache'], segunda['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual([q for q in ctx.captured_queries if 'productos_producto' in q['sql']], [])
+
+    def test_cambios_invalidan_listado_y_detalle(self):
+        url = f'/api/productos/{self.producto.id}/'
+        self.client.get('/api/productos/')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/productos/{self.producto.id}/reducir-stock/', {'cantidad': 2}, format='json')
+
+        detalle = self.client.get(url)
+        self.assertEqual((detalle['X-Cache'], detalle.json()['stock']), ('MISS', 3))
+        listado = self.client.get('/api/productos/')
+        self.assertEqual((listado['X-Cache'], listado.json()['results'][0]['stock']), ('MISS', 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get('/api/productos/').json()['count'], 0)
+
+    def test_no_cache_omite_la_lectura_y_cuenta_metricas(self):
+        self.client.get('/api/productos/')
+        self.client.get('/api/productos/')
+        response = self.client.get('/api/productos/', HTTP_CACHE_CONTROL='no-cache')
+
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        metricas = cache_respuestas.metricas()
+        self.assertEqual((metricas['hits'], metricas['misses'], metricas['bypass']), (1, 1, 1))
+
+
+@override_settings(ROOT_URLCONF='mi_proyecto.urls_asgi')
+class VistasAsyncTests(TestCase):
+    """Rutas del despliegue ASGI (mi_proyecto/urls_asgi.py)"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='tester', password='clave-segura-123')
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        self.client = AsyncClient()
+        self.producto = crear_producto(nombre='Tornillo')
+        self.producto.adjuntar_pdf(SimpleUploadedFile('ot.pdf', PDF_EJEMPLO))
+
+    async def test_listado_y_detalle_usan_la_cache_de_respuestas(self):
+        primera = await self.client.get('/api/productos/', headers=self.auth)
+        segunda = await self.client.get('/api/productos/', headers=self.auth)
+        detalle = await self.client.get(f'/api/productos/{self.producto.id}/', headers=self.auth)
+
+        self.assertEqual((primera['X-Cache'], segunda['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(primera.json()['results'][0]['nombre'], 'Tornillo')
+        self.assertEqual(detalle.json()['id'], self.producto.id)
+        self.assertEqual((await self.client.get('/api/productos/')).status_code, 401)
+
+    async def test_escrituras_se_delegan_al_viewset(self):
+        response = await self.client.patch(
+            f'/api/productos/{self.producto.id}/', {'stock': 9},
+            content_type='application/json', headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await Producto.objects.aget(pk=self.producto.pk)).stock, 9)
+
+    async def test_descarga_con_iterador_async(self):
+        url = f'/api/productos/{self.producto.id}/descargar-ot/'
+        completa = await self.client.get(url, headers=self.auth)
+        rango = await self.client.get(url, headers={**self.auth, 'Range': 'bytes=100-199'})
+
+        self.assertEqual(completa.status_code, 200)
+        self.assertEqual(b''.join([bloque async for bloque in completa.streaming_content]), PDF_EJEMPLO)
+        self.assertEqual(rango.status_code, 206)
+        self.assertEqual(b''.join([bloque async for bloque in rango.streaming_content]), PDF_EJEMPLO[100:200])
+
+    async def test_health_y_ping(self):
+        health = await self.client.get('/api/health/')
+        ping = await self.client.get('/api/ping/')
+
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(health.json()['checks']['database']['status'], 'ok')
+        self.assertEqual(ping.json()['status'], 'ok')
+
+
+@mock.patch.object(ProductoViewSet, 'authentication_classes', [JWTStatelessAuthentication])
+class AutenticacionStatelessTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='clave-segura-123')
+        self.token = TokenProductos.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.producto = crear_producto()
+
+    def test_lecturas_no_consultan_la_tabla_de_usuarios(self):
+        self.assertEqual(self.token['username'], 'tester')
+        self.client.get('/api/productos/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/productos/{self.producto.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q for q in ctx.captured_queries if 'auth_user' in q['sql']], [])
+
+    def test_desactivar_usuario_corta_el_acceso(self):
+        self.assertEqual(self.client.get('/api/productos/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/productos/').status_code, 401)
+
+    def test_movimientos_de_stock_registran_el_usuario(self):
+        response = self.client.post(
+            f'/api/productos/{self.producto.id}/reducir-stock/', {'cantidad': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.producto.movimientos_stock.get().usuario, self.user)
+
+
+@mock.patch.object(SimpleRateThrottle, 'THROTTLE_RATES', {'login': '3/min', 'login_ip': '5/min'})
+class LoginTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='clave-segura-123')
+
+    def login(self, password, username='tester', ip='10.0.0.1'):
+        return self.client.post(
+            '/api/auth/login/', {'username': username, 'password': password},
+            content_type='application/json', REMOTE_ADDR=ip,
+        )
+
+    def test_intentos_fallidos_bloquean_sin_verificar_la_contrasena(self):
+        codigos = [self.login('incorrecta').status_code for _ in range(3)]
+        with mock.patch('productos.auth_views.authenticate') as authenticate:
+            bloqueado = self.login('clave-segura-123')
+        authenticate.assert_not_called()
+
+        self.assertEqual(codigos, [401, 401, 401])
+        self.assertEqual(bloqueado.status_code, 429)
+        # Otra IP para el mismo usuario no queda bloqueada
+        self.assertEqual(self.login('clave-segura-123', ip='10.0.0.2').status_code, 200)
+
+    def test_probar_muchos_usuarios_bloquea_la_ip(self):
+        for i in range(5):
+            self.assertEqual(self.login('incorrecta', username=f'usuario{i}').status_code, 401)
+        self.assertEqual(self.login('clave-segura-123').status_code, 429)
+
+    def test_cambiar_x_forwarded_for_no_evade_el_limite(self):
+        codigos = [
+            self.client.post(
+                '/api/auth/login/', {'username': f'usuario{i}', 'password': 'incorrecta'},
+                content_type='application/json', REMOTE_ADDR='10.0.0.1',
+                HTTP_X_FORWARDED_FOR=f'203.0.113.{i}',
+            ).status_code
+            for i in range(8)
+        ]
+        self.assertEqual(codigos[:5], [401] * 5)
+        self.assertEqual(codigos[5:], [429] * 3)
+
+    def test_detras_de_un_proxy_cuenta_la_ip_que_agrega_el_proxy(self):
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        with self.settings(REST_FRAMEWORK=rest_framework):
+            codigos = [
+                self.client.post(
+                    '/api/auth/login/', {'username': 'tester', 'password': 'incorrecta'},
+                    content_type='application/json', REMOTE_ADDR='10.0.0.254',
+                    HTTP_X_FORWARDED_FOR=f'203.0.113.{i}, 198.51.100.7',
+                ).status_code
+                for i in range(5)
+            ]
+        self.assertEqual(codigos, [401, 401, 401, 429, 429])
+
+    def test_logins_exitosos_no_cuentan(self):
+        for _ in range(6):
+            self.assertEqual(self.login('clave-segura-123').status_code, 200)
+
+    @override_settings(PASSWORD_HASHERS=['productos.hashers.PBKDF2Ajustado'])
+    def test_login_rehashea_con_el_nuevo_costo(self):
+        with mock.patch.object(PBKDF2Ajustado, 'iterations', 1000):
+            self.user.set_password('clave-segura-123')
+            self.user.save()
+        with mock.patch.object(PBKDF2Ajustado, 'iterations', 2000):
+            self.assertEqual(self.login('clave-segura-123').status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+
+class ListaNegraTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tester', password='clave-segura-123')
+        self.refresh = str(TokenProductos.for_user(self.user))
+        self.client = APIClient()
+
+    def renovar(self, refresh):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+
+    def test_renovar_rota_y_revoca_el_token_usado(self):
+        response = self.renovar(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        nuevo = response.json()['refresh']
+        self.assertNotEqual(nuevo, self.refresh)
+
+        self.assertEqual(self.renovar(self.refresh).status_code, 400)
+        self.assertEqual(self.renovar(nuevo).status_code, 200)
+
+    def test_token_revocado_al_cerrar_sesion(self):
+        access = TokenProductos(self.refresh).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/logout/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.renovar(self.refresh).status_code, 400)
+
+    def test_verificacion_lee_la_cache_y_recurre_a_la_base(self):
+        with self.assertNumQueries(0):
+            TokenProductos(self.refresh)
+        with self.captureOnCommitCallbacks(execute=True):
+            TokenProductos(self.refresh).blacklist()
+
+        cache.clear()
+        with self.assertRaises(TokenError), self.assertNumQueries(1):
+            TokenProductos(self.refresh)
+        with self.assertRaises(TokenError), self.assertNumQueries(0):
+            TokenProductos(self.refresh)
+
+    def test_podar_tokens_borra_solo_los_vencidos(self):
+        vencido = TokenProductos.for_user(self.user)
+        TokenProductos(str(vencido)).blacklist()
+        OutstandingToken.objects.filter(jti=vencido['jti']).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        call_command('podar_tokens', lote=1, stdout=io.StringIO())
+
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list('jti', flat=True)),
+            [TokenProductos(self.refresh)['jti']],
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class RegistroTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='tester', password='clave-segura-123')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+        self.salida = io.StringIO()
+        destino = logging.StreamHandler(self.salida)
+        destino.setFormatter(FormatoJSON())
+        self.cola = ColaHandler([destino])
+        self.cola.addFilter(FiltroCorrelacion())
+        self.cola.addFilter(FiltroMuestreo())
+        self.logger = logging.getLogger('productos')
+        nivel = self.logger.level
+        self.logger.addHandler(self.cola)
+        self.logger.setLevel(logging.DEBUG)
+        self.addCleanup(self.logger.setLevel, nivel)
+        self.addCleanup(self.logger.removeHandler, self.cola)
+
+    def registros(self):
+        self.cola.close()  # vacía la cola antes de leer
+        return [json.loads(linea) for linea in self.salida.getvalue().splitlines()]
+
+    def crear_repetido(self):
+        return self.client.post('/api/productos/', {'nombre': 'Repetido', 'precio': 100}, **self.auth)
+
+    def test_registros_en_json_con_el_id_del_request(self):
+        response = self.client.post(
+            '/api/productos/', {'nombre': 'Tornillo', 'precio': 100},
+            HTTP_X_REQUEST_ID='abc-123', **self.auth,
+        )
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+
+        registro, = [r for r in self.registros() if r['mensaje'].startswith('Producto creado')]
+        self.assertEqual(registro['request_id'], 'abc-123')
+        self.assertEqual(registro['producto_id'], response.json()['id'])
+        self.assertEqual(registro['usuario'], 'tester')
+
+    def test_configuracion_se_aplica_con_dictconfig(self):
+        salida = io.StringIO()
+        logging.config.dictConfig(configuracion(
+            {'memoria': {'class': 'logging.StreamHandler', 'stream': salida}},
+            loggers={'prueba.registro': 'INFO'},
+        ))
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+
+        logging.getLogger('prueba.registro').info('Hola %s', 'mundo', extra={'campo': 1})
+        cola = logging.getLogger().handlers[0]
+        cola.close()  # vacía la cola antes de leer
+
+        registro = json.loads(salida.getvalue())
+        self.assertEqual((registro['mensaje'], registro['campo']), ('Hola mundo', 1))
+
+    def test_id_invalido_se_reemplaza(self):
+        response = self.client.get('/api/ping/', HTTP_X_REQUEST_ID='no valido\n')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_debug_por_campo_solo_en_requests_muestreados(self):
+        crear_producto(nombre='Repetido')
+        with override_settings(LOG_MUESTREO_DEBUG=0):
+            sin_muestreo = self.crear_repetido()
+        with override_settings(LOG_MUESTREO_DEBUG=1):
+            self.client = self.client_class()
+            con_muestreo = self.crear_repetido()
+
+        debug = [r for r in self.registros() if r['nivel'] == 'DEBUG']
+        self.assertEqual({r['request_id'] for r in debug}, {con_muestreo['X-Request-ID']})
+        self.assertIn("Nombre duplicado: 'Repetido'", [r['mensaje'] for r in debug])
+        self.assertEqual(sin_muestreo.status_code, 400)
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_server_timing_y_histograma_por_ruta(self):
+        crear_producto()
+        response = self.client.get('/api/productos/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ consultas"$')
+
+        with self.settings(METRICAS_TOKEN='secreto'):
+            texto = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', texto)
+        self.assertRegex(
+            texto,
+            r'http_request_duration_seconds_count\{ruta="producto-list",metodo="GET",codigo="200"\} \d+',
+        )
+        self.assertIn('http_request_queries_bucket{ruta="producto-list",le="+Inf"}', texto)
+        self.assertIn('productos_cache_respuestas_total{resultado="misses"}', texto)
+
+    @override_settings(METRICAS_PRESUPUESTO_CONSULTAS=0)
+    def test_presupuesto_de_consultas_excedido(self):
+        self.client = self.client_class()  # recarga el middleware con el presupuesto
+        antes = metricas.registro.contadores[('http_request_query_budget_exceeded_total', ('health_check',))]
+        with self.assertLogs('mi_proyecto.metricas', 'WARNING') as logs:
+            self.client.get('/api/health/')
+
+        self.assertIn('Posible N+1 en health_check', logs.output[0])
+        self.assertEqual(
+            metricas.registro.contadores[('http_request_query_budget_exceeded_total', ('health_check',))],
+            antes + 1,
+        )
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token_de_metricas(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    @override_settings(METRICAS_TOKEN='', DEBUG=False)
+    def test_metricas_cerradas_sin_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+
+class StockConcurrenteTests(TransactionTestCase):
+    HILOS = 12
+    OPERACIONES_POR_HILO = 8
+
+    def test_reducciones_concurrentes_no_pierden_ni_sobrevenden(self):
+        producto = crear_producto(stock=50)
+        exitos, errores = [], []
+        barrera = threading.Barrier(self.HILOS)
+
+        def trabajar():
+            try:
+                barrera.wait()
+                for _ in range(self.OPERACIONES_POR_HILO):
+                    # Cada operación con su propia instancia, como en requests distintos
+                    try:
+                        exitos.append(Producto.objects.get(pk=producto.pk).reducir_stock(1))
+                    except ValidationError:
+                        pass
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 0)
+        self.assertEqual(len(exitos), 50)
+        self.assertEqual(sorted(exitos), list(range(50)))
+        self.assertEqual(producto.movimientos_stock.count(), 50)
+
+
+class NombreUnicoConcurrenteTests(TransactionTestCase):
+
+    def test_altas_simultaneas_con_el_mismo_nombre(self):
+        # Las dos validaciones terminan antes de que se guarde cualquiera
+        resultados, errores = [], []
+        barrera = threading.Barrier(2)
+
+        def crear(nombre):
+            try:
+                serializer = ProductoCreateSerializer(data={'nombre': nombre, 'precio': '10.00'})
+                serializer.is_valid(raise_exception=True)
+                barrera.wait()
+                try:
+                    with transaction.atomic():
+                        serializer.save()
+                    resultados.append('creado')
+                except DRFValidationError as e:
+                    resultados.append(e.detail)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=crear, args=(nombre,)) for nombre in ('Arandela', 'ARANDELA')]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(resultados), 2)
+        self.assertIn('creado', resultados)
+        resultados.remove('creado')
+        self.assertEqual(resultados, [{'nombre': ['Ya existe un producto con este nombre']}])
+        self.assertEqual(Producto.objects.filter(nombre__iexact='arandela').count(), 1)
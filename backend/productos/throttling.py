@@ -0,0 +1,55 @@
+"""
+Límite de intentos fallidos de login, guardado en la caché compartida.
+
+Cada intento de login verifica una contraseña, que es el paso más caro de la
+API en CPU. Estos throttles se revisan antes de llamar a ``authenticate()``,
+así que un ataque de fuerza bruta recibe 429 sin gastar un hash por intento.
+Solo cuentan los intentos fallidos (la vista los registra con
+``registrar_fallo``), para que un pico de logins legítimos desde una misma
+oficina no quede bloqueado:
+
+- ``login``: por usuario e IP (LOGIN_RATE, 5/min por defecto);
+- ``login_ip``: por IP, para quien prueba muchos usuarios (LOGIN_RATE_IP, 30/min).
+
+La IP es la de ``get_ident``, que confía en X-Forwarded-For solo hasta
+``REST_FRAMEWORK['NUM_PROXIES']`` saltos.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class IntentosLoginThrottle(SimpleRateThrottle):
+    """Throttle que solo consulta el historial; los fallos se agregan aparte"""
+
+    def throttle_success(self):
+        return True
+
+    def registrar_fallo(self, request, view):
+        if self.rate is None:
+            return
+        clave = self.get_cache_key(request, view)
+        if clave is None:
+            return
+        ahora = self.timer()
+        historial = [t for t in self.cache.get(clave, []) if t > ahora - self.duration]
+        self.cache.set(clave, [ahora, *historial], self.duration)
+
+
+class LoginUsuarioIPThrottle(IntentosLoginThrottle):
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        username = str(request.data.get('username') or '').lower()
+        usuario = hashlib.sha256(username.encode()).hexdigest()[:16]
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': f'{usuario}:{self.get_ident(request)}',
+        }
+
+
+class LoginIPThrottle(IntentosLoginThrottle):
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
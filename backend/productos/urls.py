@@ -12,7 +12,8 @@ from .auth_views import (
     logout_user,
     user_profile
 )
-from .health_views import health_check, simple_ping, status_check
+from .health_views import health_check, metrics, simple_ping, status_check
+from .subidas_views import SubidasView, SubidaView, finalizar_subida
 
 
 @api_view(['POST'])
@@ -60,6 +61,7 @@ urlpatterns = [
     path('health/', health_check, name='health_check'),
     path('ping/', simple_ping, name='simple_ping'),
     path('status/', status_check, name='status_check'),
+    path('metrics/', metrics, name='metrics'),
     path('create-admin/', create_admin_user, name='create_admin'),
     
     # Rutas de autenticación
@@ -68,4 +70,9 @@ urlpatterns = [
     path('auth/refresh/', refresh_token, name='token_refresh'),
     path('auth/logout/', logout_user, name='logout'),
     path('auth/profile/', user_profile, name='user_profile'),
+    
+    # Subidas reanudables de PDFs (ver subidas_views.py)
+    path('subidas/', SubidasView.as_view(), name='subida-list'),
+    path('subidas/<uuid:pk>/', SubidaView.as_view(), name='subida-detail'),
+    path('subidas/<uuid:pk>/finalizar/', finalizar_subida, name='subida-finalizar'),
 ]
\ No newline at end of file
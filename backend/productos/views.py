@@ -1,29 +1,81 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.http import HttpResponse
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
 import logging
 
-from .models import Producto
+from mi_proyecto.registro import debug_muestreado
+
+from . import estadisticas, subidas
+from .busqueda import buscar_productos
+from .cache_respuestas import CacheRespuestasMixin
+from .descargas import respuesta_pdf
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION, exportar
+from .importacion import (
+    FormatoInvalido, ImportacionInterrumpida, ImportadorProductos, detectar_formato, leer_filas
+)
+from .models import AjusteStockError, Producto, pdfs_provisorios
+from .pagination import ProductoPagination
 from .serializers import (
+    NOMBRE_DUPLICADO,
     ProductoSerializer, 
     ProductoCreateSerializer, 
     ProductoUpdateSerializer,
-    ProductoListSerializer
+    ProductoListSerializer,
+    AjusteStockMasivoSerializer
 )
 
 logger = logging.getLogger(__name__)
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CacheRespuestasMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar productos con autenticación JWT.
+    El listado y el detalle se sirven desde la caché de respuestas.
     """
     queryset = Producto.objects.filter(activo=True)
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    pagination_class = ProductoPagination
+
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        if self.action in ('create', 'update', 'partial_update'):
+            # El PDF se valida y se escribe a disco por bloques (ver subidas.py)
+            request.upload_handlers = [subidas.SubidaPDFHandler(request)]
+        return request
+
+    def _rechazar_subida(self, request):
+        """Respuesta de error si el PDF subido no se aceptó, o None"""
+        rechazo = subidas.rechazo(request)
+        if rechazo is None:
+            return None
+        logger.warning('PDF rechazado: %s', rechazo, extra={'usuario': request.user.username})
+        return Response({'error': str(rechazo)}, status=rechazo.status_code)
+
+    def _datos_invalidos(self, errores):
+        """Respuesta 400 con los errores del serializer explicados para el usuario"""
+        error_messages = []
+        for field, errors in errores.items():
+            if field == 'nombre' and NOMBRE_DUPLICADO in str(errors):
+                error_messages.append('Ya existe un producto con este nombre. Por favor, usa un nombre diferente.')
+            elif field == 'precio':
+                error_messages.append('El precio debe ser un número válido mayor a 0.')
+            elif field == 'stock':
+                error_messages.append('El stock debe ser un número entero mayor o igual a 0.')
+            elif field == 'numero_ot':
+                error_messages.append('El número de Factura debe ser un número entero mayor a 0.')
+            else:
+                error_messages.append(f'{field}: {errors[0] if isinstance(errors, list) else errors}')
+        
+        return Response({
+            'error': 'Datos inválidos',
+            'details': '; '.join(error_messages) if error_messages else 'Por favor, verifica los datos ingresados'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción"""
@@ -37,13 +89,19 @@ class ProductoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filtros adicionales para el queryset"""
-        queryset = super().get_queryset()
+        # Solo las columnas del serializer de la acción; el PDF nunca se carga
+        queryset = super().get_queryset().para_serializer(self.get_serializer_class())
         
         # Filtro por nombre (búsqueda)
         nombre = self.request.query_params.get('nombre', None)
         if nombre:
             queryset = queryset.filter(nombre__icontains=nombre)
         
+        # Búsqueda por texto en nombre y descripción, ordenada por relevancia
+        q = self.request.query_params.get('q', None)
+        if q and q.strip():
+            queryset = buscar_productos(queryset, q)
+        
         # Filtro por rango de precios
         precio_min = self.request.query_params.get('precio_min', None)
         precio_max = self.request.query_params.get('precio_max', None)
@@ -61,80 +119,66 @@ class ProductoViewSet(viewsets.ModelViewSet):
         # Filtro por productos con PDF
         con_pdf = self.request.query_params.get('con_pdf', None)
         if con_pdf and con_pdf.lower() == 'true':
-            queryset = queryset.exclude(orden_trabajo_pdf__isnull=True)
+            queryset = queryset.con_pdf()
         
-        return queryset.order_by('-fecha_creacion')
+        # id desempata productos creados en el mismo instante (orden estable)
+        if q and q.strip():
+            return queryset.order_by('-relevancia', '-fecha_creacion', '-id')
+        return queryset.order_by('-fecha_creacion', '-id')
 
     def create(self, request, *args, **kwargs):
         """Crear producto con manejo de PDF"""
         try:
-            logger.info(f"Iniciando creación de producto. Usuario: {request.user.username}")
-            logger.info(f"Datos recibidos: {dict(request.data)}")
-            logger.info(f"Archivos recibidos: {list(request.FILES.keys())}")
+            if debug_muestreado(logger):
+                logger.debug(
+                    'Creación de producto: campos %s, archivos %s',
+                    sorted(request.data.keys()), sorted(request.FILES.keys())
+                )
+            
+            rechazo = self._rechazar_subida(request)
+            if rechazo is not None:
+                return rechazo
             
-            with transaction.atomic():
-                # Usar directamente los datos sin copiar para evitar problemas
-                data = request.data.copy()
+            # Si la transacción se revierte, el PDF ya guardado se descarta
+            with pdfs_provisorios(), transaction.atomic():
+                # Los datos sin el PDF: copiar request.data copiaría también el archivo
+                data = {campo: valor for campo, valor in request.data.items() if campo != 'orden_trabajo_pdf'}
                 pdf_file = request.FILES.get('orden_trabajo_pdf')
                 
-                logger.info(f"PDF file presente: {pdf_file is not None}")
-                
-                # Remover el campo PDF de los datos para evitar problemas de validación
-                if 'orden_trabajo_pdf' in data:
-                    del data['orden_trabajo_pdf']
-                
-                logger.info(f"Campos en data: {list(data.keys())}")
-                
                 serializer = self.get_serializer(data=data)
-                logger.info(f"Serializer creado: {type(serializer).__name__}")
                 
-                logger.info("Validando serializer...")
                 if serializer.is_valid():
-                    logger.info("Serializer es válido, guardando producto...")
+                    # El tamaño y la firma del PDF ya se verificaron al recibirlo
                     producto = serializer.save()
                     
-                    # Manejar PDF después de crear el producto
+                    # El INSERT ya dejó la columna heredada vacía y la fecha de
+                    # modificación: el producto no se vuelve a guardar
                     if pdf_file:
-                        logger.info(f"Procesando archivo PDF. Tamaño: {pdf_file.size}")
-                        if pdf_file.size > 10 * 1024 * 1024:  # 10MB
-                            logger.warning(f"Archivo PDF demasiado grande: {pdf_file.size} bytes")
-                            return Response({
-                                'error': 'El archivo PDF no puede ser mayor a 10MB'
-                            }, status=status.HTTP_400_BAD_REQUEST)
-                        
-                        producto.orden_trabajo_pdf = pdf_file.read()
-                        producto.save()
-                        logger.info("PDF guardado en el producto")
+                        producto.adjuntar_pdf(pdf_file, guardar_producto=False)
                     
-                    logger.info(f"Producto creado exitosamente: {producto.nombre} (ID: {producto.id})")
+                    logger.info('Producto creado: %s', producto.nombre, extra={
+                        'producto_id': producto.id, 'usuario': request.user.username,
+                        'pdf_bytes': pdf_file.size if pdf_file else None,
+                    })
                     
                     return Response(serializer.data, status=status.HTTP_201_CREATED)
                 else:
-                    logger.error(f"Serializer no es válido. Errores: {serializer.errors}")
-                    # Procesar errores específicos para el usuario
-                    error_messages = []
-                    for field, errors in serializer.errors.items():
-                        if field == 'nombre' and 'Ya existe un producto con este nombre' in str(errors):
-                            error_messages.append('Ya existe un producto con este nombre. Por favor, usa un nombre diferente.')
-                        elif field == 'precio':
-                            error_messages.append('El precio debe ser un número válido mayor a 0.')
-                        elif field == 'stock':
-                            error_messages.append('El stock debe ser un número entero mayor o igual a 0.')
-                        elif field == 'numero_ot':
-                            error_messages.append('El número de Factura debe ser un número entero mayor a 0.')
-                        else:
-                            error_messages.append(f'{field}: {errors[0] if isinstance(errors, list) else errors}')
-                    
-                    return Response({
-                        'error': 'Datos inválidos',
-                        'details': '; '.join(error_messages) if error_messages else 'Por favor, verifica los datos ingresados'
-                    }, status=status.HTTP_400_BAD_REQUEST)
+                    logger.warning('Datos inválidos al crear producto', extra={
+                        'usuario': request.user.username, 'errores': serializer.errors,
+                    })
+                    return self._datos_invalidos(serializer.errors)
                 
+        except serializers.ValidationError as e:
+            # Nombre repetido detectado por la base al guardar; la transacción ya se revirtió
+            logger.warning('Datos inválidos al crear producto', extra={
+                'usuario': request.user.username, 'errores': e.detail,
+            })
+            return self._datos_invalidos(e.detail)
         except ValidationError as e:
-            logger.error(f"Error de validación al crear producto: {e}")
+            logger.warning('Error de validación al crear producto: %s', e)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error inesperado al crear producto: {e}", exc_info=True)
+            logger.exception('Error inesperado al crear producto')
             return Response({
                 'error': 'Error interno del servidor',
                 'details': str(e)
@@ -143,74 +187,59 @@ class ProductoViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         """Actualizar producto con manejo de PDF"""
         try:
-            logger.info(f"Iniciando actualización de producto. Usuario: {request.user.username}")
-            logger.info(f"Datos recibidos: {dict(request.data)}")
-            logger.info(f"Archivos recibidos: {list(request.FILES.keys())}")
+            if debug_muestreado(logger):
+                logger.debug(
+                    'Actualización de producto %s: campos %s, archivos %s',
+                    kwargs.get('pk'), sorted(request.data.keys()), sorted(request.FILES.keys())
+                )
             
-            with transaction.atomic():
+            rechazo = self._rechazar_subida(request)
+            if rechazo is not None:
+                return rechazo
+            
+            # Si la transacción se revierte, el PDF ya guardado se descarta
+            with pdfs_provisorios(), transaction.atomic():
                 instance = self.get_object()
-                data = request.data.copy()
+                # Los datos sin el PDF: copiar request.data copiaría también el archivo
+                data = {campo: valor for campo, valor in request.data.items() if campo != 'orden_trabajo_pdf'}
                 pdf_file = request.FILES.get('orden_trabajo_pdf')
                 
-                logger.info(f"PDF file presente: {pdf_file is not None}")
-                
-                # Remover el campo PDF de los datos para evitar problemas de validación
-                if 'orden_trabajo_pdf' in data:
-                    del data['orden_trabajo_pdf']
-                
-                logger.info(f"Campos en data: {list(data.keys())}")
-                
                 partial = kwargs.pop('partial', False)
                 serializer = self.get_serializer(instance, data=data, partial=partial)
-                logger.info(f"Serializer creado: {type(serializer).__name__}")
                 
-                logger.info("Validando serializer...")
                 if serializer.is_valid():
-                    logger.info("Serializer es válido, guardando producto...")
-                    producto = serializer.save()
-                    
-                    # Manejar PDF después de actualizar el producto
+                    # El tamaño y la firma del PDF ya se verificaron al recibirlo.
+                    # El documento se registra antes para que el mismo UPDATE del
+                    # producto vacíe la columna heredada
                     if pdf_file:
-                        logger.info(f"Procesando archivo PDF. Tamaño: {pdf_file.size}")
-                        if pdf_file.size > 10 * 1024 * 1024:  # 10MB
-                            logger.warning(f"Archivo PDF demasiado grande: {pdf_file.size} bytes")
-                            return Response({
-                                'error': 'El archivo PDF no puede ser mayor a 10MB'
-                            }, status=status.HTTP_400_BAD_REQUEST)
-                        
-                        producto.orden_trabajo_pdf = pdf_file.read()
-                        producto.save()
-                        logger.info("PDF guardado en el producto")
+                        instance.adjuntar_pdf(pdf_file, guardar_producto=False)
                     
-                    logger.info(f"Producto actualizado exitosamente: {producto.nombre} (ID: {producto.id})")
+                    producto = serializer.save()
+                    
+                    logger.info('Producto actualizado: %s', producto.nombre, extra={
+                        'producto_id': producto.id, 'usuario': request.user.username,
+                        'pdf_bytes': pdf_file.size if pdf_file else None,
+                    })
                     
                     return Response(serializer.data)
                 else:
-                    logger.error(f"Serializer no es válido. Errores: {serializer.errors}")
-                    # Procesar errores específicos para el usuario
-                    error_messages = []
-                    for field, errors in serializer.errors.items():
-                        if field == 'nombre' and 'Ya existe un producto con este nombre' in str(errors):
-                            error_messages.append('Ya existe un producto con este nombre. Por favor, usa un nombre diferente.')
-                        elif field == 'precio':
-                            error_messages.append('El precio debe ser un número válido mayor a 0.')
-                        elif field == 'stock':
-                            error_messages.append('El stock debe ser un número entero mayor o igual a 0.')
-                        elif field == 'numero_ot':
-                            error_messages.append('El número de Factura debe ser un número entero mayor a 0.')
-                        else:
-                            error_messages.append(f'{field}: {errors[0] if isinstance(errors, list) else errors}')
-                    
-                    return Response({
-                        'error': 'Datos inválidos',
-                        'details': '; '.join(error_messages) if error_messages else 'Por favor, verifica los datos ingresados'
-                    }, status=status.HTTP_400_BAD_REQUEST)
+                    logger.warning('Datos inválidos al actualizar producto', extra={
+                        'producto_id': instance.id, 'usuario': request.user.username,
+                        'errores': serializer.errors,
+                    })
+                    return self._datos_invalidos(serializer.errors)
                 
+        except serializers.ValidationError as e:
+            # Nombre repetido detectado por la base al guardar; la transacción ya se revirtió
+            logger.warning('Datos inválidos al actualizar producto', extra={
+                'usuario': request.user.username, 'errores': e.detail,
+            })
+            return self._datos_invalidos(e.detail)
         except ValidationError as e:
-            logger.error(f"Error de validación al actualizar producto: {e}")
+            logger.warning('Error de validación al actualizar producto: %s', e)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error inesperado al actualizar producto: {e}", exc_info=True)
+            logger.exception('Error inesperado al actualizar producto')
             return Response({
                 'error': 'Error interno del servidor',
                 'details': str(e)
@@ -219,23 +248,21 @@ class ProductoViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         """Eliminación lógica del producto"""
         try:
-            logger.info(f"Iniciando eliminación de producto. Usuario: {request.user.username}")
-            logger.info(f"ID del producto a eliminar: {kwargs.get('pk')}")
-            
             instance = self.get_object()
-            logger.info(f"Producto encontrado: {instance.nombre} (ID: {instance.id})")
             
             instance.activo = False
             instance.save(update_fields=['activo'])
             
-            logger.info(f"Producto desactivado exitosamente: {instance.nombre} por usuario {request.user.username}")
+            logger.info('Producto desactivado: %s', instance.nombre, extra={
+                'producto_id': instance.id, 'usuario': request.user.username,
+            })
             
             return Response({
                 'message': 'Producto eliminado exitosamente'
             }, status=status.HTTP_204_NO_CONTENT)
             
         except Exception as e:
-            logger.error(f"Error al eliminar producto: {e}", exc_info=True)
+            logger.exception('Error al eliminar producto')
             return Response({
                 'error': 'Error interno del servidor',
                 'details': str(e)
@@ -243,27 +270,37 @@ class ProductoViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='descargar-ot')
     def descargar_ot(self, request, pk=None):
-        """Descargar PDF de orden de trabajo"""
+        """
+        Descargar PDF de orden de trabajo.
+        Soporta ETag/Last-Modified (304) y Range (206) para reanudar descargas.
+        """
+        return self.respuesta_descarga(request)
+
+    def respuesta_descarga(self, request, asincrono=False):
+        """Respuesta de descargar-ot; con ``asincrono`` el PDF se envía con un iterador async"""
         try:
             producto = self.get_object()
             
-            if not producto.orden_trabajo_pdf:
+            # Se envía por bloques desde el almacenamiento, sin cargarlo en memoria
+            response = respuesta_pdf(
+                request, producto,
+                filename=f'orden_trabajo_{producto.id}_{producto.nombre}.pdf',
+                asincrono=asincrono
+            )
+            
+            if response is None:
                 return Response({
                     'error': 'No hay PDF cargado para este producto'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            response = HttpResponse(
-                producto.orden_trabajo_pdf, 
-                content_type='application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename=orden_trabajo_{producto.id}_{producto.nombre}.pdf'
-            
-            logger.info(f"PDF descargado: {producto.nombre} por usuario {request.user.username}")
+            logger.info('PDF descargado: %s', producto.nombre, extra={
+                'producto_id': producto.id, 'usuario': request.user.username,
+            })
             
             return response
             
         except Exception as e:
-            logger.error(f"Error al descargar PDF: {e}")
+            logger.exception('Error al descargar PDF')
             return Response({
                 'error': 'Error interno del servidor'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -280,9 +317,11 @@ class ProductoViewSet(viewsets.ModelViewSet):
                     'error': 'La cantidad debe ser mayor a 0'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            producto.reducir_stock(cantidad)
+            producto.reducir_stock(cantidad, usuario=request.user)
             
-            logger.info(f"Stock reducido: {producto.nombre} - {cantidad} unidades por usuario {request.user.username}")
+            logger.info('Stock reducido: %s - %s unidades', producto.nombre, cantidad, extra={
+                'producto_id': producto.id, 'usuario': request.user.username,
+            })
             
             return Response({
                 'message': f'Stock reducido exitosamente. Stock actual: {producto.stock}',
@@ -294,7 +333,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error al reducir stock: {e}")
+            logger.exception('Error al reducir stock')
             return Response({
                 'error': 'Error interno del servidor'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -311,9 +350,11 @@ class ProductoViewSet(viewsets.ModelViewSet):
                     'error': 'La cantidad debe ser mayor a 0'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            producto.aumentar_stock(cantidad)
+            producto.aumentar_stock(cantidad, usuario=request.user)
             
-            logger.info(f"Stock aumentado: {producto.nombre} - {cantidad} unidades por usuario {request.user.username}")
+            logger.info('Stock aumentado: %s - %s unidades', producto.nombre, cantidad, extra={
+                'producto_id': producto.id, 'usuario': request.user.username,
+            })
             
             return Response({
                 'message': f'Stock aumentado exitosamente. Stock actual: {producto.stock}',
@@ -321,34 +362,168 @@ class ProductoViewSet(viewsets.ModelViewSet):
             })
             
         except Exception as e:
-            logger.error(f"Error al aumentar stock: {e}")
+            logger.exception('Error al aumentar stock')
             return Response({
                 'error': 'Error interno del servidor'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['get'], url_path='estadisticas')
-    def estadisticas(self, request):
-        """Estadísticas generales de productos"""
+    @action(detail=False, methods=['post'], url_path='stock/bulk')
+    def ajustar_stock_masivo(self, request):
+        """
+        Ajusta el stock de varios productos en una sola transacción.
+        Body: {"ajustes": [{"id": 1, "delta": 5}, ...], "modo": "todo" | "parcial"}.
+        En modo "todo" (por defecto) si un ajuste falla no se aplica ninguno;
+        en modo "parcial" se aplican los demás y se informa el error de cada uno.
+        """
         try:
-            total_productos = self.get_queryset().count()
-            productos_con_stock = self.get_queryset().filter(stock__gt=0).count()
-            productos_con_pdf = self.get_queryset().exclude(orden_trabajo_pdf__isnull=True).count()
+            data = request.data
+            if isinstance(data, list):
+                data = {'ajustes': data}
+            serializer = AjusteStockMasivoSerializer(data=data)
+            if not serializer.is_valid():
+                return Response({
+                    'error': 'Datos inválidos',
+                    'details': serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Precio promedio
-            from django.db.models import Avg
-            precio_promedio = self.get_queryset().aggregate(
-                precio_promedio=Avg('precio')
-            )['precio_promedio'] or 0
+            ajustes = {ajuste['id']: ajuste['delta'] for ajuste in serializer.validated_data['ajustes']}
+            modo = serializer.validated_data['modo']
+            atomico = modo == AjusteStockMasivoSerializer.MODO_TODO
             
+            try:
+                stocks, errores = Producto.objects.filter(activo=True).ajustar_stock(
+                    ajustes, usuario=request.user, atomico=atomico
+                )
+            except AjusteStockError as e:
+                stocks, errores = {}, e.errores
+            
+            resultados = []
+            for pk, delta in ajustes.items():
+                if pk in stocks:
+                    resultados.append({'id': pk, 'delta': delta, 'ok': True, 'stock_actual': stocks[pk]})
+                else:
+                    resultados.append({'id': pk, 'delta': delta, 'ok': False, 'error': errores.get(pk)})
+            
+            logger.info(
+                'Ajuste masivo de stock (%s): %s aplicados, %s fallidos', modo, len(stocks), len(errores),
+                extra={'usuario': request.user.username}
+            )
+            
+            respuesta = {
+                'modo': modo,
+                'aplicados': len(stocks),
+                'fallidos': len(errores),
+                'resultados': resultados,
+            }
+            if errores and atomico:
+                respuesta['error'] = 'No se aplicó ningún ajuste porque algunos fallaron'
+                return Response(respuesta, status=status.HTTP_400_BAD_REQUEST)
+            return Response(respuesta)
+            
+        except Exception as e:
+            logger.exception('Error en ajuste masivo de stock')
             return Response({
-                'total_productos': total_productos,
-                'productos_con_stock': productos_con_stock,
-                'productos_con_pdf': productos_con_pdf,
-                'precio_promedio': round(precio_promedio, 2)
+                'error': 'Error interno del servidor'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='importar')
+    def importar(self, request):
+        """
+        Importar o actualizar productos desde un archivo CSV o JSON Lines
+        (campo "archivo"). Los productos se identifican por nombre; con
+        actualizar=false los existentes se informan como error.
+        """
+        try:
+            archivo = request.FILES.get('archivo')
+            if archivo is None:
+                return Response({
+                    'error': 'Debe enviar el archivo en el campo "archivo"'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            formato = detectar_formato(archivo.name, request.data.get('formato'))
+            actualizar = str(request.data.get('actualizar', 'true')).lower() != 'false'
+            
+            # El archivo se lee línea a línea y se escribe por lotes
+            resultado = ImportadorProductos(actualizar=actualizar).importar(leer_filas(archivo, formato))
+            
+            logger.info(
+                'Importación de productos: %s filas, %s creados, %s actualizados, %s con errores',
+                resultado.filas, resultado.creados, resultado.actualizados, resultado.fallidos,
+                extra={
+                    'usuario': request.user.username, 'formato': formato,
+                    'bytes': archivo.size, 'filas_por_segundo': resultado.filas_por_segundo,
+                }
+            )
+            
+            return Response(resultado.como_dict())
+            
+        except ImportacionInterrumpida as e:
+            # Los lotes anteriores al error ya se confirmaron: se informan junto al error
+            if isinstance(e.__cause__, (FormatoInvalido, UnicodeDecodeError)):
+                return Response({
+                    'error': f'Archivo inválido: {e.__cause__}', **e.resultado.como_dict()
+                }, status=status.HTTP_400_BAD_REQUEST)
+            logger.exception('Error al importar productos', extra={
+                'usuario': request.user.username, 'creados': e.resultado.creados,
+                'actualizados': e.resultado.actualizados,
             })
+            return Response({
+                'error': 'Error interno del servidor', **e.resultado.como_dict()
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except FormatoInvalido as e:
+            return Response({
+                'error': f'Archivo inválido: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception('Error al importar productos')
+            return Response({
+                'error': 'Error interno del servidor'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='exportar')
+    def exportar(self, request):
+        """
+        Exportar el catálogo completo (?formato=csv|jsonl|xlsx) con los mismos
+        filtros del listado. Se transmite por bloques, sin paginar.
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in FORMATOS_EXPORTACION:
+            return Response({
+                'error': f'Formato no soportado: {formato}. Use csv, jsonl o xlsx'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        contenido, content_type, extension = exportar(self.get_queryset(), formato)
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(
+            True, f'productos_{timezone.localdate().isoformat()}.{extension}'
+        )
+        
+        logger.info('Exportación de productos (%s)', formato, extra={'usuario': request.user.username})
+        
+        return response
+
+    @action(detail=False, methods=['get'], url_path='estadisticas')
+    def estadisticas(self, request):
+        """
+        Estadísticas generales de productos.
+        Sin filtros se sirven desde la caché (mantenida incrementalmente);
+        ?fresh=1 fuerza el recálculo. Con filtros se calculan en una consulta.
+        """
+        try:
+            filtros = set(request.query_params) - {'fresh', 'format'}
+            if filtros:
+                datos = estadisticas.calcular(self.get_queryset())
+            else:
+                fresh = request.query_params.get('fresh', '').lower() in ('1', 'true')
+                datos = estadisticas.obtener(fresh=fresh)
+            
+            respuesta = estadisticas.como_respuesta(datos)
+            if 'calculado' in datos:
+                respuesta['calculado'] = datos['calculado']
+            return Response(respuesta)
             
         except Exception as e:
-            logger.error(f"Error al obtener estadísticas: {e}")
+            logger.exception('Error al obtener estadísticas')
             return Response({
                 'error': 'Error interno del servidor'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -1,52 +1,13 @@
 import React from 'react';
-import ExcelJS from 'exceljs';
 import jsPDF from 'jspdf';
 import toast from 'react-hot-toast';
+import { productService } from '../services/api';
 
-const ExportButtons = ({ products, tableRef }) => {
-  // Exportar a Excel
+const ExportButtons = ({ products, filters = {}, tableRef }) => {
+  // Exportar a Excel: el servidor genera el catálogo completo con los filtros actuales
   const exportToExcel = async () => {
     try {
-      const workbook = new ExcelJS.Workbook();
-      const worksheet = workbook.addWorksheet('Productos');
-
-      // Configurar columnas
-      worksheet.columns = [
-        { header: 'ID', key: 'id', width: 10 },
-        { header: 'Nombre', key: 'nombre', width: 30 },
-        { header: 'Precio', key: 'precio', width: 15 },
-        { header: 'Descripción', key: 'descripcion', width: 40 },
-        { header: 'Stock', key: 'stock', width: 10 },
-        { header: 'Número Factura', key: 'numero_ot', width: 15 },
-        { header: 'Fecha Creación', key: 'fecha_creacion', width: 20 },
-        { header: 'Activo', key: 'activo', width: 10 }
-      ];
-
-      // Agregar datos
-      products.forEach(product => {
-        worksheet.addRow({
-          id: product.id,
-          nombre: product.nombre,
-          precio: Math.round(product.precio),
-          descripcion: product.descripcion || '',
-          stock: product.stock || 0,
-          numero_ot: product.numero_ot || '',
-          fecha_creacion: new Date(product.fecha_creacion).toLocaleDateString('es-ES'),
-          activo: product.activo ? 'Sí' : 'No'
-        });
-      });
-
-      // Estilizar encabezados
-      worksheet.getRow(1).font = { bold: true };
-      worksheet.getRow(1).fill = {
-        type: 'pattern',
-        pattern: 'solid',
-        fgColor: { argb: 'FF4F46E5' }
-      };
-
-      // Generar archivo
-      const buffer = await workbook.xlsx.writeBuffer();
-      const blob = new Blob([buffer], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' });
+      const blob = await productService.exportProducts('xlsx', filters);
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
@@ -290,7 +290,11 @@ const ProductList = ({ onProductEdit, refreshTrigger, onProductAdded }) => {
       ) : (
         <div className="space-y-4">
           {/* Botones de exportación */}
-          <ExportButtons products={products} tableRef={tableRef} />
+          <ExportButtons
+            products={products}
+            filters={{ nombre: searchTerm || undefined, ...filters }}
+            tableRef={tableRef}
+          />
           
           {/* Tabla de productos */}
           <div className="bg-gray-800 rounded-lg shadow-lg border border-gray-700">
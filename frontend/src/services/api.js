@@ -190,6 +190,18 @@ export const productService = {
     }
   },
 
+  async exportProducts(formato, params = {}) {
+    try {
+      const response = await api.get('/productos/exportar/', {
+        params: { ...params, formato },
+        responseType: 'blob'
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   async reduceStock(id, cantidad) {
     try {
       const response = await api.post(`/productos/${id}/reducir-stock/`, { cantidad });